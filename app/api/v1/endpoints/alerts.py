@@ -8,6 +8,8 @@ from app.api.dependencies import get_current_user
 from app.db.session import get_db
 from app.models import User, Alert, AlertLog
 from app.schemas.alert import AlertCreate, AlertResponse
+from app.services.db_events import notify_alerts_changed
+from app.services.regex_guard import patterns_cost
 
 router = APIRouter()
 
@@ -24,8 +26,10 @@ async def create_alert(
     # Remove user_id from input if present, set manually
     new_alert = Alert(**alert_data)
     new_alert.user_id = current_user.id
+    new_alert.regex_cost = patterns_cost(alert_in.keywords) if alert_in.is_regex else 0
     
     db.add(new_alert)
+    await notify_alerts_changed(db, current_user.id)
     await db.commit()
     await db.refresh(new_alert)
         
@@ -96,5 +100,6 @@ async def delete_alert(
         await db.delete(log)
 
     await db.delete(alert)
+    await notify_alerts_changed(db, current_user.id)
     await db.commit()
     return {"message": "Alert deleted successfully"}
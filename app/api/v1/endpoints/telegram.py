@@ -1,4 +1,5 @@
 from typing import Any
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
@@ -9,6 +10,7 @@ from app.db.session import get_db
 from app.models import User, TelegramSession
 from app.schemas.telegram import TelegramAuthRequest, TelegramAuthResponse, TelegramVerifyRequest, TelegramVerifyResponse
 from app.services.telegram_service import telegram_service
+from app.services.db_events import notify_session_changed, notify_targets_changed
 
 router = APIRouter()
 
@@ -63,6 +65,7 @@ async def verify_telegram_code(
             existing_session.phone_number = payload.phone_number
             existing_session.telegram_id = str(telegram_user_id)
             existing_session.is_active = True
+            existing_session.updated_at = datetime.utcnow()
             db.add(existing_session)
         else:
             new_session = TelegramSession(
@@ -74,6 +77,10 @@ async def verify_telegram_code(
             )
             db.add(new_session)
         
+        # The linked account is the bot fallback target for notifications
+        await notify_targets_changed(db, current_user.id)
+        # The worker starts (or restarts) the client without waiting for a poll
+        await notify_session_changed(db, current_user.id)
         await db.commit()
         
         return {
@@ -6,6 +6,7 @@ from sqlmodel import select
 from app.api.dependencies import get_current_user
 from app.db.session import get_db
 from app.models import User, TelegramSession
+from app.services.db_events import notify_targets_changed
 
 router = APIRouter()
 
@@ -49,6 +50,8 @@ async def update_user_me(
     """
     if user_in.bot_chat_id is not None:
         current_user.bot_chat_id = user_in.bot_chat_id
+        # The worker caches where notifications go
+        await notify_targets_changed(db, current_user.id)
     if user_in.full_name is not None:
         current_user.full_name = user_in.full_name
         
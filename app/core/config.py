@@ -30,6 +30,81 @@ class Settings(BaseSettings):
     SMTP_USER: Optional[str] = None
     SMTP_PASSWORD: Optional[str] = None
     EMAILS_FROM_EMAIL: Optional[str] = None
+    SMTP_POOL_SIZE: int = 4  # Open connections (and concurrent sends) to the SMTP server
+    SMTP_TIMEOUT: float = 30.0
+    SMTP_IDLE_CHECK: float = 30.0  # Connections idle longer than this are checked with NOOP before reuse
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = 100  # Reconnect after this many (provider session limits)
+
+    # Worker
+    ALERT_CACHE_CHECK_INTERVAL: int = 60  # Seconds between fallback version checks
+    TARGET_CACHE_TTL: int = 600  # Seconds a user's notification targets are trusted without a change notice
+    DEDUP_MAX_PER_TENANT: int = 256  # Recent messages remembered per user (~3 KiB)
+    DEDUP_TTL: int = 900  # Seconds
+    SHARED_SCAN_TTL: int = 30  # Seconds a channel message's scan is reused across tenants
+    ALBUM_MERGE_WINDOW_MS: int = 800  # Album parts within this window dispatch once; 0 disables
+    NEAR_DUP_MAX_DISTANCE: int = 8  # SimHash bits (of 64); closer texts count as the same content
+    NEAR_DUP_TTL: int = 3600  # Seconds a dispatched fingerprint suppresses copies
+    NEAR_DUP_MAX_PER_TENANT: int = 256
+    NEAR_DUP_MIN_WORDS: int = 5  # Shorter texts are never treated as copies
+    ALERT_RATE_BURST: int = 5  # Notifications an alert may send back to back before max_per_hour applies
+    ALERT_DEFAULT_MAX_PER_HOUR: int = 0  # For alerts without their own limit; 0 = unlimited
+    ALERT_COUNTS_FLUSH_INTERVAL: int = 5  # Seconds between writes of trigger/suppressed counters
+    DIGEST_MAX_COALESCE_SECONDS: int = 3600  # Longest coalescing window an alert may ask for
+    DIGEST_MAX_ITEMS: int = 50  # A coalesced notification is sent early at this many matches
+    DIGEST_RECOVERY_INTERVAL: int = 300  # Coalesced notifications unsent this long after their window are re-sent from the log
+    DIGEST_DAILY_HOUR: int = 8  # UTC hour daily email digests go out
+
+    # Notification outbox (see app/services/outbox.py)
+    OUTBOX_WORKERS: int = 4  # Dispatcher tasks per worker process
+    OUTBOX_MAX_ATTEMPTS: int = 6  # Exponential backoff between attempts, then marked failed
+    OUTBOX_LEASE: int = 120  # Seconds a claimed row stays locked before another dispatcher may retry it
+    OUTBOX_DELIVERY_TIMEOUT: float = 60.0  # One row's delivery is cut off after this (at most half the lease)
+    OUTBOX_POLL_INTERVAL: float = 1.0  # Idle dispatchers look for rows from other processes this often
+    OUTBOX_SHUTDOWN_GRACE: float = 10.0  # On shutdown, deliveries in flight get this long before their rows are handed back
+
+    # Batched alert log inserts (see app/services/batch_writer.py)
+    ALERT_LOG_FLUSH_INTERVAL_MS: int = 200
+    ALERT_LOG_BATCH_SIZE: int = 500  # Rows per INSERT
+    ALERT_LOG_MAX_BUFFER: int = 20000  # Dispatch waits for the database beyond this many unwritten rows
+
+    # Notification bot pacing (Telegram: ~30 msg/s overall, ~1/s per chat, 20/min per group)
+    BOT_GLOBAL_RATE: float = 25.0
+    BOT_CHAT_RATE: float = 1.0
+    BOT_CHAT_BURST: int = 3
+    BOT_GROUP_RATE_PER_MIN: int = 20
+    BOT_SEND_CONCURRENCY: int = 10  # Sends in flight at once; one chat still gets one at a time
+
+    # Webhook delivery (see app/services/webhooks.py)
+    WEBHOOK_MAX_CONNECTIONS: int = 100  # Shared keep-alive pool across all receivers
+    WEBHOOK_PER_HOST: int = 8  # Concurrent requests per receiving host
+    WEBHOOK_TIMEOUT: float = 5.0  # Seconds per request
+    WEBHOOK_RETRIES: int = 2  # Quick in-process retries; the outbox retries after that
+    WEBHOOK_BATCH_WINDOW_MS: int = 0  # > 0 sends alerts for the same URL together, one POST per window
+    WEBHOOK_BATCH_SIZE: int = 20
+    WEBHOOK_ALLOW_PRIVATE: bool = False  # Development only: allow loopback / private network receivers
+
+    # Client health checks (see app/services/health.py)
+    HEALTH_CHECK_INTERVAL: float = 5.0  # Connected-socket check per client (no RPC)
+    HEALTH_PROBE_MIN_INTERVAL: float = 15.0  # Heartbeat RPC for clients without recent updates...
+    HEALTH_PROBE_MAX_INTERVAL: float = 60.0  # ...backing off to this while they stay healthy
+    HEALTH_PROBE_TIMEOUT: float = 5.0
+    HEALTH_PROBE_CONCURRENCY: int = 50
+    RECONNECT_CONCURRENCY: int = 20  # Connection attempts in flight, worker-wide
+    RECONNECT_BASE_DELAY: float = 1.0  # Per-client backoff after a failed attempt, doubling...
+    RECONNECT_MAX_DELAY: float = 300.0  # ...up to this
+    RECONNECT_BREAKER_THRESHOLD: int = 10  # Failed attempts in a row that open the circuit
+    RECONNECT_BREAKER_COOLDOWN: float = 10.0  # Before the trial attempt; doubles while it fails...
+    RECONNECT_BREAKER_MAX_COOLDOWN: float = 120.0  # ...up to this
+    SESSION_FEED_POLL_INTERVAL: float = 30.0  # Fallback poll for session changes (pushed by NOTIFY)
+    SESSION_FEED_OVERLAP: float = 60.0  # Re-read window for late commits / clock skew
+
+    # Regex safety (see app/services/regex_guard.py)
+    REGEX_MAX_COST: int = 100  # Patterns scoring above this are rejected on save
+    REGEX_GUARD_COST: int = 0  # From this score on, run in the pool under a time budget (0 = every regex)
+    REGEX_TIMEOUT_MS: int = 200  # Budget per guarded evaluation; over it the alert is paused
+    REGEX_POOL_WORKERS: int = 2
+
+    FUZZY_MAX_DISTANCE: int = 2  # Highest per-alert edit-distance budget accepted
 
     # Defaults
     INVITE: Optional[str] = None
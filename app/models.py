@@ -2,7 +2,7 @@ from typing import Optional, List
 from uuid import UUID, uuid4
 from datetime import datetime
 from sqlmodel import Field, SQLModel, Relationship
-from sqlalchemy import Column, ARRAY, String, Text, BigInteger
+from sqlalchemy import Column, ARRAY, String, Text, BigInteger, Index, text
 
 # Shared Properties
 class UserBase(SQLModel):
@@ -40,6 +40,8 @@ class TelegramSession(SQLModel, table=True):
     phone_number: Optional[str] = None
     is_active: bool = True
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Bumped on every change; the worker's session feed polls on it
+    updated_at: datetime = Field(default_factory=datetime.utcnow, index=True)
 
     user: User = Relationship(back_populates="sessions")
 
@@ -53,14 +55,26 @@ class Alert(SQLModel, table=True):
     # Text[] in Postgres requires specific SA definition
     keywords: List[str] = Field(default=[], sa_column=Column(ARRAY(Text)))
     excluded_keywords: List[str] = Field(default=[], sa_column=Column(ARRAY(Text)))
+    # Sender Match: Telegram user/bot ids and usernames (without '@')
+    sender_ids: List[int] = Field(default=[], sa_column=Column(ARRAY(BigInteger)))
+    sender_usernames: List[str] = Field(default=[], sa_column=Column(ARRAY(Text)))
     
     is_regex: bool = False
+    fuzzy_distance: int = Field(default=0) # Edit-distance budget for keywords (0 = exact)
     notify_email: bool = True
     notify_bot: bool = False
     webhook_url: Optional[str] = None
     is_paused: bool = False
+    regex_cost: int = Field(default=0) # Static backtracking-risk score, see regex_guard
+    cooldown_seconds: int = Field(default=0) # Min gap between notifications (0 = none)
+    max_per_hour: int = Field(default=0) # Notification rate cap (0 = unlimited)
+    coalesce_seconds: int = Field(default=0) # Merge email/bot notifications within this window (0 = instant)
+    email_digest: Optional[str] = None # "hourly" / "daily": emails go out as a scheduled digest
     trigger_count: int = Field(default=0)
+    suppressed_count: int = Field(default=0) # Hits held back by cooldown / rate cap
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Bumped on every rule change; the worker's cache polls it as a version
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     user: User = Relationship(back_populates="alerts")
 
@@ -73,6 +87,7 @@ class AlertLog(SQLModel, table=True):
     detected_keyword: Optional[str] = None
     dispatched_to_email: bool = False
     dispatched_to_bot: bool = False
+    dispatched_to_webhook: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class TelegramChat(SQLModel, table=True):
@@ -85,3 +100,30 @@ class TelegramChat(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
     user: User = Relationship()
+
+class NotificationOutbox(SQLModel, table=True):
+    """Matches waiting for delivery; claimed by dispatchers with FOR UPDATE SKIP LOCKED."""
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        Index("ix_notification_outbox_due", "next_attempt_at", postgresql_where=text("status <> 'done'")),
+    )
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    # alert + message: the same match is only ever queued once
+    idempotency_key: str = Field(sa_column=Column(String, unique=True, nullable=False))
+    alert_id: UUID = Field(index=True)
+    user_id: UUID
+    message_text: str = Field(default="", sa_column=Column(Text))
+    from_user: Optional[str] = None
+    trigger: Optional[str] = None
+    suppressed: int = 0 # Rate-limited hits to mention in the notification
+    status: str = "pending" # pending / sending / done / failed
+    attempts: int = 0
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow)
+    locked_until: Optional[datetime] = None
+    claim_token: Optional[UUID] = None # Set per claim; updates by a dispatcher whose lease lapsed match nothing
+    email_done: bool = False
+    bot_done: bool = False
+    webhook_done: bool = False
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    sent_at: Optional[datetime] = None
@@ -1,24 +1,78 @@
-from pydantic import BaseModel
+import re
+from pydantic import BaseModel, model_validator
 from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
+from urllib.parse import urlsplit
+
+from app.core.config import settings
+from app.services.matcher import compile_pattern, normalize_username
+from app.services.regex_guard import regex_cost
+from app.services.webhooks import BlockedAddress, check_webhook_host
 
 class AlertBase(BaseModel):
     source_id: Optional[int] = None # Telegram Chat ID (NULL for global)
     source_name: Optional[str] = "All Chats"
     keywords: List[str] = []
     excluded_keywords: List[str] = []
+    sender_ids: List[int] = [] # Sender Match: fires only for these senders
+    sender_usernames: List[str] = [] # ...or these usernames; alone, on any of their messages
     is_regex: bool = False
+    fuzzy_distance: int = 0 # Typos tolerated per keyword (0 = exact match)
     
     notify_email: bool = True
     notify_bot: bool = False
-    webhook_url: Optional[str] = None
+    webhook_url: Optional[str] = None # Matches are POSTed here as JSON
     is_paused: bool = False
+    cooldown_seconds: int = 0 # Min seconds between two notifications of this alert
+    max_per_hour: int = 0 # Max notifications per hour (0 = unlimited)
+    coalesce_seconds: int = 0 # Merge notifications sent within this many seconds (0 = instant)
+    email_digest: Optional[str] = None # None, "hourly" or "daily"
 
 class AlertCreate(AlertBase):
-    pass
+    @model_validator(mode="after")
+    def validate_patterns(self):
+        self.sender_usernames = [normalize_username(u) for u in self.sender_usernames if u.strip("@ ")]
+        if self.cooldown_seconds < 0 or self.max_per_hour < 0:
+            raise ValueError("cooldown_seconds and max_per_hour must not be negative")
+        if not 0 <= self.coalesce_seconds <= settings.DIGEST_MAX_COALESCE_SECONDS:
+            raise ValueError(f"coalesce_seconds must be between 0 and {settings.DIGEST_MAX_COALESCE_SECONDS}")
+        if self.email_digest not in (None, "hourly", "daily"):
+            raise ValueError("email_digest must be 'hourly', 'daily' or null")
+        self.webhook_url = (self.webhook_url or "").strip() or None
+        if self.webhook_url:
+            parts = urlsplit(self.webhook_url)
+            if parts.scheme not in ("http", "https") or not parts.netloc:
+                raise ValueError("webhook_url must be an http(s) URL")
+            if not settings.WEBHOOK_ALLOW_PRIVATE:
+                try:
+                    check_webhook_host(parts.hostname)
+                except BlockedAddress as e:
+                    raise ValueError(f"webhook_url must point to a public host: {e}")
+        # Reject broken regexes on save instead of failing on every message
+        if self.is_regex:
+            for pat in self.keywords:
+                try:
+                    compile_pattern(pat)
+                except re.error as e:
+                    raise ValueError(f"Invalid regex '{pat}': {e}")
+                # Exponential shapes like (a+)+ or (a|aa)* and cubic ones like
+                # \w*\w*\w*x score above the limit and are refused outright
+                if regex_cost(pat) > settings.REGEX_MAX_COST:
+                    raise ValueError(f"Regex '{pat}' is too expensive to evaluate; avoid nested or overlapping quantifiers")
+        if self.fuzzy_distance:
+            if self.is_regex:
+                raise ValueError("Fuzzy matching applies to plain keywords only")
+            if not 0 < self.fuzzy_distance <= settings.FUZZY_MAX_DISTANCE:
+                raise ValueError(f"fuzzy_distance must be between 0 and {settings.FUZZY_MAX_DISTANCE}")
+            # Short keywords within a few edits of each other match almost anything
+            min_length = 2 * (self.fuzzy_distance + 1)
+            for kw in self.keywords:
+                if len(kw) < min_length:
+                    raise ValueError(f"Keyword '{kw}' is too short for fuzzy matching (min {min_length} characters)")
+        return self
 
-class AlertUpdate(AlertBase):
+class AlertUpdate(AlertCreate):
     pass
 
 class AlertResponse(AlertBase):
@@ -26,6 +80,8 @@ class AlertResponse(AlertBase):
     user_id: UUID
     created_at: datetime
     trigger_count: int = 0
+    suppressed_count: int = 0
+    regex_cost: int = 0
     
     class Config:
         from_attributes = True
@@ -0,0 +1,73 @@
+"""
+Aho-Corasick automaton for multi-keyword substring search.
+
+One pass over the text reports every pattern that occurs in it, regardless
+of how many patterns were added.
+"""
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+class AhoCorasick:
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def _add(self, pattern: str):
+        if not pattern:
+            return
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._goto[state][ch] = nxt
+            state = nxt
+        self._out[state] += (len(self.patterns),)
+        self.patterns.append(pattern)
+
+    def _build(self):
+        # BFS over the trie; merge outputs along failure links so scanning
+        # never has to walk the fail chain to collect matches.
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def find_all(self, text: str) -> Set[int]:
+        """Return the indexes of all patterns occurring in `text`."""
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        hits = set()
+        state = 0
+        for ch in text:
+            nxt = goto[state].get(ch)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(ch)
+            state = nxt or 0
+            if out[state]:
+                hits.update(out[state])
+        return hits
+
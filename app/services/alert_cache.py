@@ -0,0 +1,121 @@
+"""
+In-memory cache of compiled alert rules for the worker.
+
+Rules are loaded once per user and refreshed when the `alerts` rows change:
+pushed through LISTEN/NOTIFY, with a periodic version check as a fallback
+for missed notifications.
+"""
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlmodel import select
+
+from app.core.config import settings
+from app.db.session import engine, AsyncSession
+from app.models import Alert
+from app.services.matcher import RuleSet
+
+logger = logging.getLogger("worker")
+
+
+async def fetch_user_alerts(user_id):
+    """Fetch alerts for a specific user."""
+    async with AsyncSession(engine) as session:
+        statement = select(Alert).where(Alert.user_id == user_id).where(Alert.is_paused == False)
+        result = await session.execute(statement)
+        return result.scalars().all()
+
+
+async def fetch_alert_versions(user_ids) -> Dict[str, Tuple]:
+    """(row count, last update) per user; cheap enough to poll."""
+    async with AsyncSession(engine) as session:
+        statement = (
+            select(Alert.user_id, func.count(Alert.id), func.max(Alert.updated_at))
+            .where(Alert.user_id.in_(user_ids))
+            .group_by(Alert.user_id)
+        )
+        result = await session.execute(statement)
+        return {str(row[0]): (row[1], row[2]) for row in result.all()}
+
+
+class AlertCache:
+    def __init__(self, guard_cost: Optional[int] = None):
+        self.guard_cost = guard_cost
+        self._rules: Dict[str, RuleSet] = {}
+        self._versions: Dict[str, Tuple] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Bumped on every load; lets shared automata know what they cover
+        self.generation = 0
+
+    def get(self, user_id: str) -> Optional[RuleSet]:
+        return self._rules.get(user_id)
+
+    def alert(self, user_id, alert_id) -> Optional[Alert]:
+        """A cached (active) alert of a user this worker serves; None if not cached."""
+        rules = self._rules.get(str(user_id))
+        return rules.alert(alert_id) if rules is not None else None
+
+    def __contains__(self, user_id: str):
+        return user_id in self._rules
+
+    async def load(self, user_id: str) -> RuleSet:
+        """Load (or reload) a user's rules from the database."""
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            alerts = await fetch_user_alerts(user_id)
+            versions = await fetch_alert_versions([user_id])
+            rules = RuleSet(alerts, guard_cost=self.guard_cost)
+            self.generation += 1
+            rules.generation = self.generation
+            self._rules[user_id] = rules
+            self._versions[user_id] = versions.get(user_id, (0, None))
+            logger.info(f"Loaded {len(rules)} alert rules for user {user_id}")
+            return rules
+
+    def patterns(self) -> set:
+        """Lowered keywords of every cached user."""
+        found = set()
+        for rules in self._rules.values():
+            found.update(rules.patterns())
+        return found
+
+    def invalidate(self, user_id: str):
+        """NOTIFY callback: reload in the background if this worker serves the user."""
+        if user_id in self._rules:
+            asyncio.create_task(self._safe_load(user_id))
+
+    def discard(self, user_id: str):
+        self._rules.pop(user_id, None)
+        self._versions.pop(user_id, None)
+        self._locks.pop(user_id, None)
+
+    async def _safe_load(self, user_id: str):
+        try:
+            await self.load(user_id)
+        except Exception as e:
+            logger.error(f"Failed to refresh alert rules for {user_id}: {e}")
+
+    async def check_versions(self):
+        """Reload users whose alert version moved since we last loaded."""
+        user_ids = list(self._rules)
+        if not user_ids:
+            return
+        current = await fetch_alert_versions(user_ids)
+        for user_id in user_ids:
+            if current.get(user_id, (0, None)) != self._versions.get(user_id):
+                logger.info(f"Alert rules changed for {user_id} (version check)")
+                await self._safe_load(user_id)
+
+    async def watch(self, interval: float):
+        """Fallback loop for notifications lost while the listener was down."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.check_versions()
+            except Exception as e:
+                logger.error(f"Alert version check failed: {e}")
+
+
+alert_cache = AlertCache(guard_cost=settings.REGEX_GUARD_COST)
@@ -0,0 +1,164 @@
+"""
+Buffered multi-row inserts.
+
+Rows are appended to an in-memory buffer and written by a background task
+every `interval` seconds (sooner once `max_batch` rows are waiting), one
+multi-row INSERT per batch instead of a transaction per row. When the
+database falls behind the buffer is capped at `max_buffer`: `put()` waits
+for room, `add()` (for callers that must not block) keeps appending.
+
+When the database is unreachable, failed batches stay buffered and are
+retried. When it rejects a batch, the batch is split in halves until the
+offending rows are isolated (a few queries per bad row, not one per row);
+the rest is written, and a rejected row is retried `max_attempts` times
+before it is logged and dropped, so one row whose alert was deleted a
+moment ago cannot block the writer.
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from app.db.session import engine, AsyncSession
+
+logger = logging.getLogger("worker")
+
+_TRANSIENT = (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)
+_MAX_PARAMS = 30000  # bind parameters per statement; the protocol allows 32767
+
+
+def is_transient(error: Exception) -> bool:
+    """The database could not be reached (as opposed to rejecting the rows)."""
+    return isinstance(error, _TRANSIENT) or getattr(error, "connection_invalidated", False)
+
+
+class BatchWriter:
+    def __init__(self, table, interval: float = 0.05, max_batch: int = 500, max_buffer: int = 10000,
+                 on_flush: Callable[[], None] = None, name: str = None, max_attempts: int = 3):
+        self.table = table
+        self.interval = interval
+        self.max_batch = max_batch
+        self.max_buffer = max_buffer
+        self.max_attempts = max_attempts
+        self.name = name or table.name
+        self._on_flush = on_flush
+        self._buffer: List[Dict[str, Any]] = []
+        self._pending = asyncio.Event()
+        self._room = asyncio.Event()
+        self._room.set()
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._attempts: Dict[int, int] = {}  # id(row) -> rejections, for rows still buffered
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+
+    def prepare(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill in defaults (Core inserts don't apply the model's Python-side ones)."""
+        return values
+
+    def statement(self):
+        return insert(self.table)
+
+    def add(self, **values) -> Dict[str, Any]:
+        """Queue a row and return it (with defaults); never waits."""
+        row = self.prepare(values)
+        self._buffer.append(row)
+        if len(self._buffer) >= self.max_buffer:
+            self._room.clear()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        self._pending.set()
+        return row
+
+    async def put(self, **values) -> Dict[str, Any]:
+        """Like add(), but waits while the buffer is full (backpressure)."""
+        await self._room.wait()
+        return self.add(**values)
+
+    async def _run(self):
+        while True:
+            await self._pending.wait()
+            if len(self._buffer) < self.max_batch:
+                await asyncio.sleep(self.interval)
+            self._pending.clear()
+            await self.flush()
+
+    async def _insert(self, rows: List[Dict[str, Any]]):
+        # Rows rendered into the statement's VALUES list: passed as parameter
+        # sets instead, asyncpg would run the INSERT once per row
+        step = max(1, _MAX_PARAMS // len(rows[0]))
+        async with AsyncSession(engine) as session:
+            for i in range(0, len(rows), step):
+                await session.execute(self.statement().values(rows[i:i + step]))
+            await session.commit()
+        self.written += len(rows)
+        self.batches += 1
+
+    async def _write(self, rows: List[Dict[str, Any]]):
+        """
+        Insert `rows`, splitting batches the database rejects.
+        Returns ([(rejected row, error)], rows left unwritten, transient error or None).
+        """
+        rejected: List[Tuple[Dict[str, Any], Exception]] = []
+        chunks = [rows]
+        while chunks:
+            chunk = chunks.pop()
+            try:
+                await self._insert(chunk)
+            except Exception as e:
+                if is_transient(e):
+                    chunks.append(chunk)
+                    return rejected, [row for c in reversed(chunks) for row in c], e
+                if len(chunk) == 1:
+                    rejected.append((chunk[0], e))
+                else:
+                    middle = len(chunk) // 2
+                    chunks += [chunk[middle:], chunk[:middle]]
+                continue
+            if self._attempts:
+                for row in chunk:
+                    self._attempts.pop(id(row), None)
+        return rejected, [], None
+
+    async def flush(self):
+        async with self._lock:
+            retry = []
+            while self._buffer:
+                rows, self._buffer = self._buffer[:self.max_batch], self._buffer[self.max_batch:]
+                rejected, unwritten, error = await self._write(rows)
+                for row, e in rejected:
+                    attempts = self._attempts.pop(id(row), 0) + 1
+                    if attempts < self.max_attempts:
+                        self._attempts[id(row)] = attempts
+                        retry.append(row)
+                    else:
+                        self.dropped += 1
+                        logger.error(f"Dropping {self.name} row rejected {attempts} times: {e}")
+                if error is not None:
+                    # Keep the rows for the next attempt instead of losing them
+                    logger.error(f"Failed to write {len(unwritten)} {self.name} rows: {error}")
+                    self._buffer[:0] = unwritten + retry
+                    await asyncio.sleep(1)
+                    self._pending.set()
+                    return
+                if len(self._buffer) < self.max_buffer:
+                    self._room.set()
+            if retry:
+                # Rejected rows get another try with the next flush, not in a tight loop
+                self._buffer[:0] = retry
+                self._pending.set()
+        if self._on_flush is not None:
+            self._on_flush()
+
+    def stats(self) -> str:
+        per_batch = self.written / self.batches if self.batches else 0.0
+        return (f"{self.written} rows in {self.batches} batches ({per_batch:.0f}/batch), "
+                f"{len(self._buffer)} buffered, {self.dropped} dropped")
+
+    async def close(self):
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
@@ -0,0 +1,69 @@
+"""
+Micro-batching for the worker.
+
+Items are collected per key for a short window (or until a size cap) and
+handed to one coroutine as a batch: album parts, webhook events for one
+URL, notifications for one recipient. The window is per item: a batch is
+flushed when the shortest window among its items ends.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger("worker")
+
+
+class MicroBatcher:
+    def __init__(self, handler: Callable[[Hashable, List[Any]], Awaitable[None]],
+                 window: float = 0.005, max_size: int = 64):
+        self._handler = handler
+        self.window = window
+        self.max_size = max_size
+        self._pending: Dict[Hashable, List[Any]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        self._due: Dict[Hashable, float] = {}
+        self._tasks = set()
+
+    def submit(self, key: Hashable, item: Any, window: Optional[float] = None):
+        """Queue `item`, to be handled within `window` (default: the batcher's)."""
+        items = self._pending.get(key)
+        if items is None:
+            items = self._pending[key] = []
+        items.append(item)
+
+        if len(items) >= self.max_size:
+            self._flush(key)
+            return
+        loop = asyncio.get_running_loop()
+        due = loop.time() + (self.window if window is None else window)
+        # A shorter window joining a batch brings the whole batch forward
+        if key not in self._timers or due < self._due[key]:
+            timer = self._timers.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+            self._timers[key] = loop.call_at(due, self._flush, key)
+            self._due[key] = due
+
+    def _flush(self, key: Hashable):
+        timer = self._timers.pop(key, None)
+        self._due.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        items = self._pending.pop(key, None)
+        if items:
+            task = asyncio.create_task(self._run(key, items))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: Hashable, items: List[Any]):
+        try:
+            await self._handler(key, items)
+        except Exception as e:
+            logger.error(f"Batch handler failed for {key} ({len(items)} items): {e}")
+
+    async def drain(self):
+        """Flush everything pending and wait for running batches."""
+        for key in list(self._pending):
+            self._flush(key)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
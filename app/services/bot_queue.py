@@ -0,0 +1,260 @@
+"""
+Central send queue for the notification bot.
+
+Telegram limits bots globally (~30 msg/s) and per chat (~1 msg/s, ~20/min
+in groups). All notification sends go through one scheduler that paces
+them with a global token bucket and a bucket per chat, so a burst for one
+user cannot starve the others or trip the limits. A FloodWait from Telegram
+parks the chat for the requested time and the message is retried; it is
+never dropped.
+
+Each send runs as its own task once both buckets allow it, up to
+`concurrency` at a time: throughput is not capped at one message per
+round trip, and a slow chat holds one slot instead of the whole queue.
+A chat still has at most one message in flight, so its messages keep
+their order. Chats with nothing pending are forgotten once their bucket
+has refilled.
+
+Chats with pending messages are scheduled in two heaps keyed by the time
+their bucket allows the next send. The first message to an idle chat goes
+to the priority heap, so the first alert of a burst is not stuck behind
+other chats' backlogs.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Type
+
+logger = logging.getLogger("worker")
+
+_PRUNE_INTERVAL = 60.0  # seconds between sweeps for idle chats
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available (0 = now)."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _Chat:
+    __slots__ = ("bucket", "pending", "paused_until", "scheduled")
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.pending = deque()  # (text, future, enqueued_at, priority)
+        self.paused_until = 0.0  # FloodWait
+        self.scheduled = False  # in a heap, or its first message is being sent
+
+
+class BotSendQueue:
+    def __init__(self, send: Callable[[int, str], Awaitable[None]],
+                 flood_error: Tuple[Type[BaseException], ...] = (),
+                 global_rate: float = 25.0, chat_rate: float = 1.0, chat_burst: int = 3,
+                 group_rate: float = 20 / 60, concurrency: int = 10):
+        self._send = send
+        self._flood_error = flood_error
+        self._global = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+
+        self._chats: Dict[int, _Chat] = {}
+        self._priority = []  # (ready_at, seq, chat_id)
+        self._normal = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._slots = asyncio.Semaphore(concurrency)
+        self._sending = set()
+        self._prune_at = time.monotonic() + _PRUNE_INTERVAL
+
+        # Metrics
+        self.depth = 0
+        self.sent = 0
+        self.failed = 0
+        self.flood_waits = 0
+        self._waits = deque(maxlen=1000)
+
+    def _chat(self, chat_id: int) -> _Chat:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            # Groups/channels have a much lower per-chat limit than private chats
+            if chat_id < 0:
+                bucket = TokenBucket(self.group_rate, 1)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            chat = self._chats[chat_id] = _Chat(bucket)
+        return chat
+
+    def _schedule(self, chat_id: int, chat: _Chat, now: float):
+        ready_at = max(now + chat.bucket.delay(now), chat.paused_until)
+        heap = self._priority if chat.pending[0][3] else self._normal
+        heapq.heappush(heap, (ready_at, next(self._seq), chat_id))
+        chat.scheduled = True
+        self._wakeup.set()
+
+    async def send(self, chat_id: int, text: str, priority: Optional[bool] = None) -> bool:
+        """Queue a message and wait until it is delivered (True) or failed."""
+        self._ensure_started()
+        now = time.monotonic()
+        chat = self._chat(chat_id)
+        if priority is None:
+            # First alert to a quiet chat jumps the line; bursts queue normally
+            priority = not chat.pending and chat.bucket.full(now)
+
+        future = asyncio.get_running_loop().create_future()
+        chat.pending.append((text, future, now, priority))
+        self.depth += 1
+        if not chat.scheduled:
+            self._schedule(chat_id, chat, now)
+        return await future
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def _next_chat(self, now: float):
+        """(chat_id, 0) to send now, or (None, seconds to wait)."""
+        for heap in (self._priority, self._normal):
+            if heap and heap[0][0] <= now:
+                _, _, chat_id = heapq.heappop(heap)
+                return chat_id, 0.0
+        tops = [heap[0][0] for heap in (self._priority, self._normal) if heap]
+        return None, (min(tops) - now if tops else None)
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            if now >= self._prune_at:
+                self._prune(now)
+            chat_id, wait = self._next_chat(now)
+            if chat_id is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(
+                        self._prune_at - now, wait if wait is not None else _PRUNE_INTERVAL))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            chat = self._chats[chat_id]
+            text, future, enqueued_at, _ = chat.pending[0]
+            if future.cancelled():
+                # The sender gave up waiting (outbox delivery timeout) and will retry
+                chat.scheduled = False
+                chat.pending.popleft()
+                self.depth -= 1
+                if chat.pending:
+                    self._schedule(chat_id, chat, time.monotonic())
+                continue
+
+            await self._slots.acquire()
+            global_delay = self._global.delay(time.monotonic())
+            if global_delay > 0:
+                await asyncio.sleep(global_delay)
+            now = time.monotonic()
+            self._global.take(now)
+            chat.bucket.take(now)
+            task = asyncio.create_task(self._deliver(chat_id, chat, text, future, enqueued_at))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _deliver(self, chat_id: int, chat: _Chat, text: str, future, enqueued_at: float):
+        """Send a chat's first pending message; the chat stays scheduled until this ends."""
+        try:
+            await self._send(chat_id, text)
+        except self._flood_error as e:
+            # Delay, don't drop: park the chat and retry the same message
+            seconds = getattr(e, "seconds", 1) or 1
+            self.flood_waits += 1
+            chat.paused_until = time.monotonic() + seconds
+            logger.warning(f"Bot FloodWait for chat {chat_id}: retrying in {seconds}s")
+            self._schedule(chat_id, chat, time.monotonic())
+        except Exception as e:
+            logger.error(f"Failed to send bot message to {chat_id}: {e}")
+            self._finish(chat_id, chat, future, enqueued_at, False)
+        else:
+            self._finish(chat_id, chat, future, enqueued_at, True)
+        finally:
+            self._slots.release()
+
+    def _finish(self, chat_id: int, chat: _Chat, future, enqueued_at: float, ok: bool):
+        chat.scheduled = False
+        chat.pending.popleft()
+        self.depth -= 1
+        now = time.monotonic()
+        if ok:
+            self.sent += 1
+            self._waits.append(now - enqueued_at)
+        else:
+            self.failed += 1
+        if not future.done():
+            future.set_result(ok)
+        if chat.pending:
+            self._schedule(chat_id, chat, now)
+
+    def _prune(self, now: float):
+        """Forget idle chats whose bucket is full again; a new entry starts full anyway."""
+        idle = [
+            chat_id for chat_id, chat in self._chats.items()
+            if not chat.scheduled and not chat.pending and chat.paused_until <= now and chat.bucket.full(now)
+        ]
+        for chat_id in idle:
+            del self._chats[chat_id]
+        self._prune_at = now + _PRUNE_INTERVAL
+
+    def metrics(self) -> Dict[str, float]:
+        waits = sorted(self._waits)
+        pick = lambda q: waits[min(len(waits) - 1, int(q * len(waits)))] if waits else 0.0
+        return {
+            "depth": self.depth,
+            "chats_waiting": len(self._priority) + len(self._normal),
+            "in_flight": len(self._sending),
+            "chats": len(self._chats),
+            "sent": self.sent,
+            "failed": self.failed,
+            "flood_waits": self.flood_waits,
+            "wait_p50": pick(0.5),
+            "wait_p95": pick(0.95),
+            "wait_max": waits[-1] if waits else 0.0,
+        }
+
+    def stats(self) -> str:
+        m = self.metrics()
+        return (f"depth {m['depth']} ({m['chats_waiting']} chats), {m['in_flight']} in flight, "
+                f"{m['chats']} chats tracked, sent {m['sent']}, failed {m['failed']}, "
+                f"flood waits {m['flood_waits']}, wait p50 {m['wait_p50'] * 1000:.0f} ms / "
+                f"p95 {m['wait_p95'] * 1000:.0f} ms / max {m['wait_max'] * 1000:.0f} ms")
+
+    async def close(self):
+        """Wait for queued messages (bounded by the caller), then stop the consumer."""
+        while self.depth and self._task is not None and not self._task.done():
+            await asyncio.sleep(0.1)
+        if self._task is not None:
+            self._task.cancel()
+        for task in list(self._sending):
+            task.cancel()
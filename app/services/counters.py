@@ -0,0 +1,74 @@
+"""
+Coalesced per-alert counters.
+
+Hits are counted in memory and written every few seconds as one set-based
+statement:
+
+    UPDATE alerts SET trigger_count = alerts.trigger_count + deltas.trigger_count, ...
+    FROM (VALUES (:id, :n, ...), ...) AS deltas (id, trigger_count, ...)
+    WHERE alerts.id = deltas.id
+
+The increment happens in the database, so concurrent workers never lose
+each other's hits, and a storm costs one round trip per flush instead of a
+read-modify-write per match.
+"""
+import logging
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import Integer, column, update, values
+
+from app.db.session import engine, AsyncSession
+
+logger = logging.getLogger("worker")
+
+_MAX_ROWS = 1000  # per statement, to bound the number of bind parameters
+
+
+class AlertCounters:
+    def __init__(self, table, columns: Sequence[str]):
+        self.table = table
+        self.columns = tuple(columns)
+        self._deltas: Dict[Any, List[int]] = {}
+        self.flushed = 0
+
+    def add(self, alert_id, column_name: str, n: int = 1):
+        deltas = self._deltas.get(alert_id)
+        if deltas is None:
+            deltas = self._deltas[alert_id] = [0] * len(self.columns)
+        deltas[self.columns.index(column_name)] += n
+
+    def _restore(self, deltas: Dict[Any, List[int]]):
+        for alert_id, row in deltas.items():
+            for name, n in zip(self.columns, row):
+                if n:
+                    self.add(alert_id, name, n)
+
+    def statement(self, rows: List[tuple]):
+        c = self.table.c
+        deltas = values(
+            column("id", c.id.type), *(column(name, Integer) for name in self.columns), name="deltas"
+        ).data(rows)
+        return (
+            update(self.table)
+            .where(c.id == deltas.c.id)
+            .values({name: c[name] + deltas.c[name] for name in self.columns})
+        )
+
+    async def flush(self):
+        pending, self._deltas = self._deltas, {}
+        if not pending:
+            return
+        rows = [(alert_id, *row) for alert_id, row in pending.items()]
+        try:
+            async with AsyncSession(engine) as session:
+                for i in range(0, len(rows), _MAX_ROWS):
+                    await session.execute(self.statement(rows[i:i + _MAX_ROWS]))
+                await session.commit()
+            self.flushed += len(rows)
+        except Exception as e:
+            # Counted again with the next flush
+            self._restore(pending)
+            logger.error(f"Failed to save counters for {len(rows)} alerts: {e}")
+
+    def stats(self) -> str:
+        return f"{len(self._deltas)} alerts pending, {self.flushed} alert updates written"
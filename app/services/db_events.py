@@ -0,0 +1,99 @@
+"""
+Postgres LISTEN/NOTIFY helpers.
+
+The API and the bot commands publish a notification when data the worker
+caches changes; the worker listens and refreshes only what is affected.
+NOTIFY is transactional, so call the publish helpers before `commit()`.
+"""
+import asyncio
+import logging
+from typing import Callable, Dict
+
+from sqlalchemy import text
+
+from app.db.session import engine
+
+logger = logging.getLogger("worker")
+
+ALERTS_CHANNEL = "teleguard_alerts_changed"
+TARGETS_CHANNEL = "teleguard_targets_changed"
+SESSIONS_CHANNEL = "teleguard_sessions_changed"
+
+
+async def publish(session, channel: str, payload: str):
+    """Queue a NOTIFY on the session's transaction (delivered on commit)."""
+    await session.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": channel, "payload": payload}
+    )
+
+
+async def notify_alerts_changed(session, user_id):
+    await publish(session, ALERTS_CHANNEL, str(user_id))
+
+
+async def notify_targets_changed(session, user_id):
+    """The user's email / bot chat / linked Telegram account changed."""
+    await publish(session, TARGETS_CHANNEL, str(user_id))
+
+
+async def notify_session_changed(session, user_id):
+    """The user's Telegram session was created, replaced or deactivated."""
+    await publish(session, SESSIONS_CHANNEL, str(user_id))
+
+
+class ChangeListener:
+    """
+    Holds one dedicated connection with LISTEN on the registered channels.
+    Callbacks receive the payload string and must not block.
+    Connection drops are retried; poolers in transaction mode do not deliver
+    notifications, so callers should keep a polling fallback.
+    """
+
+    def __init__(self, retry_interval: float = 5.0):
+        self.retry_interval = retry_interval
+        self._callbacks: Dict[str, Callable[[str], None]] = {}
+        self._task = None
+
+    def on(self, channel: str, callback: Callable[[str], None]):
+        self._callbacks[channel] = callback
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    def _dispatch(self, connection, pid, channel, payload):
+        callback = self._callbacks.get(channel)
+        if not callback:
+            return
+        try:
+            callback(payload)
+        except Exception as e:
+            logger.error(f"Change listener callback failed for {channel}: {e}")
+
+    async def _run(self):
+        while True:
+            raw = None
+            try:
+                raw = await engine.raw_connection()
+                conn = raw.driver_connection
+                for channel in self._callbacks:
+                    await conn.add_listener(channel, self._dispatch)
+                logger.info(f"Listening for changes on: {', '.join(self._callbacks)}")
+
+                # asyncpg delivers notifications on its own; just watch the socket
+                while not conn.is_closed():
+                    await asyncio.sleep(self.retry_interval)
+                logger.warning("Change listener connection closed. Reconnecting...")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Change listener failed: {e}")
+            finally:
+                if raw is not None:
+                    try:
+                        raw.invalidate()
+                    except Exception:
+                        pass
+            await asyncio.sleep(self.retry_interval)
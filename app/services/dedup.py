@@ -0,0 +1,153 @@
+"""
+Per-tenant message de-duplication.
+
+Each tenant gets its own bounded FIFO/TTL window of recently seen messages,
+so two users in the same channel both get the message, and eviction is one
+entry at a time instead of clearing everything at once.
+
+A window is a packed ring (8-byte key + 4-byte timestamp per entry) rather
+than a set of int objects, which cost over 100 bytes an entry. Lookups go
+through an open-addressing table of 2-byte slot numbers next to the ring,
+so they take constant time; about 4 KiB per tenant at the 256-entry default.
+"""
+import sys
+import time
+from array import array
+from typing import Dict
+
+_MASK64 = (1 << 64) - 1
+
+
+def message_key(chat_id: int, msg_id: int) -> int:
+    """Pack (chat_id, msg_id) into one int; Telegram message ids are 32-bit."""
+    return (chat_id << 32) | (msg_id & 0xFFFFFFFF)
+
+
+def _packed_key(chat_id: int, msg_id: int) -> int:
+    """
+    message_key folded into an unsigned 64-bit slot (channel ids need more than
+    32 bits). Folding is lossless for chat ids below 2**32; beyond that two
+    keys only collide for chats whose ids differ by a multiple of 2**32.
+    """
+    key = message_key(chat_id, msg_id)
+    # Multiplying by an odd constant is a bijection mod 2**64; it mixes the
+    # chat and message ids into the high bits, which index the table
+    return ((key ^ (key >> 64)) * 0x9E3779B97F4A7C15) & _MASK64
+
+
+class _Window:
+    """
+    Ring of packed keys + insertion times (whole seconds), indexed by a
+    linear-probing table of slot + 1 (0 = empty). A key is indexed once.
+    """
+
+    __slots__ = ("keys", "stamps", "head", "table", "shift", "mask")
+
+    def __init__(self, capacity: int):
+        self.keys = array("Q")
+        self.stamps = array("I")
+        self.head = 0  # oldest slot once the ring is full
+        bits = (2 * capacity - 1).bit_length()  # load factor <= 1/2
+        self.table = array("H" if capacity < 0xFFFF else "I", [0]) * (1 << bits)
+        self.shift = 64 - bits
+        self.mask = (1 << bits) - 1
+
+    def __len__(self):
+        return len(self.stamps)
+
+    def find(self, key: int) -> int:
+        """Slot of `key`, or -1."""
+        table, keys, mask = self.table, self.keys, self.mask
+        i = key >> self.shift
+        while True:
+            slot = table[i]
+            if not slot:
+                return -1
+            if keys[slot - 1] == key:
+                return slot - 1
+            i = (i + 1) & mask
+
+    def link(self, slot: int):
+        table, mask = self.table, self.mask
+        i = self.keys[slot] >> self.shift
+        while table[i]:
+            i = (i + 1) & mask
+        table[i] = slot + 1
+
+    def unlink(self, slot: int):
+        """Drop the table entry pointing at `slot`, if any (backward-shift deletion)."""
+        table, keys, mask, shift = self.table, self.keys, self.mask, self.shift
+        i = keys[slot] >> shift
+        while table[i] != slot + 1:
+            if not table[i]:
+                return
+            i = (i + 1) & mask
+        table[i] = 0
+        j = i
+        while True:
+            j = (j + 1) & mask
+            other = table[j]
+            if not other:
+                return
+            # Move an entry back into the hole unless its home lies after it
+            home = keys[other - 1] >> shift
+            if (j - home) & mask >= (j - i) & mask:
+                table[i] = other
+                table[j] = 0
+                i = j
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.keys) + sys.getsizeof(self.stamps) + sys.getsizeof(self.table)
+
+
+class TenantDedupCache:
+    def __init__(self, max_entries: int = 256, ttl: float = 900.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._epoch = time.monotonic()  # stamps are whole seconds since this
+        self._tenants: Dict[str, _Window] = {}
+
+    def seen(self, tenant: str, chat_id: int, msg_id: int) -> bool:
+        """Record the message; True if the tenant already saw it within the TTL."""
+        window = self._tenants.get(tenant)
+        if window is None:
+            window = self._tenants[tenant] = _Window(self.max_entries)
+
+        now = int(time.monotonic() - self._epoch)
+        key = _packed_key(chat_id, msg_id)
+        i = window.find(key)
+        if i >= 0:
+            if now - window.stamps[i] < self.ttl:
+                return True
+            # Expired: seen anew. Re-appended, so it is evicted last; the old
+            # slot stays unindexed until the ring comes round to it
+            window.unlink(i)
+
+        if len(window) < self.max_entries:
+            window.keys.append(key)
+            window.stamps.append(now)
+            window.link(len(window) - 1)
+        else:
+            # Full: overwrite the oldest entry
+            head = window.head
+            window.unlink(head)
+            window.keys[head] = key
+            window.stamps[head] = now
+            window.link(head)
+            window.head = (head + 1) % self.max_entries
+        return False
+
+    def discard(self, tenant: str):
+        self._tenants.pop(tenant, None)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Approximate bytes held per tenant."""
+        return {tenant: window.nbytes() for tenant, window in self._tenants.items()}
+
+    def stats(self) -> str:
+        usage = self.memory_usage()
+        entries = sum(len(w) for w in self._tenants.values())
+        total = sum(usage.values())
+        per_tenant = total // len(usage) if usage else 0
+        return (f"{len(usage)} tenants, {entries} entries, "
+                f"{total / 1024:.1f} KiB total, {per_tenant / 1024:.1f} KiB/tenant")
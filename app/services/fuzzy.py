@@ -0,0 +1,107 @@
+"""
+Approximate keyword search (Myers' bit-parallel edit distance).
+
+A `FuzzyPattern` finds the pattern anywhere in a text with at most
+`distance` insertions, deletions or substitutions ("bitcoln", "urg3nt").
+The whole pattern column of the dynamic-programming table is kept as bit
+vectors, so the search is one pass over the text with a handful of integer
+operations per character, independent of the distance budget.
+
+The scan is still far more expensive per character than the Aho-Corasick
+automaton, so it is only run where it can succeed: if a pattern occurs with
+k errors, at least one of k + 1 disjoint pieces of it occurs exactly
+(`pieces()`). The matcher adds those pieces to its automaton and only
+verifies rules whose pieces were hit, and `search` only scans short windows
+around the piece occurrences instead of the whole text.
+"""
+from typing import Dict, List
+
+
+class FuzzyPattern:
+    __slots__ = ("pattern", "distance", "_peq", "_mask", "_high", "_pieces")
+
+    def __init__(self, pattern: str, distance: int):
+        if not pattern:
+            raise ValueError("Empty fuzzy pattern")
+        self.pattern = pattern
+        self.distance = distance
+
+        # Per character: the positions where it occurs in the pattern
+        peq: Dict[str, int] = {}
+        for i, ch in enumerate(pattern):
+            peq[ch] = peq.get(ch, 0) | (1 << i)
+        self._peq = peq
+        self._mask = (1 << len(pattern)) - 1
+        self._high = 1 << (len(pattern) - 1)
+
+        # (piece, offset in the pattern)
+        parts = distance + 1
+        size = len(pattern) // parts
+        if size == 0:
+            self._pieces = [(ch, i) for i, ch in enumerate(pattern)]
+        else:
+            bounds = [i * size for i in range(parts)] + [len(pattern)]
+            self._pieces = [(pattern[bounds[i]:bounds[i + 1]], bounds[i]) for i in range(parts)]
+
+    def pieces(self) -> List[str]:
+        """k + 1 disjoint substrings; any approximate occurrence contains one exactly."""
+        return [piece for piece, _ in self._pieces]
+
+    def search(self, text: str) -> bool:
+        """Whether the pattern occurs in `text` within the distance budget."""
+        if len(self.pattern) <= self.distance:
+            return True
+        # An occurrence containing piece j at position p starts within k of
+        # p - offset_j, so only those windows need the bit-parallel scan.
+        k = self.distance
+        length = len(self.pattern)
+        windows = []
+        for piece, offset in self._pieces:
+            pos = text.find(piece)
+            while pos != -1:
+                start = max(pos - offset - k, 0)
+                windows.append((start, pos - offset + length + k))
+                pos = text.find(piece, pos + 1)
+        if not windows:
+            return False
+
+        windows.sort()
+        start, end = windows[0]
+        for w_start, w_end in windows[1:]:
+            if w_start > end:
+                if self.scan(text[start:end]):
+                    return True
+                start = w_start
+            end = max(end, w_end)
+        return self.scan(text[start:end])
+
+    def scan(self, text: str) -> bool:
+        """The bit-parallel pass over all of `text`, without the piece filter."""
+        peq = self._peq
+        mask = self._mask
+        high = self._high
+        k = self.distance
+
+        vp = mask
+        vn = 0
+        score = len(self.pattern)
+        if score <= k:
+            return True
+        for ch in text:
+            eq = peq.get(ch, 0)
+            xv = eq | vn
+            xh = (((eq & vp) + vp) ^ vp) | eq
+            ph = vn | (~(xh | vp) & mask)
+            mh = vp & xh
+            if ph & high:
+                score += 1
+            elif mh & high:
+                score -= 1
+                if score <= k:
+                    return True
+            # Search variant: the top row stays 0 (a match may start anywhere)
+            ph = (ph << 1) & mask
+            mh = (mh << 1) & mask
+            vp = mh | (~(xv | ph) & mask)
+            vn = ph & xv
+        return False
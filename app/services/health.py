@@ -0,0 +1,170 @@
+"""
+Health checks for the worker's Telegram clients.
+
+Every client is looked at every `check_interval` seconds (jittered, so
+5000 sessions do not all come due together): the cheap `check` (socket
+still connected?) runs each time, the RPC `probe` only when the client has
+shown no sign of life for its probe interval. Incoming updates count as a
+sign of life (`touch`), so busy clients are never probed; each healthy
+probe doubles the interval up to `max_probe_interval`. Probes run
+concurrently, at most `concurrency` at once, each bounded by `timeout`.
+
+A failed check or probe hands the client to `recover` and resets its
+probe interval.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger("worker")
+
+
+class _State:
+    __slots__ = ("last_alive", "probed_at", "probe_interval", "busy")
+
+    def __init__(self, now: float, probe_interval: float):
+        self.last_alive = now
+        self.probed_at = now
+        self.probe_interval = probe_interval
+        self.busy = False  # probe or recovery running
+
+
+class HealthScheduler:
+    def __init__(self, check: Callable[[Hashable], bool], probe: Callable[[Hashable], Awaitable[None]],
+                 recover: Callable[[Hashable, Exception], Awaitable[None]],
+                 check_interval: float = 5.0, min_probe_interval: float = 15.0,
+                 max_probe_interval: float = 60.0, timeout: float = 5.0, concurrency: int = 50):
+        self._check = check
+        self._probe = probe
+        self._recover = recover
+        self.check_interval = check_interval
+        self.min_probe_interval = min_probe_interval
+        self.max_probe_interval = max_probe_interval
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(concurrency)
+        self._states: Dict[Hashable, _State] = {}
+        self._heap = []  # (due_at, seq, key)
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._tasks = set()
+        self._task = None
+        self.checks = 0
+        self.probes = 0
+        self.skipped = 0  # probes saved by recent activity
+        self.failures = 0
+
+    def __contains__(self, key):
+        return key in self._states
+
+    def __len__(self):
+        return len(self._states)
+
+    def add(self, key: Hashable):
+        if key in self._states:
+            return
+        now = time.monotonic()
+        self._states[key] = _State(now, self.min_probe_interval)
+        # Spread first checks over one interval
+        self._push(key, now + random.uniform(0, self.check_interval))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def discard(self, key: Hashable):
+        self._states.pop(key, None)  # its heap entry is dropped when it comes due
+
+    def touch(self, key: Hashable):
+        """The client received an update: it is alive, no probe needed."""
+        state = self._states.get(key)
+        if state is not None:
+            state.last_alive = time.monotonic()
+
+    def _push(self, key: Hashable, due_at: float):
+        heapq.heappush(self._heap, (due_at, next(self._seq), key))
+        self._wakeup.set()
+
+    def _reschedule(self, key: Hashable, state: _State):
+        # Not if the client was removed (or removed and re-added) meanwhile
+        if self._states.get(key) is state:
+            self._push(key, time.monotonic() + self.check_interval * random.uniform(0.8, 1.2))
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, key = heapq.heappop(self._heap)
+                self._due(key, now)
+            wait = self._heap[0][0] - now if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def _due(self, key: Hashable, now: float):
+        state = self._states.get(key)
+        if state is None or state.busy:
+            return
+        self.checks += 1
+        try:
+            healthy = self._check(key)
+        except Exception:
+            healthy = False
+        if not healthy:
+            self._spawn(key, state, self._fail(key, state, ConnectionError("client is not connected")))
+        elif now - state.last_alive >= state.probe_interval:
+            self._spawn(key, state, self._run_probe(key, state))
+        else:
+            if now - state.probed_at >= state.probe_interval:
+                # A probe was due, but recent updates already prove the connection
+                self.skipped += 1
+                state.probed_at = now
+                state.probe_interval = min(self.max_probe_interval, state.probe_interval * 2)
+            self._reschedule(key, state)
+
+    def _spawn(self, key: Hashable, state: _State, coro):
+        state.busy = True
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_probe(self, key: Hashable, state: _State):
+        async with self._slots:
+            self.probes += 1
+            try:
+                await asyncio.wait_for(self._probe(key), timeout=self.timeout)
+                error = None
+            except Exception as e:
+                error = e
+        if error is not None:
+            # Recovery runs outside the probe slots (it may wait for a reconnect slot)
+            await self._fail(key, state, ConnectionError(f"Heartbeat failed: {error!r}"))
+            return
+        state.last_alive = state.probed_at = time.monotonic()
+        state.probe_interval = min(self.max_probe_interval, state.probe_interval * 2)
+        state.busy = False
+        self._reschedule(key, state)
+
+    async def _fail(self, key: Hashable, state: _State, error: Exception):
+        self.failures += 1
+        try:
+            await self._recover(key, error)
+        except Exception as e:
+            logger.error(f"Recovery of {key} failed: {e}")
+        state.last_alive = state.probed_at = time.monotonic()
+        state.probe_interval = self.min_probe_interval
+        state.busy = False
+        self._reschedule(key, state)
+
+    def stats(self) -> str:
+        return (f"{len(self._states)} clients, {self.checks} checks, {self.probes} probes "
+                f"({self.skipped} skipped for recent activity), {self.failures} failures")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        for task in list(self._tasks):
+            task.cancel()
@@ -0,0 +1,454 @@
+"""
+Alert matching engine.
+
+Rules are compiled once per user (lowercased keywords, exclusions, regexes)
+so the message hot path only does in-memory work. All plain keywords and
+exclusions of a user share one Aho-Corasick automaton, so a message is
+scanned once no matter how many keywords the user has. Regex alerts are
+likewise merged into one alternation with a named group per pattern.
+Fuzzy alerts put pieces of their keywords into the same automaton and only
+run the approximate search (see fuzzy) when a piece was found. Alerts on a
+sender without keywords never touch the text: they are looked up by sender
+id in a hash index.
+
+The module has no database or Telegram dependencies. Public API:
+
+    rules = RuleSet(alerts, guard_cost=None) # any objects with the Alert fields
+    rules.covers(chat_id) -> bool            # could anything fire in this chat?
+    rules.match(text, chat_id, sender_id=..., sender_username=..., guarded=[]) -> [Match]
+    rules.needs_username(chat_id) -> bool    # any username condition here?
+    rules.patterns() -> set                  # lowered keywords, for shared scans
+    rules.alert(alert_id) -> alert or None   # the object a rule was built from
+
+Rules read `id`, `source_id`, `keywords`, `excluded_keywords`, `is_regex` and
+(optionally) `fuzzy_distance`, `sender_ids` and `sender_usernames`.
+Matches come back in the order the alerts were given.
+
+With `guard_cost`, regex rules whose static cost reaches it are not run by
+`match`; the worker passes 0, guarding all. Those that may fire on a
+message (one of their required literals is in it, or they have none) are
+appended to the `guarded` list instead, for the caller to run under a time
+budget (see regex_guard).
+"""
+import logging
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from app.services.aho_corasick import AhoCorasick
+from app.services.fuzzy import FuzzyPattern
+from app.services.regex_guard import literals_apply, patterns_cost, required_literals
+
+logger = logging.getLogger("worker")
+
+# Constructs that break when a pattern is embedded in a larger alternation
+# (group numbers shift, group names collide, conditionals refer to groups).
+_UNCOMBINABLE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(|\(\?P<")
+
+
+class Match(NamedTuple):
+    alert: Any
+    trigger: str
+
+
+def normalize_username(username: str) -> str:
+    """'@SomeBot' -> 'somebot'; Telegram usernames are case-insensitive."""
+    return username.strip().lstrip("@").lower()
+
+
+def compile_pattern(pattern: str):
+    """Compile a user pattern the way the matcher runs it. Raises re.error."""
+    return re.compile(pattern, re.IGNORECASE)
+
+
+class CompiledRule:
+    """An Alert with its match inputs pre-processed."""
+
+    __slots__ = ("alert", "source_id", "keywords", "excluded", "is_regex", "patterns", "guarded", "fuzzy",
+                 "sender_ids", "sender_usernames")
+
+    def __init__(self, alert: Any, guard_cost: int = None):
+        self.alert = alert
+        self.source_id = alert.source_id
+        self.is_regex = bool(alert.is_regex)
+        self.keywords = [kw for kw in (alert.keywords or []) if kw]
+        self.excluded = [exc.lower() for exc in (alert.excluded_keywords or []) if exc]
+        self.patterns = []
+        self.guarded = False
+        self.fuzzy: List[FuzzyPattern] = []
+        self.sender_ids = frozenset(getattr(alert, "sender_ids", None) or ())
+        self.sender_usernames = frozenset(
+            normalize_username(u) for u in (getattr(alert, "sender_usernames", None) or ()) if u
+        )
+
+        if self.is_regex:
+            for pat in self.keywords:
+                try:
+                    self.patterns.append((pat, compile_pattern(pat)))
+                except re.error as e:
+                    # Reported once at compile time instead of on every message
+                    logger.error(f"Invalid Regex {pat} in alert {alert.id}: {e}")
+            if guard_cost is not None and self.patterns:
+                self.guarded = patterns_cost([pat for pat, _ in self.patterns]) >= guard_cost
+        else:
+            distance = getattr(alert, "fuzzy_distance", 0) or 0
+            if distance > 0:
+                self.fuzzy = [FuzzyPattern(kw.lower(), distance) for kw in self.keywords]
+
+    @property
+    def has_sender(self) -> bool:
+        return bool(self.sender_ids or self.sender_usernames)
+
+    @property
+    def sender_only(self) -> bool:
+        """Fires on any message of the sender; the text is never scanned."""
+        return self.has_sender and not self.keywords
+
+    def sender_matches(self, sender_id, sender_username) -> bool:
+        return sender_id in self.sender_ids or (
+            sender_username is not None and sender_username in self.sender_usernames
+        )
+
+    def is_excluded(self, text_lower: str) -> bool:
+        return any(exc in text_lower for exc in self.excluded)
+
+    def match_regex(self, message_text: str, stop: Optional[int] = None):
+        """First pattern (in the alert's order, before `stop`) found in the text."""
+        for pat, compiled in self.patterns[:stop]:
+            if compiled.search(message_text):
+                return pat
+        return None
+
+
+class RegexSet:
+    """
+    The regex rules of one user merged into a single alternation.
+
+    Every pattern becomes a named group `r<rule>_<pattern>`, so one scan
+    reports which alert fired. Capturing groups make `re` noticeably slower
+    though, so messages are first screened with the same alternation
+    without groups; only hits pay for the named scan.
+    Patterns that cannot be embedded safely are searched on their own.
+    """
+
+    def __init__(self, rules: List[CompiledRule], indexes: List[int]):
+        self._names: Dict[str, Tuple[int, int]] = {}
+        self._combined_rules = set()
+        self.standalone: List[int] = []
+
+        branches = []
+        plain = []
+        for ri in indexes:
+            rule = rules[ri]
+            parts = []
+            for pi, (pat, compiled) in enumerate(rule.patterns):
+                if _UNCOMBINABLE.search(pat) or compiled.groupindex:
+                    parts = None
+                    break
+                name = f"r{ri}_{pi}"
+                parts.append((name, pi, pat))
+            if parts is None:
+                self.standalone.append(ri)
+                continue
+            for name, pi, pat in parts:
+                self._names[name] = (ri, pi)
+                branches.append(f"(?P<{name}>(?:{pat}))")
+                plain.append(f"(?:{pat})")
+            self._combined_rules.add(ri)
+
+        self._screen = None
+        self._combined = None
+        if branches:
+            try:
+                self._screen = compile_pattern("|".join(plain))
+                self._combined = compile_pattern("|".join(branches))
+            except re.error:
+                # e.g. inline global flags in the middle of the expression
+                self.standalone.extend(sorted(self._combined_rules))
+                self._combined_rules = set()
+                self._names = {}
+                self._screen = None
+                self._combined = None
+
+    def match(self, rules: List[CompiledRule], message_text: str, skip) -> Dict[int, str]:
+        """rule index -> trigger for every regex rule not in `skip` that fires."""
+        fired: Dict[int, str] = {}
+        if self._screen is not None and self._screen.search(message_text):
+            found: Dict[int, int] = {}  # rule index -> lowest pattern index seen
+            for m in self._combined.finditer(message_text):
+                ri, pi = self._names[m.lastgroup]
+                if ri not in skip and pi < found.get(ri, pi + 1):
+                    found[ri] = pi
+            for ri, pi in found.items():
+                # The trigger is the alert's first matching pattern, which may
+                # occur later in the text than the one the scan hit first
+                fired[ri] = rules[ri].match_regex(message_text, stop=pi) or rules[ri].patterns[pi][0]
+            # Overlapping matches hide other alternatives; re-check the rest
+            # individually (only happens when something matched at all).
+            for ri in self._combined_rules:
+                if ri not in fired and ri not in skip:
+                    trigger = rules[ri].match_regex(message_text)
+                    if trigger is not None:
+                        fired[ri] = trigger
+
+        for ri in self.standalone:
+            if ri not in skip:
+                trigger = rules[ri].match_regex(message_text)
+                if trigger is not None:
+                    fired[ri] = trigger
+        return fired
+
+
+class RuleBucket:
+    """
+    The rules sharing one source filter, with their own keyword automaton
+    and regex set. Only buckets relevant to a chat are ever scanned.
+    """
+
+    def __init__(self, rules: List[CompiledRule], indexes: List[int]):
+        self.indexes = indexes
+
+        # pattern index -> [(rule index, keyword index)] / [rule index]
+        pattern_ids: Dict[str, int] = {}
+        self._keyword_hits: List[List[Tuple[int, int]]] = []
+        self._exclude_hits: List[List[int]] = []
+        self._fuzzy_hits: List[List[Tuple[int, int]]] = []
+        self._literal_hits: List[List[int]] = []
+        # Guarded rules with a pattern that has no required literal / the others
+        self._guarded_always: List[int] = []
+        self._guarded_literal: List[int] = []
+
+        def pattern_id(text: str) -> int:
+            pid = pattern_ids.get(text)
+            if pid is None:
+                pid = pattern_ids[text] = len(pattern_ids)
+                self._keyword_hits.append([])
+                self._exclude_hits.append([])
+                self._fuzzy_hits.append([])
+                self._literal_hits.append([])
+            return pid
+
+        for ri in indexes:
+            rule = rules[ri]
+            for exc in rule.excluded:
+                self._exclude_hits[pattern_id(exc)].append(ri)
+            if rule.guarded:
+                # Candidates for the pool only when a literal they need is present
+                literals = [required_literals(pat) for pat, _ in rule.patterns]
+                if None in literals:
+                    self._guarded_always.append(ri)
+                else:
+                    self._guarded_literal.append(ri)
+                    for literal in set().union(*literals):
+                        self._literal_hits[pattern_id(literal)].append(ri)
+            elif not rule.is_regex:
+                for ki, kw in enumerate(rule.keywords):
+                    self._keyword_hits[pattern_id(kw.lower())].append((ri, ki))
+                # Fuzzy candidates: any approximate occurrence contains a piece
+                for ki, fuzzy in enumerate(rule.fuzzy):
+                    for piece in fuzzy.pieces():
+                        self._fuzzy_hits[pattern_id(piece)].append((ri, ki))
+
+        self.pattern_ids = pattern_ids
+        self._automaton = AhoCorasick(pattern_ids) if pattern_ids else None
+        self._regex = RegexSet(rules, [ri for ri in indexes if rules[ri].patterns and not rules[ri].guarded])
+
+    def _pattern_hits(self, text_lower: str, hits):
+        if hits is None:
+            return self._automaton.find_all(text_lower)
+        # Patterns found by a shared scan; translate to our own indexes
+        ids = self.pattern_ids
+        if len(hits) < len(ids):
+            return [ids[p] for p in hits if p in ids]
+        return [pid for p, pid in ids.items() if p in hits]
+
+    def match(self, rules: List[CompiledRule], message_text: str, text_lower: str, hits=None,
+              guarded: list = None) -> Dict[int, str]:
+        """
+        rule index -> trigger for every rule of this bucket that fires.
+        `hits` optionally holds the lowered patterns present in the text,
+        from a scan shared with other tenants. Indexes of guarded rules
+        that may fire are appended to `guarded`.
+        """
+        excluded = set()
+        first_keyword: Dict[int, int] = {}
+        candidates: Dict[int, set] = {}
+        literal_hits = set()
+        if self._automaton is not None:
+            for pid in self._pattern_hits(text_lower, hits):
+                excluded.update(self._exclude_hits[pid])
+                literal_hits.update(self._literal_hits[pid])
+                for ri, ki in self._keyword_hits[pid]:
+                    # Report the first keyword in the alert's own order
+                    if ki < first_keyword.get(ri, ki + 1):
+                        first_keyword[ri] = ki
+                for ri, ki in self._fuzzy_hits[pid]:
+                    candidates.setdefault(ri, set()).add(ki)
+
+        fired = self._regex.match(rules, message_text, excluded)
+        for ri, ki in first_keyword.items():
+            if ri not in excluded:
+                fired[ri] = rules[ri].keywords[ki]
+        if candidates:
+            self._match_fuzzy(rules, text_lower, candidates, excluded, fired)
+        if guarded is not None:
+            if self._guarded_literal and not literals_apply(text_lower):
+                literal_hits = self._guarded_literal
+            guarded.extend(ri for ri in self._guarded_always if ri not in excluded)
+            guarded.extend(ri for ri in literal_hits if ri not in excluded)
+        return fired
+
+    @staticmethod
+    def _match_fuzzy(rules: List[CompiledRule], text_lower: str, candidates: Dict[int, set],
+                     excluded, fired: Dict[int, str]):
+        """Verify fuzzy candidates that did not already fire on an exact keyword."""
+        for ri, keyword_indexes in candidates.items():
+            if ri in fired or ri in excluded:
+                continue
+            rule = rules[ri]
+            for ki in sorted(keyword_indexes):
+                if rule.fuzzy[ki].search(text_lower):
+                    fired[ri] = rule.keywords[ki]
+                    break
+
+class RuleSet:
+    """
+    All active rules of one user, bucketed by `source_id`.
+
+    A message from chat X is only checked against X's bucket and the
+    "All Chats" bucket.
+    """
+
+    def __init__(self, alerts: List[Any], guard_cost: int = None):
+        self.rules = [CompiledRule(a, guard_cost) for a in alerts]
+        self._alerts = {rule.alert.id: rule.alert for rule in self.rules}
+
+        # Sender-only rules: sender id / username -> rule indexes
+        self._by_sender: Dict[int, List[int]] = {}
+        self._by_username: Dict[str, List[int]] = {}
+        # Text rules with a sender condition, checked after the text matched
+        self._sender_filtered = set()
+        # Chats with sender-only rules (None: all chats)
+        self._sender_sources = set()
+        # Chats with username conditions (None: all chats)
+        self._username_sources = set()
+
+        by_source: Dict[int, List[int]] = {}
+        global_indexes = []
+        for ri, rule in enumerate(self.rules):
+            if rule.sender_usernames:
+                self._username_sources.add(rule.source_id or None)
+            if rule.sender_only:
+                for sender_id in rule.sender_ids:
+                    self._by_sender.setdefault(sender_id, []).append(ri)
+                for username in rule.sender_usernames:
+                    self._by_username.setdefault(username, []).append(ri)
+                self._sender_sources.add(rule.source_id or None)
+                continue
+            if rule.has_sender:
+                self._sender_filtered.add(ri)
+            if rule.source_id:
+                by_source.setdefault(rule.source_id, []).append(ri)
+            else:
+                global_indexes.append(ri)
+
+        self._buckets: Dict[int, RuleBucket] = {
+            source_id: RuleBucket(self.rules, indexes) for source_id, indexes in by_source.items()
+        }
+        self._global = RuleBucket(self.rules, global_indexes) if global_indexes else None
+        # Set by the owner (AlertCache); shared scans older than this miss our patterns
+        self.generation = 0
+
+    def __len__(self):
+        return len(self.rules)
+
+    def covers(self, chat_id: int) -> bool:
+        """Whether any rule could fire for a message from this chat."""
+        return (self._global is not None or chat_id in self._buckets
+                or None in self._sender_sources or chat_id in self._sender_sources)
+
+    def needs_username(self, chat_id: int) -> bool:
+        """Whether matching in this chat needs the sender's username (an entity lookup)."""
+        return None in self._username_sources or chat_id in self._username_sources
+
+    def _match_sender(self, chat_id: int, text_lower, message_text: str,
+                      sender_id, sender_username, fired: Dict[int, str]):
+        """Sender-only rules: one dict lookup per message, no text scan."""
+        candidates = []
+        if sender_id is not None:
+            candidates.extend((ri, f"sender {sender_id}") for ri in self._by_sender.get(sender_id, ()))
+        if sender_username is not None:
+            candidates.extend((ri, f"@{sender_username}") for ri in self._by_username.get(sender_username, ()))
+        for ri, trigger in candidates:
+            rule = self.rules[ri]
+            if ri in fired or (rule.source_id and rule.source_id != chat_id):
+                continue
+            if rule.excluded:
+                if text_lower is None:
+                    text_lower = message_text.lower()
+                if rule.is_excluded(text_lower):
+                    continue
+            fired[ri] = trigger
+
+    def _check_senders(self, fired: Dict[int, str], sender_id, sender_username):
+        """Drop text matches whose alert also requires a sender that did not send this."""
+        for ri in self._sender_filtered.intersection(fired):
+            if not self.rules[ri].sender_matches(sender_id, sender_username):
+                del fired[ri]
+
+    def alert(self, alert_id) -> Optional[Any]:
+        return self._alerts.get(alert_id)
+
+    def patterns(self) -> set:
+        """All lowered keywords and exclusions, for shared automata."""
+        found = set()
+        for bucket in self._buckets.values():
+            found.update(bucket.pattern_ids)
+        if self._global is not None:
+            found.update(self._global.pattern_ids)
+        return found
+
+    def match(self, message_text: str, chat_id: int, scan=None,
+              sender_id: int = None, sender_username: str = None, guarded: list = None) -> List[Match]:
+        """
+        Return (alert, matched_trigger) for every rule that fires.
+        `scan` is an optional shared per-message result (see shared_scan)
+        carrying `text_lower`, `hits` and the `generation` it was built at.
+        `sender_username` is only consulted by username conditions.
+        Guarded rules that may fire (exclusions and sender conditions
+        checked) are appended to `guarded` as CompiledRules, in alert order.
+        """
+        if sender_username is not None:
+            sender_username = normalize_username(sender_username)
+        fired: Dict[int, str] = {}
+        if self._by_sender or self._by_username:
+            self._match_sender(chat_id, scan.text_lower if scan is not None else None,
+                               message_text, sender_id, sender_username, fired)
+
+        bucket = self._buckets.get(chat_id)
+        if bucket is None and self._global is None:
+            return [Match(self.rules[ri].alert, fired[ri]) for ri in sorted(fired)]
+
+        hits = None
+        if scan is not None:
+            text_lower = scan.text_lower
+            if scan.generation >= self.generation:
+                hits = scan.hits
+        else:
+            text_lower = message_text.lower()
+
+        candidates = [] if guarded is not None else None
+        if bucket is not None:
+            fired.update(bucket.match(self.rules, message_text, text_lower, hits, candidates))
+        if self._global is not None:
+            fired.update(self._global.match(self.rules, message_text, text_lower, hits, candidates))
+        if self._sender_filtered:
+            self._check_senders(fired, sender_id, sender_username)
+        if candidates:
+            for ri in sorted(candidates):
+                rule = self.rules[ri]
+                if ri in self._sender_filtered and not rule.sender_matches(sender_id, sender_username):
+                    continue
+                guarded.append(rule)
+
+        # Keep the alerts' own order for dispatch
+        return [Match(self.rules[ri].alert, fired[ri]) for ri in sorted(fired)]
@@ -0,0 +1,289 @@
+"""
+Durable notification outbox.
+
+The message handler only appends a row to an in-memory buffer; an
+`OutboxWriter` inserts buffered rows in batches, and an `OutboxDispatcher`
+runs a pool of tasks that claim due rows with FOR UPDATE SKIP LOCKED and
+deliver them. Slow SMTP no longer holds up Telethon handlers, a crash after
+the insert only delays an alert (the row's lease expires and another
+dispatcher picks it up), and more worker processes simply mean more
+dispatchers competing for rows.
+
+Rows carry an idempotency key (alert + message), so a message seen twice
+is inserted once, and per-channel flags, so a retry only re-sends the
+channels that failed.
+
+Each claim stamps its rows with a fresh `claim_token`, and a row's outcome
+is only written while the token is still there: a dispatcher whose lease
+ran out cannot overwrite the row another one has taken over. A delivery
+is cut off after `delivery_timeout` (at most half the lease), and the lease
+on the rest of a claimed batch is renewed before it could lapse.
+
+On shutdown a dispatcher stops claiming, lets deliveries in flight finish
+for a grace period, and hands every row it still holds back as pending, so
+a restart picks them up at once instead of after the lease.
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Set, Tuple
+from uuid import uuid4
+
+from sqlalchemy import case, or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import select
+
+from app.db.session import engine, AsyncSession
+from app.models import NotificationOutbox
+from app.services.batch_writer import BatchWriter
+
+logger = logging.getLogger("worker")
+
+_columns = NotificationOutbox.__table__.c
+_LEASE_MARGIN = 5.0  # seconds left on a lease for the final status update
+_ROW_DEFAULTS = {"status": "pending", "attempts": 0, "suppressed": 0, "email_done": False, "bot_done": False,
+                 "webhook_done": False}
+
+
+class OutboxResult(NamedTuple):
+    complete: bool  # every channel delivered (or handed to a digest)
+    email_done: bool
+    bot_done: bool
+    webhook_done: bool = False
+    error: str = None
+
+
+class OutboxWriter(BatchWriter):
+    """Buffers new outbox rows and inserts them in batches."""
+
+    def __init__(self, interval: float = 0.05, max_batch: int = 200, on_flush: Callable[[], None] = None):
+        super().__init__(NotificationOutbox.__table__, interval, max_batch, on_flush=on_flush, name="outbox")
+
+    def prepare(self, values):
+        values.setdefault("id", uuid4())
+        values.setdefault("created_at", datetime.utcnow())
+        values.setdefault("next_attempt_at", values["created_at"])
+        for column, default in _ROW_DEFAULTS.items():
+            values.setdefault(column, default)
+        return values
+
+    def statement(self):
+        # The same match queued twice (or by two workers) is inserted once
+        return pg_insert(self.table).on_conflict_do_nothing(index_elements=["idempotency_key"])
+
+
+class OutboxDispatcher:
+    def __init__(self, handler: Callable[[Any, bool], Awaitable[OutboxResult]], workers: int = 4,
+                 batch_size: int = 10, lease: float = 120, max_attempts: int = 6,
+                 backoff_base: float = 5, backoff_max: float = 900, poll_interval: float = 1.0,
+                 delivery_timeout: float = 60):
+        # handler(row, final) delivers one claimed row
+        self._handler = handler
+        self.workers = workers
+        self.batch_size = batch_size
+        self.lease = lease
+        self.delivery_timeout = min(delivery_timeout, lease / 2)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._closing = False
+        # Rows claimed and not settled yet: id -> claim token / ids being delivered
+        self._claimed: Dict[Any, Any] = {}
+        self._started: Set[Any] = set()
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.lost = 0
+        self.released = 0
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._run(i)) for i in range(self.workers)]
+
+    def wake(self):
+        """New rows were written by this process; don't wait for the next poll."""
+        self._wakeup.set()
+
+    async def claim(self) -> List[Any]:
+        """Lease up to `batch_size` due rows; rows locked by others are skipped."""
+        now = datetime.utcnow()
+        due = (
+            select(_columns.id)
+            .where(or_(
+                (_columns.status == "pending") & (_columns.next_attempt_at <= now),
+                # Lease expired: the dispatcher holding it died mid-delivery
+                (_columns.status == "sending") & (_columns.locked_until < now),
+            ))
+            .order_by(_columns.next_attempt_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with AsyncSession(engine) as session:
+            result = await session.execute(
+                update(NotificationOutbox.__table__)
+                .where(_columns.id.in_(due))
+                .values(status="sending", locked_until=now + timedelta(seconds=self.lease),
+                        claim_token=uuid4(), attempts=_columns.attempts + 1)
+                .returning(*NotificationOutbox.__table__.columns)
+            )
+            rows = result.all()
+            await session.commit()
+        return rows
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def renew(self, token, ids: List[Any]) -> Tuple[Set[Any], datetime]:
+        """Extend the lease on rows still held under `token`; returns (their ids, new expiry)."""
+        locked_until = datetime.utcnow() + timedelta(seconds=self.lease)
+        async with AsyncSession(engine) as session:
+            result = await session.execute(
+                update(NotificationOutbox.__table__)
+                .where(_columns.id.in_(ids), _columns.claim_token == token, _columns.status == "sending")
+                .values(locked_until=locked_until)
+                .returning(_columns.id)
+            )
+            held = set(result.scalars().all())
+            await session.commit()
+        return held, locked_until
+
+    async def release(self) -> int:
+        """Hand the rows this dispatcher still holds back as due; returns how many."""
+        if not self._claimed:
+            return 0
+        unstarted = [row_id for row_id in self._claimed if row_id not in self._started]
+        async with AsyncSession(engine) as session:
+            result = await session.execute(
+                update(NotificationOutbox.__table__)
+                .where(_columns.id.in_(list(self._claimed)),
+                       _columns.claim_token.in_(set(self._claimed.values())),
+                       _columns.status == "sending")
+                .values(status="pending", locked_until=None, claim_token=None, next_attempt_at=datetime.utcnow(),
+                        # A row that never got to its delivery keeps its attempt
+                        attempts=case((_columns.id.in_(unstarted), _columns.attempts - 1), else_=_columns.attempts))
+            )
+            await session.commit()
+        self._claimed.clear()
+        self._started.clear()
+        self.released += result.rowcount
+        return result.rowcount
+
+    def _settled(self, row):
+        self._claimed.pop(row.id, None)
+        self._started.discard(row.id)
+
+    async def _complete(self, row, result: OutboxResult, final: bool):
+        now = datetime.utcnow()
+        values = dict(email_done=result.email_done, bot_done=result.bot_done, webhook_done=result.webhook_done,
+                      last_error=result.error, locked_until=None, claim_token=None)
+        if result.complete:
+            values.update(status="done", sent_at=now)
+        elif final:
+            values.update(status="failed")
+        else:
+            values.update(status="pending", next_attempt_at=now + timedelta(seconds=self.backoff(row.attempts)))
+        async with AsyncSession(engine) as session:
+            updated = await session.execute(
+                update(NotificationOutbox.__table__)
+                .where(_columns.id == row.id, _columns.claim_token == row.claim_token)
+                .values(**values)
+            )
+            await session.commit()
+        if updated.rowcount == 0:
+            # Our lease lapsed and another dispatcher owns the row now
+            self.lost += 1
+            logger.warning(f"Outbox row {row.id} was re-claimed before its delivery finished")
+        elif result.complete:
+            self.delivered += 1
+        elif final:
+            self.failed += 1
+            logger.error(f"Outbox row {row.id} failed after {row.attempts} attempts: {result.error}")
+        else:
+            self.retried += 1
+
+    async def _deliver(self, row, final: bool) -> OutboxResult:
+        try:
+            return await asyncio.wait_for(self._handler(row, final), timeout=self.delivery_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            error = f"delivery took over {self.delivery_timeout:.0f} s"
+        except Exception as e:
+            error = str(e)
+        return OutboxResult(False, row.email_done, row.bot_done, row.webhook_done, error)
+
+    async def _run(self, worker: int):
+        while not self._closing:
+            try:
+                rows = await self.claim()
+            except Exception as e:
+                logger.error(f"Outbox claim failed: {e}")
+                rows = []
+            for row in rows:
+                self._claimed[row.id] = row.claim_token
+            if not rows:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            held = None  # ids still leased to us after a renewal (None: all)
+            locked_until = rows[0].locked_until
+            for i, row in enumerate(rows):
+                if self._closing:
+                    break  # the rest is handed back by close()
+                # Never start a delivery the lease might not outlast
+                left = (locked_until - datetime.utcnow()).total_seconds()
+                if left < self.delivery_timeout + _LEASE_MARGIN:
+                    try:
+                        held, locked_until = await self.renew(row.claim_token, [r.id for r in rows[i:]])
+                    except Exception as e:
+                        # Unrenewed rows go back to the pool when the lease expires
+                        logger.error(f"Failed to renew outbox lease: {e}")
+                        for rest in rows[i:]:
+                            self._settled(rest)
+                        break
+                if held is not None and row.id not in held:
+                    self._settled(row)
+                    continue
+                final = row.attempts >= self.max_attempts
+                self._started.add(row.id)
+                result = await self._deliver(row, final)
+                try:
+                    await self._complete(row, result, final)
+                except Exception as e:
+                    # The lease runs out and the row is retried; channels
+                    # already delivered may be sent once more.
+                    logger.error(f"Failed to update outbox row {row.id}: {e}")
+                self._settled(row)
+
+    async def close(self, grace: float = 10):
+        """
+        Stop claiming, give deliveries in flight `grace` seconds, then hand
+        back every row still held.
+        """
+        self._closing = True
+        self._wakeup.set()
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=grace)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        try:
+            released = await self.release()
+        except Exception as e:
+            logger.error(f"Failed to hand back claimed outbox rows: {e}")
+            return
+        if released:
+            logger.info(f"Outbox: handed back {released} claimed rows")
+
+    def stats(self) -> str:
+        return (f"delivered {self.delivered}, retried {self.retried}, failed {self.failed}, "
+                f"{self.timed_out} timed out, {self.lost} leases lost, {self.released} handed back")
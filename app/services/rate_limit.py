@@ -0,0 +1,110 @@
+"""
+Per-alert dispatch throttling.
+
+Every alert gets an in-memory token bucket keyed by its id: `max_per_hour`
+sets the refill rate (with a small burst), `cooldown_seconds` the minimum
+gap between two notifications. Hits over the limit are not dispatched but
+counted: the next notification that goes out reports them, and the totals
+are persisted periodically by the worker (alerts.suppressed_count).
+
+A bucket that has refilled, is out of its cooldown and has nothing left
+to report is no different from a new one; `prune` drops those, and
+`discard` drops a user's buckets when the worker stops serving them.
+"""
+import time
+from typing import Dict, Optional, Set
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated", "last_sent", "unreported", "idle_at")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+        self.last_sent: Optional[float] = None
+        self.unreported = 0  # suppressed since the last notification
+        self.idle_at = now  # full again and out of cooldown from then on
+
+
+class AlertRateLimiter:
+    def __init__(self, burst: int = 5, default_per_hour: int = 0):
+        self.burst = burst
+        # Applies to alerts without their own max_per_hour (0 = unlimited)
+        self.default_per_hour = default_per_hour
+        self._buckets: Dict = {}
+        self._by_user: Dict[str, Set] = {}  # user id -> alert ids with a bucket
+        self._unsaved: Dict = {}  # alert id -> suppressed hits not yet persisted
+        self.suppressed = 0
+        self.allowed = 0
+
+    def allow(self, alert) -> bool:
+        """Take a token for one notification of `alert`; False (and counted) if over its limit."""
+        cooldown = getattr(alert, "cooldown_seconds", 0) or 0
+        per_hour = getattr(alert, "max_per_hour", 0) or self.default_per_hour
+        if not cooldown and not per_hour:
+            self.allowed += 1
+            return True
+
+        now = time.monotonic()
+        capacity = min(self.burst, per_hour) if per_hour else 1
+        bucket = self._buckets.get(alert.id)
+        if bucket is None:
+            bucket = self._buckets[alert.id] = _Bucket(capacity, now)
+            self._by_user.setdefault(str(getattr(alert, "user_id", None)), set()).add(alert.id)
+        elif per_hour:
+            bucket.tokens = min(capacity, bucket.tokens + (now - bucket.updated) * per_hour / 3600)
+            bucket.updated = now
+
+        cooling = bucket.last_sent is not None and now - bucket.last_sent < cooldown
+        if cooling or (per_hour and bucket.tokens < 1):
+            bucket.unreported += 1
+            self._unsaved[alert.id] = self._unsaved.get(alert.id, 0) + 1
+            self.suppressed += 1
+            return False
+
+        if per_hour:
+            bucket.tokens -= 1
+            bucket.idle_at = now + (capacity - bucket.tokens) * 3600 / per_hour
+        else:
+            bucket.idle_at = now
+        bucket.last_sent = now
+        bucket.idle_at = max(bucket.idle_at, now + cooldown)
+        self.allowed += 1
+        return True
+
+    def take_unreported(self, alert_id) -> int:
+        """Hits suppressed since the previous notification of this alert (resets it)."""
+        bucket = self._buckets.get(alert_id)
+        if bucket is None:
+            return 0
+        count, bucket.unreported = bucket.unreported, 0
+        return count
+
+    def discard(self, user_id):
+        """Forget a user's buckets (suppressed hits not yet persisted are kept)."""
+        for alert_id in self._by_user.pop(str(user_id), ()):
+            self._buckets.pop(alert_id, None)
+
+    def prune(self) -> int:
+        """Drop buckets a new one would behave the same as; returns how many."""
+        now = time.monotonic()
+        idle = [alert_id for alert_id, bucket in self._buckets.items()
+                if bucket.idle_at <= now and not bucket.unreported]
+        for alert_id in idle:
+            del self._buckets[alert_id]
+        for user_id, alert_ids in list(self._by_user.items()):
+            alert_ids.intersection_update(self._buckets)
+            if not alert_ids:
+                del self._by_user[user_id]
+        return len(idle)
+
+    def drain_unsaved(self) -> Dict:
+        """alert id -> suppressed hits since the last call, for persisting."""
+        unsaved, self._unsaved = self._unsaved, {}
+        return unsaved
+
+    def stats(self) -> str:
+        total = self.allowed + self.suppressed
+        ratio = self.suppressed / total if total else 0.0
+        return (f"{len(self._buckets)} throttled alerts, "
+                f"{self.suppressed}/{total} notifications suppressed ({ratio:.0%})")
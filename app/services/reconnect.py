@@ -0,0 +1,131 @@
+"""
+Reconnect storm control for the worker's Telegram clients.
+
+After a network blip every client fails at once. Connection attempts go
+through a `ReconnectGovernor`:
+
+- per client, exponential backoff with jitter between failed attempts;
+- worker-wide, at most `concurrency` attempts in flight;
+- a circuit breaker: after `threshold` failed attempts in a row (any
+  clients, no success in between) Telegram or the network is taken to be
+  down and attempts are refused for a cooldown. Then a single trial
+  attempt is let through; success closes the breaker (and clears the
+  per-client backoff run up during the outage), failure reopens it with a
+  doubled cooldown.
+
+Attempts queue for a concurrency slot, but one refused by backoff or the
+breaker returns False at once and the caller comes back later (the health
+scheduler re-checks every few seconds), so nothing piles up while the
+network is down.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger("worker")
+
+
+class ReconnectGovernor:
+    def __init__(self, concurrency: int = 20, base_delay: float = 1.0, max_delay: float = 300.0,
+                 threshold: int = 10, cooldown: float = 10.0, max_cooldown: float = 120.0):
+        self.concurrency = concurrency
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._slots = asyncio.Semaphore(concurrency)
+        self._backoff: Dict[Hashable, Tuple[int, float]] = {}  # key -> (failures, not before)
+        # Breaker: closed / open / half_open
+        self.state = "closed"
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._open_for = cooldown
+        self._trial_running = False
+        self.attempts = 0
+        self.failures = 0
+        self.refused = 0
+        self.trips = 0
+
+    def ready(self, key: Hashable) -> bool:
+        """Would an attempt for `key` be let through (once a slot is free)?"""
+        now = time.monotonic()
+        if now < self._backoff.get(key, (0, 0.0))[1]:
+            return False
+        if self.state == "open" and now < self._open_until:
+            return False
+        return not (self.state != "closed" and self._trial_running)
+
+    async def attempt(self, key: Hashable, connect: Callable[[], Awaitable[None]]) -> bool:
+        """Run `connect` if allowed; True on success, False if refused or failed."""
+        if not self.ready(key):
+            self.refused += 1
+            return False
+        async with self._slots:
+            # The breaker may have tripped while we waited for the slot
+            if not self.ready(key):
+                self.refused += 1
+                return False
+            trial = self.state != "closed"
+            if trial:
+                # Open and past its cooldown: this attempt tests the water
+                self.state = "half_open"
+                self._trial_running = True
+            self.attempts += 1
+            try:
+                await connect()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failed(key, trial, e)
+                return False
+            finally:
+                if trial:
+                    self._trial_running = False
+            self._succeeded(key)
+            return True
+
+    def delay(self, failures: int) -> float:
+        return min(self.max_delay, self.base_delay * 2 ** (failures - 1)) * random.uniform(0.5, 1.0)
+
+    def _failed(self, key: Hashable, trial: bool, error: Exception):
+        self.failures += 1
+        failures = self._backoff.get(key, (0, 0.0))[0] + 1
+        wait = self.delay(failures)
+        self._backoff[key] = (failures, time.monotonic() + wait)
+        logger.warning(f"Reconnect of {key} failed ({failures}x): {error}; next try in {wait:.0f}s")
+
+        self._consecutive_failures += 1
+        if trial:
+            self._open_for = min(self.max_cooldown, self._open_for * 2)
+            self._trip()
+        elif self.state == "closed" and self._consecutive_failures >= self.threshold:
+            self._open_for = self.cooldown
+            self._trip()
+
+    def _trip(self):
+        self.state = "open"
+        self._open_until = time.monotonic() + self._open_for
+        self.trips += 1
+        logger.error(f"Reconnect circuit open for {self._open_for:.0f}s after "
+                     f"{self._consecutive_failures} failed attempts in a row")
+
+    def _succeeded(self, key: Hashable):
+        self._backoff.pop(key, None)
+        self._consecutive_failures = 0
+        if self.state != "closed":
+            logger.info("Reconnect circuit closed: connections succeed again")
+            self.state = "closed"
+            self._open_for = self.cooldown
+            # Backoff built up during the outage says nothing about the clients:
+            # let them all back in, paced by the concurrency limit
+            self._backoff.clear()
+
+    def forget(self, key: Hashable):
+        self._backoff.pop(key, None)
+
+    def stats(self) -> str:
+        return (f"circuit {self.state}, {self.attempts} attempts, {self.failures} failed, "
+                f"{self.refused} deferred, {self.trips} trips, {len(self._backoff)} clients backing off")
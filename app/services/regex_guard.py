@@ -0,0 +1,428 @@
+"""
+ReDoS protection for user-supplied regexes.
+
+Patterns get a static cost score when they are saved, and the worst ones
+are rejected. A score cannot bound the running time though (`[^x]*a?[ab]?x`
+scores low and still backtracks quadratically on a long message), so the
+worker evaluates regexes in a small process pool under a time budget:
+catastrophic backtracking can only stall one pool process, which is then
+killed and replaced, instead of the worker's event loop. Even low scores
+do not make running inline safe: `.*foo` alone takes tens of milliseconds
+on a 4096-character message.
+
+Most messages never reach the pool: a pattern's required literals (see
+`required_literals`) go into the matcher's keyword automaton, and a rule is
+only sent when one of them is in the text. The candidates of a message go
+to the pool in one call; only when that call blows the budget is each rule
+retried alone, to find the one to pause.
+"""
+import asyncio
+import logging
+import re
+import string
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+    from re._casefix import _EXTRA_CASES
+except ImportError:  # pragma: no cover
+    import sre_parse
+    _EXTRA_CASES = None
+
+logger = logging.getLogger("worker")
+
+_UNBOUNDED = 100  # repeats above this behave like `*` for backtracking
+
+# Score weights; REGEX_MAX_COST (100) refuses anything that earns _AMBIGUOUS
+# and anything cubic: three mutually overlapping runs, or an ambiguous body
+# repeated three times
+_PAIR = 35  # two runs that can split the same text: quadratic
+_NESTED = 40  # an unbounded repeat inside another repeat
+_AMBIGUOUS = 200  # a repeated body matching the same text in several ways: exponential
+
+
+# Characters standing in for "any text" when comparing character classes
+_SAMPLE = string.printable + "_\u00a0\u00e9\u00c9\u0436\u0416\u4e2d\u0661"
+_CATEGORIES = {
+    sre_parse.CATEGORY_DIGIT: str.isdigit,
+    sre_parse.CATEGORY_NOT_DIGIT: lambda c: not c.isdigit(),
+    sre_parse.CATEGORY_SPACE: str.isspace,
+    sre_parse.CATEGORY_NOT_SPACE: lambda c: not c.isspace(),
+    sre_parse.CATEGORY_WORD: lambda c: c.isalnum() or c == "_",
+    sre_parse.CATEGORY_NOT_WORD: lambda c: not (c.isalnum() or c == "_"),
+}
+
+
+def _char_matches(op, av, c: str) -> bool:
+    if op is sre_parse.LITERAL:
+        return c.lower() == chr(av).lower()
+    if op is sre_parse.NOT_LITERAL:
+        return c.lower() != chr(av).lower()
+    if op is sre_parse.ANY:
+        return c != "\n"
+    if op is sre_parse.RANGE:
+        return av[0] <= ord(c.lower()) <= av[1] or av[0] <= ord(c.upper()) <= av[1]
+    if op is sre_parse.CATEGORY:
+        return _CATEGORIES.get(av, lambda _: True)(c)
+    if op is sre_parse.IN:
+        negate = bool(av) and av[0][0] is sre_parse.NEGATE
+        hit = any(_char_matches(o, a, c) for o, a in av[negate:])
+        return hit != negate
+    return True
+
+
+_SINGLE = (sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.ANY, sre_parse.IN)
+
+
+def _char_class(sub):
+    """Sample characters a repeat body can start with (None: unknown, assume any)."""
+    while sub and sub[0][0] is sre_parse.SUBPATTERN:
+        sub = sub[0][1][3]
+    if not sub or sub[0][0] not in _SINGLE:
+        return None
+    op, av = sub[0]
+    return frozenset(c for c in _SAMPLE if _char_matches(op, av, c))
+
+
+def _overlap(a, b) -> bool:
+    return a is None or b is None or bool(a & b)
+
+
+def _unbounded_classes(items) -> list:
+    """Start classes of every unbounded repeat in `items`, at any depth."""
+    found = []
+    for op, av in items:
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            if av[1] == sre_parse.MAXREPEAT or av[1] > _UNBOUNDED:
+                found.append(_char_class(av[2]))
+            found.extend(_unbounded_classes(av[2]))
+        elif op is sre_parse.SUBPATTERN:
+            found.extend(_unbounded_classes(av[3]))
+        elif op is sre_parse.BRANCH:
+            for branch in av[1]:
+                found.extend(_unbounded_classes(branch))
+    return found
+
+
+class _Walk:
+    """Scoring state: overlapping run pairs seen, ambiguity checks done."""
+
+    __slots__ = ("pairs", "memo")
+
+    def __init__(self, memo: dict = None):
+        self.pairs = 0
+        self.memo = {} if memo is None else memo
+
+    def pair(self, adjacent: list, chars) -> int:
+        """Score `chars` against the runs right before it."""
+        pairs = sum(1 for prev in adjacent if _overlap(prev, chars))
+        self.pairs += pairs
+        return _PAIR * pairs
+
+    def join(self, adjacent: list, inner: list) -> int:
+        """Score the runs inside a group against those right before it; extends `adjacent`."""
+        score = sum(self.pair(adjacent, chars) for chars in inner)
+        adjacent.extend(inner)
+        return score
+
+
+def _flatten(items) -> list:
+    """Plain groups spliced into the sequence around them."""
+    flat = []
+    for op, av in items:
+        if op is sre_parse.SUBPATTERN:
+            flat.extend(_flatten(av[3]))
+        else:
+            flat.append((op, av))
+    return flat
+
+
+def _ambiguous(sub, walk: _Walk) -> bool:
+    """
+    Whether a repeated body can match the same text in more than one way,
+    so a failing match tries exponentially many splits: (a+)+, (a|aa)*,
+    (\\w+\\s?)*, (.*a){12}. Checked by scoring two copies of the body in a
+    row: runs (and optional items) of one copy that can take characters
+    from the next are new overlapping pairs.
+    """
+    key = id(sub)
+    if key not in walk.memo:
+        items = _flatten(sub)
+        ambiguous = False
+        for op, av in items:
+            if op is sre_parse.BRANCH:
+                starts = [_char_class(branch) for branch in av[1] if branch]
+                if any(_overlap(a, b) for i, a in enumerate(starts) for b in starts[i + 1:]):
+                    ambiguous = True
+        if not ambiguous:
+            once, twice = _Walk(walk.memo), _Walk(walk.memo)
+            _score(items, 0, once, optional_runs=True)
+            _score(items + items, 0, twice, optional_runs=True)
+            ambiguous = twice.pairs > 2 * once.pairs
+        walk.memo[key] = ambiguous
+    return walk.memo[key]
+
+
+def _score(items, depth: int, walk: _Walk, optional_runs: bool = False) -> int:
+    """
+    `depth` = number of enclosing repeats that can backtrack over an unbounded one.
+    With `optional_runs` (inside a repeated body), optional items count as runs.
+    """
+    score = 0
+    # Classes of unbounded repeats since the last mandatory item: \w*\w*x or
+    # \w+\s?\w+ try every split of a run between them (polynomial blow-up)
+    adjacent = []
+    for op, av in items:
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            low, high, sub = av
+            unbounded = high == sre_parse.MAXREPEAT or high > _UNBOUNDED
+            run = unbounded or (optional_runs and low == 0)
+            chars = _char_class(sub)
+            if run:
+                score += walk.pair(adjacent, chars)
+            if low > 0:
+                adjacent = [prev for prev in adjacent if _overlap(prev, chars)]
+            if run:
+                adjacent.append(chars)
+            if unbounded:
+                # Nested unbounded quantifiers: (\s+\w+)*
+                score += 2 + _NESTED * depth
+                score += _score(sub, depth + 1, walk)
+                if _ambiguous(sub, walk):
+                    score += _AMBIGUOUS
+            else:
+                score += _score(sub, depth + 1 if high > 1 else depth, walk)
+                # Each copy of an ambiguous body adds a split point: (.*a){12}
+                if high > 1 and _ambiguous(sub, walk):
+                    score += _PAIR * (high - 1)
+                score += walk.join(adjacent, _unbounded_classes(sub))
+        elif op is sre_parse.SUBPATTERN:
+            score += _score(av[3], depth, walk)
+            score += walk.join(adjacent, _unbounded_classes(av[3]))
+        elif op is sre_parse.BRANCH:
+            score += 1 + sum(_score(branch, depth, walk) for branch in av[1])
+            if optional_runs and not all(av[1]):
+                # An empty alternative makes the rest optional: a(?:|a) from (a|aa)
+                classes = [_char_class(branch) for branch in av[1] if branch]
+                chars = None if None in classes else frozenset().union(*classes)
+                score += walk.pair(adjacent, chars)
+                adjacent.append(chars)
+            score += walk.join(adjacent, _unbounded_classes([(op, av)]))
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            score += 5 + _score(av[1], depth, walk)
+        elif op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+            score += 10
+            adjacent = []
+        elif op is getattr(sre_parse, "ATOMIC_GROUP", None):
+            # No backtracking into atomic groups / possessive repeats
+            score += _score(av, 0, walk)
+            adjacent = []
+        elif op is getattr(sre_parse, "POSSESSIVE_REPEAT", None):
+            score += _score(av[2], 0, walk)
+            adjacent = []
+        elif op in _SINGLE:
+            # A mandatory character ends the runs it cannot be part of
+            chars = frozenset(c for c in _SAMPLE if _char_matches(op, av, c))
+            adjacent = [prev for prev in adjacent if _overlap(prev, chars)]
+    return score
+
+
+def regex_cost(pattern: str) -> int:
+    """Static backtracking-risk score of a pattern (0 = trivial). Raises re.error."""
+    return _score(sre_parse.parse(pattern, re.IGNORECASE), 0, _Walk())
+
+
+def patterns_cost(patterns: List[str]) -> int:
+    return max((regex_cost(p) for p in patterns if p), default=0)
+
+
+_MIN_LITERAL = 3  # shorter required literals are in too many messages to filter
+
+# Lowercase letters IGNORECASE also matches as another one (ı as i, ſ as s,
+# ς as σ), plus the dot lowering İ leaves after its i. Literals never hold
+# them, and a text holding them skips the prefilter.
+if _EXTRA_CASES is not None:
+    _FOLD_VARIANTS = re.compile("[%s\u0307]" % "".join(
+        re.escape(chr(code)) for code in _EXTRA_CASES if chr(code).upper().lower() != chr(code)
+    ))
+else:  # pragma: no cover
+    _FOLD_VARIANTS = None
+
+
+def _fold(code: int) -> Optional[str]:
+    """`chr(code)` lowered, if `str.lower` maps everything IGNORECASE matches to it there."""
+    lowered = chr(code).lower()
+    if len(lowered) != 1:
+        return None
+    if _FOLD_VARIANTS is None:
+        # Without re's table only ASCII is known: i and s also match ı, İ and ſ
+        return lowered if lowered.isascii() and lowered not in "is" else None
+    return None if _FOLD_VARIANTS.match(lowered) else lowered
+
+
+def _better(a: Optional[list], b: Optional[list]) -> Optional[list]:
+    """The more selective of two literal sets: the longer shortest member."""
+    if a is None or b is None:
+        return a if b is None else b
+    return a if min(map(len, a)) >= min(map(len, b)) else b
+
+
+def _literals(items) -> Optional[list]:
+    """Lowered strings, one of which is in every text `items` match; None if unknown."""
+    best = None
+    run = ""
+    for op, av in items:
+        if op is sre_parse.LITERAL and _fold(av) is not None:
+            run += _fold(av)
+            continue
+        if op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            continue  # zero-width: the run goes on
+        if run:
+            best = _better(best, [run])
+            run = ""
+        if op is sre_parse.SUBPATTERN:
+            best = _better(best, _literals(av[3]))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] > 0:
+            best = _better(best, _literals(av[2]))
+        elif op is sre_parse.BRANCH:
+            options = [_literals(branch) for branch in av[1]]
+            if None not in options:
+                best = _better(best, [literal for option in options for literal in option])
+    if run:
+        best = _better(best, [run])
+    return best
+
+
+def required_literals(pattern: str) -> Optional[List[str]]:
+    """
+    Lowered strings, one of which occurs in `text.lower()` whenever the
+    pattern matches `text` (with IGNORECASE); None if the pattern has no
+    such literals long enough to prefilter on. Raises re.error.
+    """
+    found = _literals(sre_parse.parse(pattern, re.IGNORECASE))
+    if found is None or min(map(len, found)) < _MIN_LITERAL:
+        return None
+    return sorted(set(found))
+
+
+def literals_apply(text_lower: str) -> bool:
+    """Whether a `required_literals` miss in this lowered text rules the pattern out."""
+    return _FOLD_VARIANTS is None or not _FOLD_VARIANTS.search(text_lower)
+
+
+def _search_patterns(patterns: List[str], text: str) -> Optional[int]:
+    """Runs in a pool process: index of the first pattern that matches."""
+    for i, pat in enumerate(patterns):
+        if re.search(pat, text, re.IGNORECASE):
+            return i
+    return None
+
+
+def _search_rules(rules: List[List[str]], text: str) -> List[Optional[int]]:
+    """Runs in a pool process: `_search_patterns` for each rule's patterns."""
+    return [_search_patterns(patterns, text) for patterns in rules]
+
+
+class RegexTimeout(Exception):
+    pass
+
+
+class RegexGuard:
+    """
+    `workers` single-process executors, each running one search at a time.
+    A search that blows the budget takes down only its own process, so the
+    other tenants' searches running next to it are unaffected.
+    """
+
+    def __init__(self, workers: int = 2, timeout: float = 0.2):
+        self.workers = workers
+        self.timeout = timeout
+        self._executors = set()
+        # Idle executors; None = slot not started yet, or its process was killed
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for _ in range(workers):
+            self._idle.put_nowait(None)
+
+    async def _start(self) -> ProcessPoolExecutor:
+        executor = ProcessPoolExecutor(max_workers=1)
+        self._executors.add(executor)
+        # Start the process outside the time budget
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, _search_patterns, [], "")
+        return executor
+
+    def _kill(self, executor: ProcessPoolExecutor):
+        """A pattern may still be spinning in its process; kill it."""
+        self._executors.discard(executor)
+        for process in list(getattr(executor, "_processes", {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, fn, *args):
+        """`fn(*args)` in a pool process under the time budget; None if it failed."""
+        loop = asyncio.get_running_loop()
+        executor = await self._idle.get()
+        try:
+            # A process that died under us (OOM, killed from outside) is
+            # replaced and the search retried once
+            for _ in range(2):
+                if executor is None:
+                    executor = await self._start()
+                try:
+                    future = loop.run_in_executor(executor, fn, *args)
+                    return await asyncio.wait_for(future, timeout=self.timeout)
+                except asyncio.TimeoutError:
+                    self._kill(executor)
+                    executor = None
+                    raise RegexTimeout(f"Regex exceeded {self.timeout * 1000:.0f} ms")
+                except BrokenProcessPool as e:
+                    logger.warning(f"Regex pool process died, restarting it: {e}")
+                    self._kill(executor)
+                    executor = None
+                except asyncio.CancelledError:
+                    self._kill(executor)
+                    executor = None
+                    raise
+                except Exception as e:
+                    logger.error(f"Guarded regex search failed: {e}")
+                    return None
+            logger.error("Guarded regex search failed: pool process keeps dying")
+            return None
+        finally:
+            self._idle.put_nowait(executor)
+
+    async def search(self, patterns: List[str], text: str) -> Optional[str]:
+        """
+        First pattern that matches, or None.
+        Raises RegexTimeout if the patterns exceed the time budget.
+        """
+        index = await self._run(_search_patterns, patterns, text)
+        return patterns[index] if index is not None else None
+
+    async def search_rules(self, rules: List[List[str]], text: str) -> Tuple[List[Optional[str]], List[int]]:
+        """
+        `search` for several rules' pattern lists in one pool round trip.
+        Returns (first matching pattern or None per rule, indexes of the rules
+        that exceeded the time budget on their own).
+        """
+        try:
+            indexes = await self._run(_search_rules, rules, text)
+        except RegexTimeout:
+            # Together they were too slow; find out which rule is
+            triggers, slow = [], []
+            for i, patterns in enumerate(rules):
+                try:
+                    triggers.append(await self.search(patterns, text))
+                except RegexTimeout:
+                    triggers.append(None)
+                    slow.append(i)
+            return triggers, slow
+        if indexes is None:
+            return [None] * len(rules), []
+        return [patterns[i] if i is not None else None for patterns, i in zip(rules, indexes)], []
+
+    def shutdown(self):
+        for executor in list(self._executors):
+            self._kill(executor)
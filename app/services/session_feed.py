@@ -0,0 +1,123 @@
+"""
+Incremental feed of Telegram session changes for the worker.
+
+The worker only needs to know which users have an active session, and the
+session string only when it starts a client. Changes are announced on
+SESSIONS_CHANNEL (Telegram login, sessions the worker deactivates); each
+notification, or every `poll_interval` as a fallback, runs one query for
+rows whose `updated_at` moved past the last one seen:
+
+    SELECT user_id, is_active, updated_at FROM telegram_sessions
+    WHERE updated_at > :cursor - :overlap
+
+The overlap re-reads recent rows so a transaction that committed late, or
+a writer whose clock lags, is not skipped; rows whose version is already
+known are ignored.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+from uuid import UUID
+
+from sqlmodel import select
+
+from app.db.session import engine, AsyncSession
+from app.models import TelegramSession
+
+logger = logging.getLogger("worker")
+
+_MAX_IDS = 1000  # per IN (...) list
+
+
+async def fetch_sessions(user_ids: Iterable[str]) -> List[TelegramSession]:
+    """Full rows (with session strings) of the given users' active sessions."""
+    user_ids = [UUID(str(user_id)) for user_id in user_ids]
+    found = []
+    async with AsyncSession(engine) as session:
+        for i in range(0, len(user_ids), _MAX_IDS):
+            statement = (
+                select(TelegramSession)
+                .where(TelegramSession.user_id.in_(user_ids[i:i + _MAX_IDS]))
+                .where(TelegramSession.is_active == True)
+            )
+            found.extend((await session.execute(statement)).scalars().all())
+    return found
+
+
+async def fetch_session_changes(since: Optional[datetime]):
+    """(user_id, is_active, updated_at) of sessions changed after `since` (all if None)."""
+    async with AsyncSession(engine) as session:
+        statement = select(TelegramSession.user_id, TelegramSession.is_active, TelegramSession.updated_at)
+        if since is not None:
+            statement = statement.where(TelegramSession.updated_at > since)
+        return (await session.execute(statement)).all()
+
+
+class SessionFeed:
+    def __init__(self, on_change: Callable[[str, bool], Awaitable[None]], overlap: float = 60.0):
+        self._on_change = on_change
+        self.overlap = timedelta(seconds=overlap)
+        self.active: Set[str] = set()
+        self._versions: Dict[str, datetime] = {}
+        self._cursor: Optional[datetime] = None
+        self._wakeup = asyncio.Event()
+        self.loaded = False
+        self.polls = 0
+        self.changes = 0
+
+    async def load(self):
+        """Initial snapshot: who has an active session (no session strings)."""
+        rows = await fetch_session_changes(None)
+        for user_id, is_active, updated_at in rows:
+            self._apply(str(user_id), is_active, updated_at)
+        self.loaded = True
+        logger.info(f"Session feed: {len(self.active)} active sessions")
+
+    def _apply(self, user_id: str, is_active: bool, updated_at: Optional[datetime]) -> bool:
+        if updated_at is not None and self._versions.get(user_id) == updated_at:
+            return False
+        self._versions[user_id] = updated_at
+        if updated_at is not None and (self._cursor is None or updated_at > self._cursor):
+            self._cursor = updated_at
+        if is_active:
+            self.active.add(user_id)
+        else:
+            self.active.discard(user_id)
+        return True
+
+    async def poll(self):
+        since = self._cursor - self.overlap if self._cursor is not None else None
+        rows = await fetch_session_changes(since)
+        self.polls += 1
+        for user_id, is_active, updated_at in rows:
+            user_id = str(user_id)
+            if self._apply(user_id, is_active, updated_at):
+                self.changes += 1
+                try:
+                    await self._on_change(user_id, is_active)
+                except Exception as e:
+                    logger.error(f"Session change handling failed for {user_id}: {e}")
+
+    def notify(self, payload: str):
+        """NOTIFY callback: look for changes now."""
+        self._wakeup.set()
+
+    async def watch(self, poll_interval: float):
+        while True:
+            # Cleared first: a notification arriving during the query triggers another
+            self._wakeup.clear()
+            try:
+                if not self.loaded:
+                    await self.load()
+                else:
+                    await self.poll()
+            except Exception as e:
+                logger.error(f"Session feed query failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> str:
+        return f"{len(self.active)} active sessions, {self.polls} polls, {self.changes} changes"
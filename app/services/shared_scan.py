@@ -0,0 +1,129 @@
+"""
+Cross-tenant memoization of per-message work.
+
+Every tenant in a public channel receives the same (chat_id, msg_id). The
+first one to handle it lowercases the text and scans it with an automaton
+built from the keywords of *all* loaded tenants; the result is cached for a
+short while, so the 2nd..Nth tenant only map the hit patterns onto their own
+rules.
+
+Only channels/supergroups are shared: their message ids are global, while
+private chats and basic groups number messages per account. The cached text
+is compared as well, as a guard against id collisions.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.services.aho_corasick import AhoCorasick
+from app.services.dedup import message_key
+
+logger = logging.getLogger("worker")
+
+# Telethon "marked" ids: channels and supergroups are -100xxxxxxxxxx
+_CHANNEL_ID_OFFSET = -1000000000000
+
+
+class ScanResult:
+    __slots__ = ("text", "text_lower", "hits", "generation", "created")
+
+    def __init__(self, text: str, text_lower: str, hits, generation: int, created: float):
+        self.text = text
+        self.text_lower = text_lower
+        self.hits = hits  # frozenset of lowered patterns present, or None
+        self.generation = generation
+        self.created = created
+
+
+class SharedScanCache:
+    def __init__(self, pattern_source, ttl: float = 30.0, max_entries: int = 5000,
+                 rebuild_interval: float = 5.0):
+        # pattern_source: `.generation` counter and `.patterns()` (AlertCache)
+        self._source = pattern_source
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.rebuild_interval = rebuild_interval
+
+        self._entries: "OrderedDict[int, ScanResult]" = OrderedDict()
+        self._automaton: Optional[AhoCorasick] = None
+        self._generation = 0
+        self._rebuild_task = None
+        self._last_rebuild = 0.0
+        self.reused = 0
+        self.computed = 0
+
+    @staticmethod
+    def is_shared_chat(chat_id: int) -> bool:
+        return chat_id <= _CHANNEL_ID_OFFSET
+
+    def scan(self, chat_id: int, msg_id: int, message_text: str) -> Optional[ScanResult]:
+        """Shared scan for this message, or None if the chat is not shareable."""
+        if not self.is_shared_chat(chat_id):
+            return None
+        self._maybe_rebuild()
+
+        now = time.monotonic()
+        key = message_key(chat_id, msg_id)
+        entry = self._entries.get(key)
+        if entry is not None and entry.text == message_text and now - entry.created < self.ttl:
+            if entry.generation < self._generation:
+                # The automaton grew since; rescan the cached lowercase text
+                entry.hits = self._find(entry.text_lower)
+                entry.generation = self._generation
+            self.reused += 1
+            return entry
+
+        text_lower = message_text.lower()
+        entry = ScanResult(message_text, text_lower, self._find(text_lower), self._generation, now)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self.computed += 1
+        self._evict(now)
+        return entry
+
+    def _find(self, text_lower: str):
+        if self._automaton is None:
+            return None
+        patterns = self._automaton.patterns
+        return frozenset(patterns[pid] for pid in self._automaton.find_all(text_lower))
+
+    def _evict(self, now: float):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        for _ in range(2):
+            if not self._entries:
+                break
+            oldest = next(iter(self._entries.values()))
+            if now - oldest.created < self.ttl:
+                break
+            self._entries.popitem(last=False)
+
+    def _maybe_rebuild(self):
+        generation = self._source.generation
+        if generation == self._generation or self._rebuild_task is not None:
+            return
+        if time.monotonic() - self._last_rebuild < self.rebuild_interval:
+            return
+        self._rebuild_task = asyncio.create_task(self._rebuild(generation))
+
+    async def _rebuild(self, generation: int):
+        # Tenants loaded after `generation` use their own automaton until
+        # the next rebuild, so a stale shared automaton is never wrong.
+        try:
+            patterns = sorted(self._source.patterns())
+            automaton = await asyncio.to_thread(AhoCorasick, patterns)
+            self._automaton = automaton
+            self._generation = generation
+            logger.info(f"Shared keyword automaton rebuilt: {len(patterns)} patterns")
+        except Exception as e:
+            logger.error(f"Failed to rebuild shared keyword automaton: {e}")
+        finally:
+            self._last_rebuild = time.monotonic()
+            self._rebuild_task = None
+
+    def stats(self) -> str:
+        total = self.reused + self.computed
+        ratio = self.reused / total if total else 0.0
+        return f"{len(self._entries)} entries, {self.reused}/{total} scans reused ({ratio:.0%})"
@@ -0,0 +1,143 @@
+"""
+Pooled async SMTP transport.
+
+Opening a connection per email means a TCP + TLS handshake and an AUTH
+round trip for every alert, and with smtplib each send also holds a thread
+of the default executor. The pool keeps up to `size` authenticated
+aiosmtplib connections open and hands them out one message at a time.
+
+Idle connections are checked with NOOP before reuse (servers drop them
+after a while) and replaced when dead; a message that fails because the
+server closed a reused connection is retried once on a fresh one.
+Connections are recycled after `max_messages`, as many providers cap
+messages per session.
+"""
+import asyncio
+import logging
+import ssl
+import time
+from collections import deque
+from email.message import EmailMessage
+from typing import Optional
+
+import aiosmtplib
+
+logger = logging.getLogger("worker")
+
+
+class _Connection:
+    __slots__ = ("client", "last_used", "sent")
+
+    def __init__(self, client: aiosmtplib.SMTP):
+        self.client = client
+        self.last_used = time.monotonic()
+        self.sent = 0
+
+
+class SMTPPool:
+    def __init__(self, host: str, port: int, user: Optional[str] = None, password: Optional[str] = None,
+                 size: int = 4, timeout: float = 30.0, idle_check: float = 30.0, max_messages: int = 100,
+                 use_tls: Optional[bool] = None, start_tls: Optional[bool] = None):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.size = size
+        self.timeout = timeout
+        # Idle longer than this: NOOP before reusing
+        self.idle_check = idle_check
+        self.max_messages = max_messages
+        # Implicit TLS on 465, STARTTLS elsewhere (as the old smtplib path did)
+        self.use_tls = port == 465 if use_tls is None else use_tls
+        self.start_tls = not self.use_tls if start_tls is None else start_tls
+        self._tls_context = ssl.create_default_context()
+        self._idle = deque()  # most recently used last
+        self._slots = asyncio.Semaphore(size)
+        self.sent = 0
+        self.connects = 0
+        self.reconnects = 0
+
+    async def _connect(self) -> _Connection:
+        client = aiosmtplib.SMTP(
+            hostname=self.host, port=self.port, timeout=self.timeout,
+            use_tls=self.use_tls, start_tls=self.start_tls, tls_context=self._tls_context,
+        )
+        await client.connect()
+        if self.user:
+            await client.login(self.user, self.password or "")
+        self.connects += 1
+        return _Connection(client)
+
+    async def _acquire(self):
+        """(connection, reused)"""
+        while self._idle:
+            conn = self._idle.pop()
+            if not conn.client.is_connected:
+                continue
+            if time.monotonic() - conn.last_used > self.idle_check:
+                try:
+                    await conn.client.noop()
+                except aiosmtplib.SMTPException:
+                    self._discard(conn)
+                    continue
+            return conn, True
+        return await self._connect(), False
+
+    def _release(self, conn: _Connection):
+        conn.last_used = time.monotonic()
+        if conn.sent >= self.max_messages:
+            asyncio.create_task(self._quit(conn))
+        else:
+            self._idle.append(conn)
+
+    @staticmethod
+    def _discard(conn: _Connection):
+        try:
+            conn.client.close()
+        except Exception:
+            pass
+
+    async def _quit(self, conn: _Connection):
+        try:
+            await conn.client.quit()
+        except Exception:
+            self._discard(conn)
+
+    async def send(self, msg: EmailMessage):
+        """Send one message on a pooled connection; raises on failure."""
+        async with self._slots:
+            conn, reused = await self._acquire()
+            try:
+                await conn.client.send_message(msg)
+            except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, ConnectionError) as e:
+                self._discard(conn)
+                if not reused:
+                    raise
+                # The server dropped a connection we held open; one retry on a fresh one
+                self.reconnects += 1
+                logger.info(f"SMTP connection dropped ({e}); reconnecting")
+                conn = await self._connect()
+                try:
+                    await conn.client.send_message(msg)
+                except Exception:
+                    self._discard(conn)
+                    raise
+            except (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused):
+                # Rejected message (recipients, size, ...): aiosmtplib has reset
+                # the envelope and the connection is still good
+                self._release(conn)
+                raise
+            except BaseException:
+                self._discard(conn)
+                raise
+            conn.sent += 1
+            self.sent += 1
+            self._release(conn)
+
+    def stats(self) -> str:
+        return (f"{self.sent} sent, {self.connects} connections opened ({self.reconnects} after drops), "
+                f"{len(self._idle)} idle")
+
+    async def close(self):
+        idle, self._idle = list(self._idle), deque()
+        await asyncio.gather(*(self._quit(conn) for conn in idle))
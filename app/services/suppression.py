@@ -0,0 +1,112 @@
+"""
+Suppression of repeated content before dispatch.
+
+Forwarded copies of one announcement arrive as different messages (other
+chat, other id), so the per-message dedup does not catch them. Matched text
+is fingerprinted with SimHash: similar texts get fingerprints a few bits
+apart, so a copy with an added line or emoji is still recognised. Each
+tenant keeps a bounded FIFO/TTL window of what was dispatched per alert.
+
+Album parts (one message per photo, sharing a `grouped_id`) are merged by
+the worker before dispatch; the album key is remembered too, so parts
+arriving after the merge window do not fire the same alert again.
+"""
+import re
+import time
+from collections import deque
+from typing import Dict, Hashable, Optional
+
+_WORD = re.compile(r"\w+")
+# Links and @mentions are what reposts change most
+_NOISE = re.compile(r"https?://\S+|t\.me/\S+|@\w+")
+_BITS = 64
+_MASK = (1 << _BITS) - 1
+
+
+def simhash(text: str, min_words: int = 5) -> Optional[int]:
+    """
+    64-bit SimHash over words and word pairs, or None for texts too short to
+    fingerprint reliably (short replies repeat without being copies).
+    """
+    words = _WORD.findall(_NOISE.sub(" ", text.lower()))
+    if len(words) < min_words:
+        return None
+    # Word pairs keep texts built from the same vocabulary apart
+    features = set(words)
+    features.update(zip(words, words[1:]))
+
+    # Majority vote per bit; transposing the binary strings keeps the
+    # per-bit counting in C.
+    hashes = [format(hash(f) & _MASK, "064b") for f in features]
+    half = len(hashes) / 2
+    fingerprint = 0
+    for column in zip(*hashes):
+        fingerprint = (fingerprint << 1) | (column.count("1") > half)
+    return fingerprint
+
+
+class _Recent:
+    """Dispatched (alert, fingerprint, album) entries of one tenant, oldest first."""
+
+    __slots__ = ("entries",)
+
+    def __init__(self):
+        self.entries = deque()  # (alert_id, fingerprint, album, stamp)
+
+
+class NearDuplicateFilter:
+    def __init__(self, max_entries: int = 256, ttl: float = 3600.0, max_distance: int = 8):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._tenants: Dict[str, _Recent] = {}
+        self.suppressed = 0
+        self.passed = 0
+
+    def seen(self, tenant: str, alert_id, fingerprint: Optional[int],
+             album: Optional[Hashable] = None) -> bool:
+        """
+        Record a dispatch of `alert_id`; True if the tenant already got this
+        alert for the same album or for text within `max_distance` bits.
+        """
+        if fingerprint is None and album is None:
+            self.passed += 1
+            return False
+
+        recent = self._tenants.get(tenant)
+        if recent is None:
+            recent = self._tenants[tenant] = _Recent()
+        entries = recent.entries
+
+        now = time.monotonic()
+        while entries and now - entries[0][3] >= self.ttl:
+            entries.popleft()
+
+        # Bounded linear scan; only matched messages get here
+        max_distance = self.max_distance
+        for entry_alert, entry_fp, entry_album, _ in entries:
+            if entry_alert != alert_id:
+                continue
+            if album is not None and entry_album == album:
+                self.suppressed += 1
+                return True
+            if (fingerprint is not None and entry_fp is not None
+                    and (fingerprint ^ entry_fp).bit_count() <= max_distance):
+                self.suppressed += 1
+                return True
+
+        entries.append((alert_id, fingerprint, album, now))
+        if len(entries) > self.max_entries:
+            entries.popleft()
+        self.passed += 1
+        return False
+
+    def discard(self, tenant: str):
+        self._tenants.pop(tenant, None)
+
+    def stats(self) -> str:
+        total = self.suppressed + self.passed
+        ratio = self.suppressed / total if total else 0.0
+        entries = sum(len(r.entries) for r in self._tenants.values())
+        return (f"{len(self._tenants)} tenants, {entries} fingerprints, "
+                f"{self.suppressed}/{total} dispatches suppressed ({ratio:.0%})")
@@ -0,0 +1,84 @@
+"""
+In-memory cache of where each user's notifications go.
+
+Dispatch needs the user's email, bot chat id and linked Telegram id for
+every match. They are resolved with one query per user and kept until a
+change is announced on TARGETS_CHANNEL (PUT /users/me, bot /start relink,
+Telegram login). A TTL bounds staleness when a notification is missed.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_
+from sqlmodel import select
+
+from app.core.config import settings
+from app.db.session import engine, AsyncSession
+from app.models import TelegramSession, User
+
+logger = logging.getLogger("worker")
+
+
+class NotificationTargets(NamedTuple):
+    email: Optional[str] = None
+    bot_chat_id: Optional[int] = None
+    telegram_id: Optional[str] = None  # Active session's account; bot fallback
+
+    @property
+    def chat_id(self):
+        return self.bot_chat_id or self.telegram_id
+
+
+async def fetch_targets(user_id) -> NotificationTargets:
+    async with AsyncSession(engine) as session:
+        statement = (
+            select(User.email, User.bot_chat_id, TelegramSession.telegram_id)
+            .outerjoin(TelegramSession, and_(
+                TelegramSession.user_id == User.id, TelegramSession.is_active == True
+            ))
+            .where(User.id == user_id)
+            .limit(1)
+        )
+        row = (await session.execute(statement)).first()
+    return NotificationTargets(*row) if row else NotificationTargets()
+
+
+class TargetCache:
+    def __init__(self, ttl: float = 600.0):
+        self.ttl = ttl
+        self._targets: Dict[str, Tuple[NotificationTargets, float]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.hits = 0
+        self.loads = 0
+
+    async def get(self, user_id) -> NotificationTargets:
+        key = str(user_id)
+        cached = self._targets.get(key)
+        if cached is not None and time.monotonic() - cached[1] < self.ttl:
+            self.hits += 1
+            return cached[0]
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another dispatch may have loaded it while we waited
+            cached = self._targets.get(key)
+            if cached is not None and time.monotonic() - cached[1] < self.ttl:
+                self.hits += 1
+                return cached[0]
+            targets = await fetch_targets(user_id)
+            self._targets[key] = (targets, time.monotonic())
+            self.loads += 1
+            return targets
+
+    def invalidate(self, user_id: str):
+        """NOTIFY callback: the next dispatch for this user reloads."""
+        self._targets.pop(user_id, None)
+
+    def stats(self) -> str:
+        total = self.hits + self.loads
+        ratio = self.hits / total if total else 0.0
+        return f"{len(self._targets)} users, {ratio:.0%} hits ({self.loads} loads)"
+
+
+target_cache = TargetCache(ttl=settings.TARGET_CACHE_TTL)
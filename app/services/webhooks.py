@@ -0,0 +1,270 @@
+"""
+Webhook delivery for alerts.
+
+All POSTs go through one shared `httpx.AsyncClient`, so connections to a
+receiver are kept alive and reused instead of a TCP/TLS handshake per
+alert. Concurrency is capped per host (one slow receiver cannot take all
+connections), failed requests are retried a few times with jittered
+backoff, and with a batch window several alerts for the same URL are sent
+in one POST.
+
+Receivers always get `{"events": [event, ...]}`.
+
+Webhook URLs are user input, so requests only go to public addresses: the
+host name is resolved when the connection is opened, every address it
+resolves to is checked, and the socket connects to a checked address (a
+second lookup could be answered differently). Loopback, private,
+link-local and other non-global targets are refused, and not retried.
+"""
+import asyncio
+import contextlib
+import ipaddress
+import logging
+import random
+import socket
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpcore
+import httpx
+
+from app.services.batcher import MicroBatcher
+
+logger = logging.getLogger("worker")
+
+# Worth retrying: the receiver is overloaded or briefly unavailable
+_RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class BlockedAddress(Exception):
+    """A webhook host is, or resolves to, an address that is not public."""
+
+
+def is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    # is_global excludes loopback, private, link-local, shared and reserved ranges
+    return ip.is_global and not ip.is_multicast
+
+
+def check_webhook_host(host: str):
+    """Save-time check of a webhook host name; raises BlockedAddress."""
+    host = (host or "").strip("[]").rstrip(".").lower()
+    try:
+        public = is_public_address(host)
+    except ValueError:
+        # A name: internal ones are refused here, the rest when resolved at send time
+        public = "." in host and not host.endswith((".localhost", ".local", ".internal"))
+    if not public:
+        raise BlockedAddress(f"{host or 'empty host'} is not a public address")
+
+
+class PublicOnlyBackend(httpcore.AsyncNetworkBackend):
+    """Resolves host names itself and only connects to public addresses."""
+
+    def __init__(self, backend: httpcore.AsyncNetworkBackend):
+        self._backend = backend
+
+    async def connect_tcp(self, host: str, port: int, timeout: float = None, local_address: str = None,
+                          socket_options=None) -> httpcore.AsyncNetworkStream:
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await asyncio.wait_for(loop.getaddrinfo(host, port, type=socket.SOCK_STREAM), timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise httpcore.ConnectError(f"Cannot resolve {host}: {e}")
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        # Any private answer disqualifies the name; mixed records are a rebinding trick
+        blocked = [address for address in addresses if not is_public_address(address)]
+        if blocked or not addresses:
+            raise BlockedAddress(f"{host} resolves to a non-public address ({', '.join(blocked)})")
+        return await self._backend.connect_tcp(addresses[0], port, timeout=timeout, local_address=local_address,
+                                               socket_options=socket_options)
+
+    async def connect_unix_socket(self, path: str, timeout: float = None, socket_options=None):
+        raise BlockedAddress("Unix sockets are not webhook targets")
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+# httpcore errors as httpx raises them from its own transport; most specific first
+_ERRORS = [
+    (httpcore.ConnectTimeout, httpx.ConnectTimeout),
+    (httpcore.ReadTimeout, httpx.ReadTimeout),
+    (httpcore.WriteTimeout, httpx.WriteTimeout),
+    (httpcore.PoolTimeout, httpx.PoolTimeout),
+    (httpcore.TimeoutException, httpx.TimeoutException),
+    (httpcore.ConnectError, httpx.ConnectError),
+    (httpcore.ReadError, httpx.ReadError),
+    (httpcore.WriteError, httpx.WriteError),
+    (httpcore.NetworkError, httpx.NetworkError),
+    (httpcore.UnsupportedProtocol, httpx.UnsupportedProtocol),
+    (httpcore.RemoteProtocolError, httpx.RemoteProtocolError),
+    (httpcore.LocalProtocolError, httpx.LocalProtocolError),
+    (httpcore.ProtocolError, httpx.ProtocolError),
+]
+
+
+@contextlib.contextmanager
+def _httpx_errors(request: httpx.Request):
+    try:
+        yield
+    except Exception as e:
+        for core_error, error in _ERRORS:
+            if isinstance(e, core_error):
+                raise error(str(e), request=request) from e
+        raise
+
+
+class _ResponseStream(httpx.AsyncByteStream):
+    def __init__(self, stream, request: httpx.Request):
+        self._stream = stream
+        self._request = request
+
+    async def __aiter__(self):
+        with _httpx_errors(self._request):
+            async for part in self._stream:
+                yield part
+
+    async def aclose(self):
+        await self._stream.aclose()
+
+
+class PublicOnlyTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport over an httpcore connection pool on `PublicOnlyBackend`.
+    httpx has no hook for name resolution, but httpcore takes the backend as
+    a constructor argument.
+    """
+
+    def __init__(self, limits: httpx.Limits):
+        self._pool = httpcore.AsyncConnectionPool(
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            network_backend=PublicOnlyBackend(httpcore.AnyIOBackend()),
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(scheme=request.url.raw_scheme, host=request.url.raw_host,
+                             port=request.url.port, target=request.url.raw_path),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        with _httpx_errors(request):
+            response = await self._pool.handle_async_request(core_request)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_ResponseStream(response.stream, request),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        await self._pool.aclose()
+
+
+class WebhookSender:
+    def __init__(self, max_connections: int = 100, per_host: int = 8, timeout: float = 5.0,
+                 retries: int = 2, backoff: float = 0.5, batch_window: float = 0.0, batch_size: int = 20,
+                 transport: Optional[httpx.AsyncBaseTransport] = None, allow_private: bool = False):
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._transport = transport
+        self.allow_private = allow_private
+        self._client: Optional[httpx.AsyncClient] = None
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+        self._batcher = MicroBatcher(self._flush, window=batch_window, max_size=batch_size) if batch_window > 0 else None
+        self.sent = 0
+        self.failed = 0
+        self.requests = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.max_connections,
+                                  max_keepalive_connections=self.max_connections,
+                                  keepalive_expiry=60)
+            transport = self._transport
+            if transport is None and not self.allow_private:
+                transport = PublicOnlyTransport(limits)
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 3.0)),
+                limits=limits,
+                headers={"User-Agent": "TeleGuard-Webhook/1.0"},
+                follow_redirects=False,
+                transport=transport,
+            )
+        return self._client
+
+    def _host_slots(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        slots = self._hosts.get(host)
+        if slots is None:
+            slots = self._hosts[host] = asyncio.Semaphore(self.per_host)
+        return slots
+
+    async def send(self, url: str, event: Dict[str, Any]) -> bool:
+        """Deliver one event (possibly batched with others for `url`); True on 2xx."""
+        if self._batcher is None:
+            return await self._post(url, [event])
+        future = asyncio.get_running_loop().create_future()
+        self._batcher.submit(url, (event, future))
+        return await future
+
+    async def _flush(self, url: str, items: List):
+        try:
+            ok = await self._post(url, [event for event, _ in items])
+        except Exception as e:
+            logger.error(f"Webhook batch for {url} failed: {e}")
+            ok = False
+        for _, future in items:
+            if not future.done():
+                future.set_result(ok)
+
+    async def _post(self, url: str, events: List[Dict[str, Any]]) -> bool:
+        body = {"events": events}
+        async with self._host_slots(url):
+            for attempt in range(self.retries + 1):
+                delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                try:
+                    self.requests += 1
+                    response = await self.client.post(url, json=body)
+                    if response.is_success:
+                        self.sent += len(events)
+                        return True
+                    if response.status_code not in _RETRY_STATUS:
+                        logger.warning(f"Webhook {url} rejected {len(events)} events: HTTP {response.status_code}")
+                        break
+                    retry_after = response.headers.get("Retry-After", "")
+                    if retry_after.isdigit():
+                        delay = min(float(retry_after), 30.0)
+                    error = f"HTTP {response.status_code}"
+                except httpx.HTTPError as e:
+                    error = f"{type(e).__name__}: {e}"
+                except BlockedAddress as e:
+                    logger.warning(f"Webhook {url} refused: {e}")
+                    break
+                if attempt < self.retries:
+                    logger.info(f"Webhook {url} failed ({error}); retry {attempt + 1} in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+        self.failed += len(events)
+        return False
+
+    def stats(self) -> str:
+        return (f"{self.sent} events sent, {self.failed} failed, {self.requests} requests, "
+                f"{len(self._hosts)} hosts")
+
+    async def close(self):
+        if self._batcher is not None:
+            await self._batcher.drain()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
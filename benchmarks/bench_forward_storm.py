@@ -0,0 +1,127 @@
+"""
+Synthetic forward-storm replay: announcements forwarded into many chats
+with small edits, some posted as albums. Counts dispatches without and with
+the suppression stage (album merging + SimHash near-duplicates, as in the
+worker's dispatch_matches) and what the stage costs per matched message.
+
+Run from the project root:
+    python -m benchmarks.bench_forward_storm
+"""
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+from app.services.batcher import MicroBatcher
+from app.services.matcher import RuleSet
+from app.services.suppression import NearDuplicateFilter, simhash
+
+TOPICS = ["presale", "airdrop", "listing", "giveaway", "whitelist", "launch"]
+WORDS = ["the", "our", "token", "community", "holders", "round", "opens", "today", "tomorrow",
+         "limited", "spots", "join", "now", "early", "bonus", "rewards", "exchange", "partner",
+         "wallet", "connect", "claim", "before", "deadline", "announcing", "official", "new"]
+DECORATIONS = ["", "🔥 ", "🚀🚀 ", "‼️ ", "FWD: "]
+SIGNATURES = ["", " via @cryptocalls", " | join @alpha_chat", " (repost)", " https://t.me/signals"]
+
+ALBUM_WINDOW = 0.005
+
+
+def make_alerts():
+    return [
+        SimpleNamespace(id=i, source_id=None, keywords=[topic], excluded_keywords=[], is_regex=False)
+        for i, topic in enumerate(TOPICS)
+    ] + [
+        # Sender-only rule: fires on every album part, caption or not
+        SimpleNamespace(id=len(TOPICS), source_id=None, keywords=[], excluded_keywords=[],
+                        is_regex=False, sender_ids=[777], sender_usernames=[])
+    ]
+
+
+def make_stream(rng: random.Random, announcements: int = 200, copies: int = 20):
+    """(chat_id, msg_id, grouped_id, sender_id, text) in arrival order."""
+    events = []
+    next_group = 1
+    for n in range(announcements):
+        body = " ".join(rng.choice(WORDS) for _ in range(rng.randint(15, 40)))
+        body = f"{body} {rng.choice(TOPICS)} {n}"
+        as_album = rng.random() < 0.3
+        sender_id = 777 if rng.random() < 0.2 else rng.randint(1000, 9999)
+        for c in range(rng.randint(1, copies)):
+            chat_id = -1001000000000 - rng.randint(1, 500)
+            text = rng.choice(DECORATIONS) + body + rng.choice(SIGNATURES)
+            if as_album:
+                group = next_group
+                next_group += 1
+                parts = rng.randint(2, 6)
+                for p in range(parts):
+                    events.append((chat_id, len(events), group, sender_id, text if p == 0 else ""))
+            else:
+                events.append((chat_id, len(events), None, sender_id, text))
+    # Unrelated matching chatter, all distinct
+    for n in range(announcements):
+        text = f"{rng.choice(TOPICS)} question {n}: " + " ".join(rng.choice(WORDS) for _ in range(12))
+        events.append((-1002000000000 - n, len(events), None, rng.randint(1000, 9999), text))
+    rng.shuffle(events)
+    # Album parts stay together, as Telegram delivers them
+    events.sort(key=lambda e: (e[2] is None, e[2] or 0))
+    return events
+
+
+async def replay(events, rules):
+    near_duplicates = NearDuplicateFilter()
+    dispatched = []
+    suppression_time = 0.0
+
+    def dispatch(text, matches, grouped_id=None, chat_id=None):
+        nonlocal suppression_time
+        start = time.perf_counter()
+        fingerprint = simhash(text)
+        album = (chat_id, grouped_id) if grouped_id else None
+        kept = [m for m in matches if not near_duplicates.seen("tenant", m.alert.id, fingerprint, album)]
+        suppression_time += time.perf_counter() - start
+        dispatched.extend(kept)
+
+    async def dispatch_album(key, parts):
+        nonlocal suppression_time
+        start = time.perf_counter()
+        chat_id, grouped_id = key
+        texts = []
+        merged = {}
+        for text, matches in parts:
+            if text and text not in texts:
+                texts.append(text)
+            for m in matches:
+                merged.setdefault(m.alert.id, m)
+        suppression_time += time.perf_counter() - start
+        dispatch("\n".join(texts), list(merged.values()), grouped_id, chat_id)
+
+    albums = MicroBatcher(dispatch_album, window=ALBUM_WINDOW, max_size=10)
+    naive = 0
+    matched = 0
+    for chat_id, _, grouped_id, sender_id, text in events:
+        matches = rules.match(text, chat_id, sender_id=sender_id)
+        if not matches:
+            continue
+        matched += 1
+        naive += len(matches)
+        if grouped_id:
+            albums.submit((chat_id, grouped_id), (text, matches))
+        else:
+            dispatch(text, matches)
+    await albums.drain()
+    return naive, len(dispatched), matched, suppression_time, near_duplicates
+
+
+async def main():
+    rng = random.Random(13)
+    rules = RuleSet(make_alerts())
+    for announcements, copies in ((50, 10), (200, 20), (500, 40)):
+        events = make_stream(rng, announcements, copies)
+        naive, kept, matched, elapsed, nd = await replay(events, rules)
+        print(f"{announcements:>4} announcements x<={copies:<3} copies | {len(events):>6} msgs | "
+              f"dispatches {naive:>6} -> {kept:>5} (-{1 - kept / naive:.0%}) | "
+              f"suppression {elapsed / matched * 1e6:>5.1f} us/matched msg")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+"""
+Fuzzy keyword alerts: exact matching vs fuzzy matching at distance 1 and 2,
+plus the bit-parallel search run on every keyword without the piece filter.
+
+Run from the project root:
+    python -m benchmarks.bench_fuzzy
+"""
+import random
+import time
+from types import SimpleNamespace
+
+from app.services.fuzzy import FuzzyPattern
+from app.services.matcher import RuleSet
+
+WORDS = ["price", "pump", "urgent", "meeting", "deploy", "server", "token", "airdrop",
+         "hello", "team", "update", "release", "wallet", "signal", "launch", "moon",
+         "bitcoin", "listing", "presale", "whitelist", "giveaway", "admin", "support"]
+
+# Ordinary chat text the alert words are sprinkled into
+FILLER = ["the", "and", "for", "you", "this", "that", "with", "have", "from", "they",
+          "will", "just", "what", "about", "would", "there", "their", "which", "when",
+          "make", "like", "time", "know", "take", "people", "into", "year", "good",
+          "some", "could", "them", "other", "than", "then", "look", "only", "come",
+          "over", "think", "also", "back", "after", "work", "first", "well", "even",
+          "want", "because", "these", "give", "most", "thanks", "today", "tomorrow"]
+
+
+def make_alerts(count: int, distance: int, rng: random.Random):
+    return [
+        SimpleNamespace(
+            id=i, source_id=None, is_regex=False, fuzzy_distance=distance,
+            keywords=[f"{rng.choice(WORDS)} {rng.choice(WORDS)}" for _ in range(rng.randint(1, 3))],
+            excluded_keywords=[],
+        )
+        for i in range(count)
+    ]
+
+
+def misspell(word: str, rng: random.Random) -> str:
+    i = rng.randrange(len(word))
+    return word[:i] + rng.choice("013@$x") + word[i + 1:]
+
+
+def make_messages(count: int, rng: random.Random):
+    messages = []
+    for _ in range(count):
+        words = [rng.choice(WORDS) if rng.random() < 0.15 else rng.choice(FILLER)
+                 for _ in range(rng.randint(10, 60))]
+        # Roughly one deliberate typo per five words, like spam does
+        words = [misspell(w, rng) if rng.random() < 0.2 else w for w in words]
+        messages.append(" ".join(words))
+    return messages
+
+
+def unfiltered_match(alerts, distance, messages):
+    patterns = [[FuzzyPattern(kw, distance) for kw in alert.keywords] for alert in alerts]
+    for text in messages:
+        text_lower = text.lower()
+        for alert_patterns in patterns:
+            any(p.scan(text_lower) for p in alert_patterns)
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def run(alert_count: int, messages, rng):
+    n = len(messages)
+    seed = rng.random()
+    row = [f"{alert_count:>4} alerts"]
+    fired = []
+    for distance in (0, 1, 2):
+        alerts = make_alerts(alert_count, distance, random.Random(seed))
+        rules = RuleSet(alerts)
+        count = 0
+
+        def scan():
+            nonlocal count
+            for text in messages:
+                count += len(rules.match(text, 1))
+
+        elapsed = timed(scan)
+        label = "exact" if distance == 0 else f"k={distance}"
+        row.append(f"{label} {n / elapsed:>7.0f} msg/s")
+        fired.append(count)
+
+    alerts = make_alerts(alert_count, 1, random.Random(seed))
+    elapsed = timed(lambda: unfiltered_match(alerts, 1, messages))
+    row.append(f"k=1 unfiltered {n / elapsed:>6.0f} msg/s")
+    print(" | ".join(row) + f" | hits {'/'.join(map(str, fired))}")
+
+
+if __name__ == "__main__":
+    rng = random.Random(11)
+    messages = make_messages(1000, rng)
+    for count in (5, 25, 100, 400):
+        run(count, messages, rng)
@@ -0,0 +1,152 @@
+"""
+Client health checking at scale, simulated.
+
+N fake clients answer the heartbeat RPC after a few tens of ms; some get
+updates regularly (busy chats). During the run clients die at random
+times, half with a closed socket (is_connected() turns False) and half as
+zombies (socket looks fine, RPCs hang). Compares the previous sequential
+loop (get_me() on every client, 5 s timeout each, then sleep 5 s) with the
+HealthScheduler: heartbeat RPCs per second and time to detect a death.
+
+Time is compressed by --scale (0.1 = ten times faster than real); all
+figures are reported in real seconds.
+
+Run from the project root:
+    python -m benchmarks.bench_health
+    python -m benchmarks.bench_health --clients 5000 --duration 600
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.services.health import HealthScheduler
+
+
+class FakeClient:
+    def __init__(self, rng: random.Random, scale: float):
+        self.latency = rng.uniform(0.02, 0.08) * scale
+        self.connected = True
+        self.zombie = False
+        self.died_at = None
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    async def get_me(self):
+        if self.zombie:
+            await asyncio.sleep(3600)
+        await asyncio.sleep(self.latency)
+
+    def kill(self, zombie: bool):
+        self.died_at = time.monotonic()
+        if zombie:
+            self.zombie = True
+        else:
+            self.connected = False
+
+    def revive(self):
+        self.connected = True
+        self.zombie = False
+        self.died_at = None
+
+
+class Sim:
+    def __init__(self, clients: int, busy_ratio: float, scale: float, seed: int = 7):
+        self.rng = random.Random(seed)
+        self.scale = scale
+        self.clients = {i: FakeClient(self.rng, scale) for i in range(clients)}
+        self.busy = [i for i in self.clients if self.rng.random() < busy_ratio]
+        self.rpcs = 0
+        self.detections = []
+
+    async def probe(self, key):
+        self.rpcs += 1
+        await self.clients[key].get_me()
+
+    async def recover(self, key, error=None):
+        client = self.clients[key]
+        if client.died_at is not None:
+            self.detections.append((time.monotonic() - client.died_at) / self.scale)
+        await asyncio.sleep(0.05 * self.scale)  # reconnect
+        client.revive()
+
+    async def kill_some(self, count: int, within: float):
+        victims = self.rng.sample(list(self.clients), count)
+        times = sorted(self.rng.uniform(0, within) for _ in victims)
+        start = time.monotonic()
+        for n, (victim, at) in enumerate(zip(victims, times)):
+            await asyncio.sleep(max(0.0, start + at * self.scale - time.monotonic()))
+            self.clients[victim].kill(zombie=n % 2 == 1)
+
+    async def updates(self, touch):
+        """Busy clients receive an update every ~2 s."""
+        while True:
+            await asyncio.sleep(0.1 * self.scale)
+            for key in self.rng.sample(self.busy, max(1, len(self.busy) // 20)):
+                if self.clients[key].connected and not self.clients[key].zombie:
+                    touch(key)
+
+
+async def sequential(sim: Sim, duration: float):
+    """The previous monitor loop."""
+    scale = sim.scale
+    deadline = time.monotonic() + duration * scale
+    while time.monotonic() < deadline:
+        for key, client in sim.clients.items():
+            if time.monotonic() >= deadline:
+                return
+            if not client.is_connected():
+                await sim.recover(key)
+                continue
+            try:
+                sim.rpcs += 1
+                await asyncio.wait_for(client.get_me(), timeout=5.0 * scale)
+            except asyncio.TimeoutError:
+                await sim.recover(key)
+        await asyncio.sleep(5.0 * scale)
+
+
+async def scheduled(sim: Sim, duration: float):
+    scale = sim.scale
+    health = HealthScheduler(
+        check=lambda key: sim.clients[key].is_connected(),
+        probe=sim.probe,
+        recover=sim.recover,
+        check_interval=5.0 * scale,
+        min_probe_interval=15.0 * scale,
+        max_probe_interval=60.0 * scale,
+        timeout=5.0 * scale,
+        concurrency=50,
+    )
+    for key in sim.clients:
+        health.add(key)
+    updates = asyncio.create_task(sim.updates(health.touch))
+    await asyncio.sleep(duration * scale)
+    updates.cancel()
+    await health.close()
+    return health
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--duration", type=float, default=300, help="simulated seconds")
+    parser.add_argument("--deaths", type=int, default=40)
+    parser.add_argument("--busy", type=float, default=0.3, help="share of clients receiving updates")
+    parser.add_argument("--scale", type=float, default=0.1)
+    args = parser.parse_args()
+
+    for name, runner in (("sequential loop", sequential), ("health scheduler", scheduled)):
+        sim = Sim(args.clients, args.busy, args.scale)
+        killer = asyncio.create_task(sim.kill_some(args.deaths, args.duration * 0.6))
+        await runner(sim, args.duration)
+        killer.cancel()
+        found = sorted(sim.detections)
+        pick = lambda q: found[min(len(found) - 1, int(q * len(found)))] if found else float("nan")
+        print(f"{name:<17} | {sim.rpcs / args.duration:>7.0f} RPC/s | detected {len(found):>3}/{args.deaths} "
+              f"| detection p50 {pick(0.5):>6.1f} s, p95 {pick(0.95):>6.1f} s, max {pick(1.0):>6.1f} s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+"""
+Microbenchmark suite for the matching engine (app/services/matcher.py).
+
+Synthetic corpora cover message length, keywords per tenant, regex share
+and tenant count. For every scenario it reports messages/s (one message
+matched against every tenant), p50/p99 latency of a single RuleSet.match
+call, and the memory held by the compiled rule sets.
+
+Run from the project root:
+    python -m benchmarks.bench_matcher            # full matrix
+    python -m benchmarks.bench_matcher --quick    # smoke run
+    python -m benchmarks.bench_matcher --json bench_output.json
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from app.services.matcher import RuleSet
+
+VOCAB = ["price", "pump", "urgent", "meeting", "deploy", "server", "token", "airdrop",
+         "hello", "team", "update", "release", "wallet", "signal", "launch", "moon",
+         "gm", "lol", "check", "this", "out", "today", "now", "big", "news", "bitcoin",
+         "eth", "sol", "listing", "presale", "whitelist", "giveaway", "scam", "admin"]
+
+MESSAGE_LENGTHS = {"short": 40, "medium": 300, "long": 4000}
+CHAT_IDS = [-1000 - i for i in range(50)]
+
+
+def synth_word(rng: random.Random) -> str:
+    return rng.choice(VOCAB) + (str(rng.randint(0, 99)) if rng.random() < 0.3 else "")
+
+
+def make_message(rng: random.Random, length: int) -> str:
+    words = []
+    size = 0
+    while size < length:
+        word = synth_word(rng)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def make_alerts(rng: random.Random, keywords: int, regex_share: float):
+    """Alerts of 1-5 keywords until `keywords` is reached; some are regex."""
+    alerts = []
+    remaining = keywords
+    while remaining > 0:
+        count = min(remaining, rng.randint(1, 5))
+        remaining -= count
+        is_regex = rng.random() < regex_share
+        if is_regex:
+            kws = [rf"\b{rng.choice(VOCAB)}\s*\d{{2,}}" for _ in range(count)]
+        else:
+            kws = [synth_word(rng) + " " + rng.choice(VOCAB) for _ in range(count)]
+        alerts.append(SimpleNamespace(
+            id=len(alerts),
+            source_id=rng.choice(CHAT_IDS) if rng.random() < 0.5 else None,
+            keywords=kws,
+            excluded_keywords=[rng.choice(VOCAB)] if rng.random() < 0.1 else [],
+            is_regex=is_regex,
+        ))
+    return alerts
+
+
+def percentile(sorted_values, pct: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_scenario(seed: int, length: str, keywords: int, regex_share: float, tenants: int, messages: int):
+    rng = random.Random(seed)
+
+    tracemalloc.start()
+    rule_sets = [RuleSet(make_alerts(rng, keywords, regex_share)) for _ in range(tenants)]
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    corpus = [(make_message(rng, MESSAGE_LENGTHS[length]), rng.choice(CHAT_IDS)) for _ in range(messages)]
+
+    latencies = []
+    matched = 0
+    start = time.perf_counter()
+    for text, chat_id in corpus:
+        for rules in rule_sets:
+            t0 = time.perf_counter()
+            matched += len(rules.match(text, chat_id))
+            latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    return {
+        "length": length,
+        "keywords": keywords,
+        "regex_share": regex_share,
+        "tenants": tenants,
+        "messages": messages,
+        "matches": matched,
+        "msgs_per_sec": messages / elapsed,
+        "p50_us": percentile(latencies, 50) * 1e6,
+        "p99_us": percentile(latencies, 99) * 1e6,
+        "mean_us": statistics.fmean(latencies) * 1e6,
+        "rules_kib_per_tenant": memory / 1024 / tenants,
+    }
+
+
+def scenarios(quick: bool):
+    if quick:
+        yield "medium", 50, 0.1, 10, 200
+        return
+    for length in MESSAGE_LENGTHS:
+        for keywords in (10, 100, 1000):
+            for regex_share in (0.0, 0.1, 0.5):
+                yield length, keywords, regex_share, 1, 2000
+    for tenants in (10, 100, 1000):
+        yield "medium", 50, 0.1, tenants, max(20, 20000 // tenants)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="run a single small scenario")
+    parser.add_argument("--json", help="also write results to this file")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    header = (f"{'length':>7} {'kw':>5} {'regex':>6} {'tenants':>8} | {'msg/s':>10} "
+              f"{'p50 us':>8} {'p99 us':>8} {'KiB/tenant':>11} {'matches':>8}")
+    print(header)
+    print("-" * len(header))
+
+    results = []
+    for length, keywords, regex_share, tenants, messages in scenarios(args.quick):
+        r = run_scenario(args.seed, length, keywords, regex_share, tenants, messages)
+        results.append(r)
+        print(f"{length:>7} {keywords:>5} {regex_share:>6.0%} {tenants:>8} | {r['msgs_per_sec']:>10.1f} "
+              f"{r['p50_us']:>8.1f} {r['p99_us']:>8.1f} {r['rules_kib_per_tenant']:>11.1f} {r['matches']:>8}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Mass disconnect and recovery, simulated.
+
+N fake clients lose their connection at once and the network stays down
+for --outage seconds: connection attempts hang until a timeout and fail.
+When it comes back, the Telegram side completes a bounded number of
+handshakes at a time (--capacity); attempts beyond that are turned away.
+
+Every client is looked at every ~5 s, as the health scheduler does. The
+previous behaviour reconnects straight away on every check; the governed
+one goes through ReconnectGovernor (per-client backoff, a worker-wide
+concurrency limit, a circuit breaker). Reported: connection attempts made
+while the network was down, peak concurrent attempts, attempts turned away
+for overload, and the time from the network coming back until every client
+is connected again (or how many are after --limit seconds).
+
+Time is compressed by --scale (0.1 = ten times faster than real); all
+figures are reported in real seconds.
+
+Run from the project root:
+    python -m benchmarks.bench_reconnect
+    python -m benchmarks.bench_reconnect --clients 5000 --outage 120
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+
+from app.services.reconnect import ReconnectGovernor
+
+
+class Network:
+    def __init__(self, capacity: int, scale: float, seed: int = 7):
+        self.rng = random.Random(seed)
+        self.capacity = capacity
+        self.scale = scale
+        self.up = False
+        self.in_flight = 0
+        self.peak = 0
+        self.attempts = 0
+        self.attempts_down = 0
+        self.overloaded = 0
+
+    async def connect(self):
+        self.attempts += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            if not self.up:
+                self.attempts_down += 1
+                await asyncio.sleep(self.rng.uniform(2.0, 5.0) * self.scale)  # connect timeout
+                raise ConnectionError("timed out")
+            busy = self.in_flight > self.capacity
+            await asyncio.sleep(self.rng.uniform(0.2, 0.5) * self.scale)  # handshake
+            if busy:
+                self.overloaded += 1
+                raise ConnectionError("server overloaded")
+        finally:
+            self.in_flight -= 1
+
+
+async def client_loop(key, net: Network, governor, connected: dict, scale: float):
+    rng = random.Random(key)
+    await asyncio.sleep(rng.uniform(0, 5.0) * scale)  # health checks are spread
+    while not connected[key]:
+        if governor is None:
+            try:
+                await net.connect()
+                connected[key] = True
+            except ConnectionError:
+                pass
+        elif governor.ready(key):
+            connected[key] = await governor.attempt(key, net.connect)
+        if not connected[key]:
+            await asyncio.sleep(rng.uniform(4.0, 6.0) * scale)
+
+
+async def run(clients: int, outage: float, capacity: int, scale: float, governed: bool, limit: float,
+              concurrency: int):
+    net = Network(capacity, scale)
+    governor = ReconnectGovernor(
+        concurrency=concurrency, base_delay=1.0 * scale, max_delay=300.0 * scale,
+        threshold=10, cooldown=10.0 * scale, max_cooldown=120.0 * scale,
+    ) if governed else None
+    connected = {i: False for i in range(clients)}
+    loops = [asyncio.create_task(client_loop(i, net, governor, connected, scale)) for i in connected]
+
+    await asyncio.sleep(outage * scale)
+    net.up = True
+    up_at = time.monotonic()
+    while not all(connected.values()) and time.monotonic() - up_at < limit * scale:
+        await asyncio.sleep(0.05 * scale)
+    recovery = (time.monotonic() - up_at) / scale
+    for loop in loops:
+        loop.cancel()
+    return net, recovery, sum(connected.values())
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--outage", type=float, default=60, help="simulated seconds the network is down")
+    parser.add_argument("--capacity", type=int, default=50, help="concurrent handshakes the server accepts")
+    parser.add_argument("--concurrency", type=int, default=20, help="RECONNECT_CONCURRENCY")
+    parser.add_argument("--limit", type=float, default=600, help="simulated seconds to wait for recovery")
+    parser.add_argument("--scale", type=float, default=0.1)
+    args = parser.parse_args()
+    logging.getLogger("worker").setLevel(logging.CRITICAL)
+
+    for name, governed in (("reconnect at once", False), ("governed", True)):
+        net, recovery, done = await run(args.clients, args.outage, args.capacity, args.scale, governed, args.limit,
+                                        args.concurrency)
+        print(f"{name:<17} | {net.attempts_down:>6} attempts while down | peak {net.peak:>5} concurrent "
+              f"| {net.overloaded:>6} turned away | {done:>5}/{args.clients} connected "
+              f"{recovery:>6.1f} s after network back")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
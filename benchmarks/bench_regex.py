@@ -0,0 +1,113 @@
+"""
+Regex alerts on the worker's path: every message checked against a tenant's
+regex rules under the time budget (regex_guard).
+
+Compares sending every rule of the chat to the pool, one re.search per
+pattern there, with the literal prefilter in front of it (only rules whose
+required literals are in the text go to the pool, in one round trip).
+Inline matching without a time budget is shown for reference; the worker
+does not do it.
+
+Run from the project root:
+    python -m benchmarks.bench_regex
+    python -m benchmarks.bench_regex --messages 500
+"""
+import argparse
+import asyncio
+import random
+import re
+import time
+from types import SimpleNamespace
+
+from app.services.matcher import RuleSet
+from app.services.regex_guard import RegexGuard
+
+WORDS = ["price", "pump", "urgent", "meeting", "deploy", "server", "token", "airdrop",
+         "hello", "team", "update", "release", "wallet", "signal", "launch", "moon"]
+CHATTER = ["gm", "lol", "check", "this", "out", "today", "now", "big", "news", "thanks",
+           "anyone", "here", "what", "about", "the", "new", "one", "guys", "ok", "yes"]
+
+
+def make_alerts(count: int, rng: random.Random):
+    alerts = []
+    for i in range(count):
+        patterns = [
+            rf"\b{rng.choice(WORDS)}\s+\d{{{rng.randint(2, 4)}}}\b",
+            rf"{rng.choice(WORDS)}[-_ ]?(v|x)\d+",
+        ]
+        alerts.append(SimpleNamespace(
+            id=i, source_id=None, keywords=patterns,
+            excluded_keywords=[], is_regex=True
+        ))
+    return alerts
+
+
+def make_messages(count: int, rng: random.Random):
+    """Mostly chatter; one message in five mentions a watched word."""
+    messages = []
+    for _ in range(count):
+        words = [rng.choice(CHATTER) for _ in range(rng.randint(5, 40))]
+        if rng.random() < 0.2:
+            words.insert(rng.randrange(len(words)), f"{rng.choice(WORDS)} {rng.randint(1, 9999)}")
+        messages.append(" ".join(words))
+    return messages
+
+
+def search_each(rules, text):
+    """Runs in a pool process: the previous pool call, one search per pattern."""
+    triggers = []
+    for patterns in rules:
+        triggers.append(next((pat for pat in patterns if re.search(pat, text, re.IGNORECASE)), None))
+    return triggers
+
+
+async def run(alert_count: int, messages, rng):
+    alerts = make_alerts(alert_count, rng)
+    guarded_rules = RuleSet(alerts, guard_cost=0)
+    inline_rules = RuleSet(alerts)
+    all_patterns = [[pat for pat, _ in rule.patterns] for rule in guarded_rules.rules]
+    guard = RegexGuard(workers=2, timeout=1)
+    try:
+        await guard.search_rules(all_patterns, "warm up")
+        await guard._run(search_each, all_patterns, "warm up")
+
+        start = time.perf_counter()
+        for text in messages:
+            await guard._run(search_each, all_patterns, text)
+        every = time.perf_counter() - start
+
+        pool_calls = 0
+        start = time.perf_counter()
+        for text in messages:
+            guarded = []
+            guarded_rules.match(text, 1, guarded=guarded)
+            if guarded:
+                pool_calls += 1
+                await guard.search_rules([[pat for pat, _ in rule.patterns] for rule in guarded], text)
+        prefiltered = time.perf_counter() - start
+    finally:
+        guard.shutdown()
+
+    start = time.perf_counter()
+    for text in messages:
+        inline_rules.match(text, 1)
+    inline = time.perf_counter() - start
+
+    n = len(messages)
+    print(f"{alert_count:>5} alerts | every rule to pool {n / every:>8.0f} msg/s | "
+          f"prefiltered {n / prefiltered:>8.0f} msg/s ({pool_calls / n:>4.0%} to pool) | "
+          f"x{every / prefiltered:.1f} | inline, unbounded {n / inline:>8.0f} msg/s")
+
+
+async def main(message_count: int):
+    rng = random.Random(42)
+    messages = make_messages(message_count, rng)
+    for count in (5, 25, 100, 400):
+        await run(count, messages, rng)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.messages))
@@ -0,0 +1,179 @@
+"""
+Session discovery: 5-second full scans vs the incremental session feed.
+
+Fills a telegram_sessions table with N active sessions (realistic ~350
+byte session strings), then for --duration seconds adds new sessions at
+random moments. The previous loop selects every active row, session string
+included, every 5 s; the SessionFeed is woken by a (simulated) NOTIFY after
+each commit, polls `updated_at` every 30 s as a fallback, and loads a
+session string only for the new user. Reported: database time spent per
+minute, rows and session-string bytes read per minute, and how long a new
+session waited before the worker saw it.
+
+Runs against a throwaway SQLite file by default (--url for another
+database). Time is compressed by --scale; figures are in real seconds.
+
+Run from the project root:
+    python -m benchmarks.bench_sessions
+    python -m benchmarks.bench_sessions --sessions 50000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import select
+
+from app.db.session import AsyncSession
+from app.models import TelegramSession
+from app.services import session_feed as feed_module
+from app.services.session_feed import SessionFeed, fetch_sessions
+
+
+def session_row(rng: random.Random, age: float = 0.0) -> TelegramSession:
+    now = datetime.now(timezone.utc) - timedelta(seconds=age)
+    return TelegramSession(
+        user_id=uuid4(),
+        session_string="1" + "".join(rng.choices(string.ascii_letters + string.digits, k=352)),
+        phone_number="+1555" + "".join(rng.choices(string.digits, k=7)),
+        telegram_id=str(rng.randrange(10 ** 9, 10 ** 10)),
+        created_at=now,
+        updated_at=now,
+    )
+
+
+class Meter:
+    def __init__(self):
+        self.db_time = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.latencies = []
+
+    def read(self, started: float, rows):
+        self.db_time += time.perf_counter() - started
+        self.rows += len(rows)
+        self.bytes += sum(len(getattr(row, "session_string", "") or "") for row in rows)
+
+
+async def fill(engine, count: int, rng: random.Random):
+    async with engine.begin() as conn:
+        await conn.run_sync(TelegramSession.__table__.drop, checkfirst=True)
+        await conn.run_sync(TelegramSession.__table__.create)
+    async with AsyncSession(engine) as session:
+        for _ in range(count):
+            session.add(session_row(rng, age=rng.uniform(3600, 90 * 86400)))
+        await session.commit()
+
+
+async def add_sessions(engine, count: int, duration: float, scale: float, rng: random.Random,
+                       created: dict, on_commit=None):
+    times = sorted(rng.uniform(0, duration) for _ in range(count))
+    start = time.monotonic()
+    for at in times:
+        await asyncio.sleep(max(0.0, start + at * scale - time.monotonic()))
+        row = session_row(rng)
+        user_id = str(row.user_id)
+        async with AsyncSession(engine) as session:
+            session.add(row)
+            await session.commit()
+        created[user_id] = time.monotonic()
+        if on_commit:
+            on_commit(user_id)
+
+
+async def full_scans(engine, meter: Meter, created: dict, scale: float):
+    """The previous monitor loop."""
+    seen = set()
+    while True:
+        started = time.perf_counter()
+        async with AsyncSession(engine) as session:
+            statement = select(TelegramSession).where(TelegramSession.is_active == True)
+            rows = (await session.execute(statement)).scalars().all()
+        meter.read(started, rows)
+        for row in rows:
+            user_id = str(row.user_id)
+            if user_id not in seen:
+                seen.add(user_id)
+                if user_id in created:
+                    meter.latencies.append((time.monotonic() - created[user_id]) / scale)
+        await asyncio.sleep(5.0 * scale)
+
+
+async def run(name: str, args, engine):
+    rng = random.Random(7)
+    await fill(engine, args.sessions, rng)
+    meter = Meter()
+    created = {}
+
+    if name == "full scan every 5 s":
+        loop = asyncio.create_task(full_scans(engine, meter, created, args.scale))
+        on_commit = None
+    else:
+        async def on_change(user_id, active):
+            started = time.perf_counter()
+            rows = await fetch_sessions([user_id])
+            meter.read(started, rows)
+            if user_id in created:
+                meter.latencies.append((time.monotonic() - created[user_id]) / args.scale)
+
+        feed = SessionFeed(on_change)
+        real_fetch = feed_module.fetch_session_changes
+
+        async def metered_fetch(since):
+            started = time.perf_counter()
+            rows = await real_fetch(since)
+            meter.read(started, rows)
+            return rows
+
+        feed_module.fetch_session_changes = metered_fetch
+        loop = asyncio.create_task(feed.watch(30.0 * args.scale))
+        on_commit = feed.notify
+
+    await add_sessions(engine, args.new, args.duration, args.scale, rng, created, on_commit)
+    await asyncio.sleep(6.0 * args.scale)  # let the last one be seen
+    loop.cancel()
+    if name != "full scan every 5 s":
+        feed_module.fetch_session_changes = real_fetch
+
+    minutes = (args.duration + 6.0) / 60
+    lat = sorted(meter.latencies) or [float("nan")]
+    # Same queries as in real time, so DB time per simulated second is the real load
+    print(f"{name:<20} | DB {meter.db_time * 1000 / (args.duration + 6.0):>7.1f} ms/s "
+          f"| {meter.rows / minutes:>9.0f} rows/min | {meter.bytes / minutes / 1e3:>8.1f} kB strings/min "
+          f"| new session seen after p50 {statistics.median(lat):.2f} s, max {lat[-1]:.2f} s")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--new", type=int, default=30, help="sessions added during the run")
+    parser.add_argument("--duration", type=float, default=120, help="simulated seconds")
+    parser.add_argument("--scale", type=float, default=0.1)
+    parser.add_argument("--url", default=None, help="database URL (default: a temporary SQLite file)")
+    args = parser.parse_args()
+
+    path = None
+    if args.url is None:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        args.url = f"sqlite+aiosqlite:///{path}"
+    engine = create_async_engine(args.url)
+    feed_module.engine = engine
+    try:
+        for name in ("full scan every 5 s", "session feed"):
+            await run(name, args, engine)
+    finally:
+        await engine.dispose()
+        if path:
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""
+CPU for one public channel shared by many tenants: every tenant scanning
+the message itself vs reusing the shared scan (app/services/shared_scan.py).
+
+Run from the project root:
+    python -m benchmarks.bench_shared_scan
+"""
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+from app.services.matcher import RuleSet
+from app.services.shared_scan import SharedScanCache
+
+VOCAB = ["price", "pump", "urgent", "meeting", "deploy", "server", "token", "airdrop",
+         "hello", "team", "update", "release", "wallet", "signal", "launch", "moon",
+         "bitcoin", "eth", "sol", "listing", "presale", "whitelist", "giveaway", "admin"]
+
+CHANNEL_ID = -1001234567890
+
+
+class PatternSource:
+    """Stands in for AlertCache."""
+
+    def __init__(self, rule_sets):
+        self.rule_sets = rule_sets
+        self.generation = 1
+        for rules in rule_sets:
+            rules.generation = 1
+
+    def patterns(self):
+        found = set()
+        for rules in self.rule_sets:
+            found.update(rules.patterns())
+        return found
+
+
+def make_tenant(rng: random.Random) -> RuleSet:
+    alerts = [
+        SimpleNamespace(
+            id=i, source_id=rng.choice([None, CHANNEL_ID]), is_regex=False,
+            keywords=[f"{rng.choice(VOCAB)} {rng.choice(VOCAB)}" for _ in range(rng.randint(1, 4))],
+            excluded_keywords=[],
+        )
+        for i in range(8)
+    ]
+    return RuleSet(alerts)
+
+
+async def main():
+    rng = random.Random(3)
+    messages = [" ".join(rng.choice(VOCAB) for _ in range(rng.randint(10, 80))) for _ in range(100)]
+
+    for tenants in (10, 100, 1000):
+        rule_sets = [make_tenant(rng) for _ in range(tenants)]
+        source = PatternSource(rule_sets)
+        cache = SharedScanCache(source)
+        await cache._rebuild(source.generation)
+
+        start = time.perf_counter()
+        own = 0
+        for msg_id, text in enumerate(messages):
+            for rules in rule_sets:
+                own += len(rules.match(text, CHANNEL_ID))
+        own_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        shared = 0
+        for msg_id, text in enumerate(messages):
+            for rules in rule_sets:
+                scan = cache.scan(CHANNEL_ID, msg_id, text)
+                shared += len(rules.match(text, CHANNEL_ID, scan))
+        shared_elapsed = time.perf_counter() - start
+
+        assert own == shared, (own, shared)
+        per_msg_own = own_elapsed / len(messages) * 1000
+        per_msg_shared = shared_elapsed / len(messages) * 1000
+        print(f"{tenants:>5} tenants | own scans {per_msg_own:>8.2f} ms/msg | "
+              f"shared {per_msg_shared:>8.2f} ms/msg | x{own_elapsed / shared_elapsed:.1f} | {cache.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+"""
+Email throughput against a local SMTP stand-in (aiosmtpd).
+
+Compares the previous transport (a new smtplib connection + login per
+message, run in a thread) with the pooled aiosmtplib transport. The
+stand-in delays EHLO to model the round trips of a remote server's
+handshake (TCP + TLS + greeting), which is what pooling saves, and DATA
+to model the server's per-message work, which is what the pool size
+parallelises.
+
+Run from the project root (needs aiosmtpd):
+    python -m benchmarks.bench_smtp
+    python -m benchmarks.bench_smtp --messages 1000 --handshake-ms 50 --data-ms 10
+"""
+import argparse
+import asyncio
+import smtplib
+import socket
+import logging
+import time
+from email.message import EmailMessage
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+from app.services.smtp_pool import SMTPPool
+
+
+class Handler:
+    def __init__(self, handshake: float, data: float):
+        self.handshake = handshake
+        self.data = data
+        self.received = 0
+        self.sessions = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        await asyncio.sleep(self.handshake)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.data)
+        self.received += 1
+        return "250 OK"
+
+
+def authenticator(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=True)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_message(i: int) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = f"TeleGuard Alert: presale {i}"
+    msg["From"] = "alerts@example.com"
+    msg["To"] = f"user{i % 50}@example.com"
+    msg.set_content("Alert triggered by: 'presale'\n\n" + "x" * 500)
+    msg.add_alternative("<html><body>" + "x" * 2000 + "</body></html>", subtype="html")
+    return msg
+
+
+def send_per_connection(msg, host, port):
+    # The old worker path, minus TLS (the stand-in speaks plain SMTP)
+    with smtplib.SMTP(host, port) as server:
+        server.login("user", "secret")
+        server.send_message(msg)
+
+
+async def run(send, messages: int, concurrency: int):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with slots:
+            await send(make_message(i))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(messages)))
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--handshake-ms", type=float, default=20.0, help="simulated connection setup cost")
+    parser.add_argument("--data-ms", type=float, default=5.0, help="simulated server time per message")
+    args = parser.parse_args()
+    logging.getLogger("mail.log").setLevel(logging.ERROR)  # aiosmtpd's own AUTH deprecation noise
+
+    handler = Handler(args.handshake_ms / 1000, args.data_ms / 1000)
+    host, port = "127.0.0.1", free_port()
+    controller = Controller(handler, hostname=host, port=port, authenticator=authenticator,
+                            auth_require_tls=False)
+    controller.start()
+
+    async def threaded(msg):
+        await asyncio.to_thread(send_per_connection, msg, host, port)
+
+    modes = [("connection per message", threaded, None)]
+    for size in (1, 4, 8):
+        pool = SMTPPool(host, port, "user", "secret", size=size, start_tls=False)
+        modes.append((f"pool of {size}", pool.send, pool))
+
+    for name, send, pool in modes:
+        handler.received = handler.sessions = 0
+        elapsed = await run(send, args.messages, args.concurrency)
+        if pool is not None:
+            await pool.close()
+        print(f"{name:<24} | {handler.received / elapsed:>7.0f} msgs/s | "
+              f"{handler.sessions:>4} SMTP sessions for {handler.received} messages")
+    controller.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
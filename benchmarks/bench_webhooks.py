@@ -0,0 +1,126 @@
+"""
+Webhook delivery throughput against a local stand-in receiver.
+
+The receiver is a minimal HTTP/1.1 server (asyncio streams, keep-alive,
+configurable per-request latency) that counts events and TCP connections.
+Compares a fresh client per delivery (a connection per alert) with the
+worker's pooled WebhookSender, with and without per-URL batching.
+
+Run from the project root:
+    python -m benchmarks.bench_webhooks
+    python -m benchmarks.bench_webhooks --events 5000 --latency-ms 5
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from app.services.webhooks import WebhookSender
+
+
+class Receiver:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self.events = 0
+        self._server = None
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                close = False
+                for line in head.decode("latin-1").split("\r\n")[1:]:
+                    name, _, value = line.partition(":")
+                    name = name.strip().lower()
+                    if name == "content-length":
+                        length = int(value)
+                    elif name == "connection" and value.strip().lower() == "close":
+                        close = True
+                body = await reader.readexactly(length)
+                self.requests += 1
+                self.events += len(json.loads(body)["events"])
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                writer.write(b"HTTP/1.1 204 No Content\r\nContent-Length: 0\r\n\r\n")
+                await writer.drain()
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def reset(self):
+        self.connections = self.requests = self.events = 0
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+
+async def fresh_client_send(url: str, event) -> bool:
+    async with httpx.AsyncClient(timeout=5.0) as client:
+        response = await client.post(url, json={"events": [event]})
+        return response.is_success
+
+
+async def run(send, urls, events: int, concurrency: int):
+    """Deliver `events` alerts round-robin over `urls`, `concurrency` at a time."""
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with slots:
+            start = time.perf_counter()
+            ok = await send(urls[i % len(urls)], {"alert_id": str(i), "trigger": "presale", "message": "x" * 200})
+            latencies.append(time.perf_counter() - start)
+            return ok
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(events)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return elapsed, sum(results), latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--urls", type=int, default=4, help="distinct webhook URLs (same host)")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="receiver processing time per request")
+    args = parser.parse_args()
+
+    receiver = Receiver(args.latency_ms / 1000)
+    port = await receiver.start()
+    urls = [f"http://127.0.0.1:{port}/hook/{n}" for n in range(args.urls)]
+
+    modes = [
+        ("client per delivery", None),
+        ("pooled", WebhookSender(per_host=32, allow_private=True)),
+        ("pooled + 10 ms batch", WebhookSender(per_host=32, batch_window=0.010, batch_size=50, allow_private=True)),
+    ]
+    for name, sender in modes:
+        receiver.reset()
+        send = fresh_client_send if sender is None else sender.send
+        elapsed, ok, p50, p95 = await run(send, urls, args.events, args.concurrency)
+        if sender is not None:
+            await sender.close()
+        print(f"{name:<22} | {ok / elapsed:>7.0f} deliveries/s | p50 {p50 * 1000:>6.1f} ms "
+              f"p95 {p95 * 1000:>6.1f} ms | {receiver.requests:>5} requests, "
+              f"{receiver.connections:>5} connections | {ok}/{args.events} ok")
+    await receiver.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
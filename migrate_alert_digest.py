@@ -0,0 +1,21 @@
+import asyncio
+from sqlalchemy import text
+from app.db.session import engine
+
+async def migrate():
+    print("Starting migration: Adding coalescing/digest settings to alerts...")
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("ALTER TABLE alerts ADD COLUMN IF NOT EXISTS coalesce_seconds INTEGER DEFAULT 0;"))
+            await conn.execute(text("ALTER TABLE alerts ADD COLUMN IF NOT EXISTS email_digest VARCHAR;"))
+            # Digest runs look for unsent rows of recent logs
+            await conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_alert_logs_undigested ON alert_logs (created_at) "
+                "WHERE dispatched_to_email = false;"
+            ))
+        print("Migration successful: Added coalesce_seconds and email_digest.")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,17 @@
+import asyncio
+from sqlalchemy import text
+from app.db.session import engine
+
+async def migrate():
+    print("Starting migration: Adding rate limit columns to alerts...")
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("ALTER TABLE alerts ADD COLUMN IF NOT EXISTS cooldown_seconds INTEGER DEFAULT 0;"))
+            await conn.execute(text("ALTER TABLE alerts ADD COLUMN IF NOT EXISTS max_per_hour INTEGER DEFAULT 0;"))
+            await conn.execute(text("ALTER TABLE alerts ADD COLUMN IF NOT EXISTS suppressed_count INTEGER DEFAULT 0;"))
+        print("Migration successful: Added cooldown_seconds, max_per_hour and suppressed_count.")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
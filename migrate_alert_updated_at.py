@@ -0,0 +1,15 @@
+import asyncio
+from sqlalchemy import text
+from app.db.session import engine
+
+async def migrate():
+    print("Starting migration: Adding updated_at to alerts...")
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("ALTER TABLE alerts ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT now();"))
+        print("Migration successful: Added updated_at column.")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,15 @@
+import asyncio
+from sqlalchemy import text
+from app.db.session import engine
+
+async def migrate():
+    print("Starting migration: Adding fuzzy_distance to alerts...")
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("ALTER TABLE alerts ADD COLUMN IF NOT EXISTS fuzzy_distance INTEGER DEFAULT 0;"))
+        print("Migration successful: Added fuzzy_distance column.")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,15 @@
+import asyncio
+from sqlalchemy import text
+from app.db.session import engine
+
+async def migrate():
+    print("Starting migration: Adding claim_token to notification_outbox...")
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("ALTER TABLE notification_outbox ADD COLUMN IF NOT EXISTS claim_token UUID;"))
+        print("Migration successful: Added claim_token column.")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
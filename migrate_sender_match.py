@@ -0,0 +1,16 @@
+import asyncio
+from sqlalchemy import text
+from app.db.session import engine
+
+async def migrate():
+    print("Starting migration: Adding sender_ids and sender_usernames to alerts...")
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("ALTER TABLE alerts ADD COLUMN IF NOT EXISTS sender_ids BIGINT[] DEFAULT '{}';"))
+            await conn.execute(text("ALTER TABLE alerts ADD COLUMN IF NOT EXISTS sender_usernames TEXT[] DEFAULT '{}';"))
+        print("Migration successful: Added sender match columns.")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,16 @@
+import asyncio
+from sqlalchemy import text
+from app.db.session import engine
+
+async def migrate():
+    print("Starting migration: Adding updated_at to telegram_sessions...")
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("ALTER TABLE telegram_sessions ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT now();"))
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_telegram_sessions_updated_at ON telegram_sessions (updated_at);"))
+        print("Migration successful: Added updated_at column and index.")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,16 @@
+import asyncio
+from sqlalchemy import text
+from app.db.session import engine
+
+async def migrate():
+    print("Starting migration: Adding webhook delivery flags...")
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("ALTER TABLE alert_logs ADD COLUMN IF NOT EXISTS dispatched_to_webhook BOOLEAN DEFAULT FALSE;"))
+            await conn.execute(text("ALTER TABLE notification_outbox ADD COLUMN IF NOT EXISTS webhook_done BOOLEAN DEFAULT FALSE;"))
+        print("Migration successful: Added dispatched_to_webhook and webhook_done.")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
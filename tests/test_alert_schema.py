@@ -0,0 +1,38 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.alert import AlertCreate
+
+
+@pytest.mark.parametrize("pattern", [
+    r"(a+)+",
+    r"(a+)+$",
+    r"(a|aa)*b",
+    r"(.*a){12}",
+    r"(\w+\s?)*$",
+    r"\w*\w*\w*x",
+    r"(\d+|x)*y",
+])
+def test_backtracking_regex_is_rejected(pattern):
+    with pytest.raises(ValidationError, match="too expensive"):
+        AlertCreate(keywords=[pattern], is_regex=True)
+
+
+@pytest.mark.parametrize("pattern", [
+    r"btc\s+\d{3,}",
+    r"\$\d+(?:,\d{3})*",
+    r"\b(buy|sell)\s+\d+\b",
+    r"\w+\s?\w+",
+    r".*foo.*bar",
+    r"(\w+\s){3}",
+    r"(?:\s+\w+)*",
+    r"(foo|foobar)*",
+    r"(?:https?://)?t\.me/\w+",
+])
+def test_ordinary_regex_is_accepted(pattern):
+    assert AlertCreate(keywords=[pattern], is_regex=True).keywords == [pattern]
+
+
+def test_invalid_regex_is_rejected():
+    with pytest.raises(ValidationError, match="Invalid regex"):
+        AlertCreate(keywords=["(unclosed"], is_regex=True)
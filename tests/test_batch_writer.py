@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+from sqlalchemy import Column, Integer, MetaData, String, Table, event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.services import batch_writer
+from app.services.batch_writer import BatchWriter
+
+metadata = MetaData()
+rows_table = Table("rows", metadata, Column("id", Integer, primary_key=True), Column("v", String, nullable=False))
+
+
+def write(monkeypatch, values, max_batch=500):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    monkeypatch.setattr(batch_writer, "engine", engine)
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT"):
+            statements.append(executemany)
+
+    async def run():
+        async with engine.begin() as conn:
+            await conn.run_sync(metadata.create_all)
+        writer = BatchWriter(rows_table, max_batch=max_batch, max_attempts=1)
+        for i, v in enumerate(values):
+            writer.add(id=i, v=v)
+        await writer.close()
+        async with engine.connect() as conn:
+            written = (await conn.execute(rows_table.select())).all()
+        await engine.dispose()
+        return writer, written
+
+    writer, written = asyncio.run(run())
+    return writer, written, statements
+
+
+def test_batch_is_one_multi_row_insert(monkeypatch):
+    writer, written, statements = write(monkeypatch, ["x"] * 300)
+    assert len(written) == 300
+    assert statements == [False]
+    assert writer.batches == 1
+
+
+def test_rejected_rows_are_isolated(monkeypatch):
+    values = ["x"] * 100
+    values[10] = values[70] = None
+    writer, written, _ = write(monkeypatch, values)
+    assert len(written) == 98
+    assert writer.dropped == 2
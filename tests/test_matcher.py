@@ -0,0 +1,73 @@
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.matcher import RuleSet
+from app.services.regex_guard import literals_apply, required_literals
+
+
+def alert(id, keywords, is_regex=True, **fields):
+    return SimpleNamespace(id=id, source_id=fields.pop("source_id", None), keywords=keywords,
+                           excluded_keywords=fields.pop("excluded_keywords", []), is_regex=is_regex, **fields)
+
+
+def guarded_ids(rules, text, chat_id=1, **kwargs):
+    guarded = []
+    rules.match(text, chat_id, guarded=guarded, **kwargs)
+    return [rule.alert.id for rule in guarded]
+
+
+@pytest.mark.parametrize("pattern, literals", [
+    (r"\bbtc\s+\d{3,}", ["btc"]),
+    (r"(buy|sell)\s+\d+", ["buy", "sell"]),
+    (r"price[:=]\s*\d+", ["price"]),
+    (r"(?:https?://)?t\.me/\w+", ["t.me/"]),
+    (r"\$\d+", None),
+    (r"(?:foo)?bar\d", ["bar"]),
+    (r"(foo|)\d+", None),
+])
+def test_required_literals(pattern, literals):
+    assert required_literals(pattern) == literals
+
+
+@pytest.mark.parametrize("pattern, text", [
+    ("issue", "ıssue"),
+    ("sister", "ſiſter"),
+    ("kelvin", "\u212aelvin"),
+    ("σοφος", "ΣΟΦΟΣ"),
+    ("this", "THİS"),
+])
+def test_case_variants_are_not_missed(pattern, text):
+    assert re.search(pattern, text, re.IGNORECASE)
+    text_lower = text.lower()
+    assert not literals_apply(text_lower) or any(literal in text_lower for literal in required_literals(pattern))
+
+
+def test_guarded_rules_need_a_literal():
+    rules = RuleSet([
+        alert(1, [r"\bbtc\s+\d{3,}"]),
+        alert(2, [r"\d{5}"]),
+        alert(3, ["btc"], is_regex=False),
+    ], guard_cost=0)
+    assert guarded_ids(rules, "nothing here") == [2]
+    assert guarded_ids(rules, "BTC 1000") == [1, 2]
+    matches = rules.match("BTC 1000", 1)
+    assert [m.alert.id for m in matches] == [3]
+
+
+def test_guarded_candidates_respect_exclusions_and_senders():
+    rules = RuleSet([
+        alert(1, [r"btc\s+\d+"], excluded_keywords=["scam"]),
+        alert(2, [r"btc\s+\d+"], sender_ids=[7]),
+        alert(3, [r"btc\s+\d+"], source_id=-100),
+    ], guard_cost=0)
+    assert guarded_ids(rules, "btc 100 scam", sender_id=7) == [2]
+    assert guarded_ids(rules, "btc 100", sender_id=8) == [1]
+    assert guarded_ids(rules, "btc 100", chat_id=-100, sender_id=7) == [1, 2, 3]
+
+
+def test_guarded_rules_are_not_matched_inline():
+    rules = RuleSet([alert(1, [r"btc\s+\d+"])], guard_cost=0)
+    assert rules.match("btc 100", 1) == []
+    assert [m.alert.id for m in RuleSet([alert(1, [r"btc\s+\d+"])]).match("btc 100", 1)] == [1]
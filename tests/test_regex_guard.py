@@ -0,0 +1,41 @@
+import asyncio
+
+from app.services.regex_guard import RegexGuard, RegexTimeout
+
+
+def test_timeout_does_not_fail_concurrent_searches():
+    async def scenario():
+        guard = RegexGuard(workers=2, timeout=0.3)
+        try:
+            async def benign():
+                await asyncio.sleep(0.05)
+                return await guard.search([r"hello"], "say hello")
+
+            slow, fast = await asyncio.gather(
+                guard.search([r"(a+)+$"], "a" * 40 + "!"), benign(), return_exceptions=True,
+            )
+            rules = await guard.search_rules([["foo"], [r"(a+)+$"], ["bar"]], "foo bar " + "a" * 40 + "!")
+            return slow, fast, rules
+        finally:
+            guard.shutdown()
+
+    slow, fast, rules = asyncio.run(scenario())
+    assert isinstance(slow, RegexTimeout)
+    assert fast == "hello"
+    assert rules == (["foo", None, "bar"], [1])
+
+
+def test_dead_process_is_replaced():
+    async def scenario():
+        guard = RegexGuard(workers=1, timeout=1)
+        try:
+            await guard.search(["x"], "x")
+            for executor in guard._executors:
+                for process in executor._processes.values():
+                    process.kill()
+            await asyncio.sleep(0.1)
+            return await guard.search(["bar"], "foo bar")
+        finally:
+            guard.shutdown()
+
+    assert asyncio.run(scenario()) == "bar"
@@ -0,0 +1,92 @@
+import asyncio
+import socket
+from email.message import EmailMessage
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+import aiosmtplib
+from aiosmtpd.controller import Controller
+
+from app.services.smtp_pool import SMTPPool
+
+
+class Handler:
+    def __init__(self):
+        self.received = []
+        self.drop_next_mail = False
+
+    async def handle_MAIL(self, server, session, envelope, address, mail_options):
+        if self.drop_next_mail:
+            # The server goes away mid-conversation on a connection the pool reuses
+            self.drop_next_mail = False
+            server.transport.close()
+            return "421 closing"
+        envelope.mail_from = address
+        return "250 OK"
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("nobody@"):
+            return "550 no such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received.append(envelope.content)
+        return "250 OK"
+
+
+def message(number: int, to: str = "user@example.com") -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = "alerts@example.com"
+    msg["To"] = to
+    msg["Subject"] = f"alert {number}"
+    msg.set_content(f"body {number}")
+    return msg
+
+
+@pytest.fixture
+def smtp_server():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    handler = Handler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield handler, port
+    controller.stop()
+
+
+def test_dropped_connection_is_retried_once(smtp_server):
+    handler, port = smtp_server
+
+    async def scenario():
+        pool = SMTPPool("127.0.0.1", port, size=1, start_tls=False)
+        await pool.send(message(1))
+        handler.drop_next_mail = True
+        await pool.send(message(2))
+        await pool.close()
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert pool.reconnects == 1
+    assert pool.connects == 2
+    assert pool.sent == 2
+    assert len(handler.received) == 2
+
+
+def test_refused_recipient_keeps_the_connection(smtp_server):
+    handler, port = smtp_server
+
+    async def scenario():
+        pool = SMTPPool("127.0.0.1", port, size=1, start_tls=False)
+        with pytest.raises(aiosmtplib.SMTPRecipientsRefused):
+            await pool.send(message(1, to="nobody@example.com"))
+        await pool.send(message(2))
+        await pool.close()
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert pool.connects == 1
+    assert pool.sent == 1
+    assert len(handler.received) == 1
@@ -0,0 +1,69 @@
+import asyncio
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from app.services import webhooks
+from app.services.webhooks import WebhookSender
+
+
+class Handler(BaseHTTPRequestHandler):
+    received = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.received.append(json.loads(body))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    Handler.received = []
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/hook", Handler.received
+    server.shutdown()
+    server.server_close()
+
+
+def deliver(sender: WebhookSender, url: str, event: dict) -> bool:
+    async def run():
+        try:
+            return await sender.send(url, event)
+        finally:
+            await sender.close()
+    return asyncio.run(run())
+
+
+def test_private_address_is_refused_without_retry(http_server):
+    url, received = http_server
+    sender = WebhookSender(retries=2, backoff=0)
+    assert deliver(sender, url, {"id": 1}) is False
+    assert sender.requests == 1
+    assert received == []
+
+
+def test_public_address_is_delivered(http_server, monkeypatch):
+    monkeypatch.setattr(webhooks, "is_public_address", lambda address: True)
+    url, received = http_server
+    sender = WebhookSender(retries=0)
+    assert deliver(sender, url, {"id": 1}) is True
+    assert received == [{"events": [{"id": 1}]}]
+
+
+def test_connection_errors_are_retried(monkeypatch):
+    monkeypatch.setattr(webhooks, "is_public_address", lambda address: True)
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    sender = WebhookSender(retries=1, backoff=0)
+    assert deliver(sender, f"http://127.0.0.1:{port}/hook", {"id": 1}) is False
+    assert sender.requests == 2
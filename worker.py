@@ -1,22 +1,44 @@
 import asyncio
 import logging
-import re
-import smtplib
 from email.message import EmailMessage
-import ssl
-from typing import List, Dict
+import time
+from datetime import datetime, timedelta
+from typing import Any, List, Dict, NamedTuple, Optional
+from uuid import uuid4
 
 from telethon import TelegramClient, events
 from telethon.sessions import StringSession
+from telethon.errors import FloodWaitError
 from sqlmodel import select
+from sqlalchemy import and_, or_, update
 from sqlalchemy.orm import selectinload
 
 from app.db.session import engine, AsyncSession
 from app.models import TelegramSession, Alert, AlertLog
 
-from app.db.session import engine, AsyncSession
-from app.models import TelegramSession, Alert, AlertLog
 from app.core.config import settings
+from app.services.alert_cache import alert_cache
+from app.services.target_cache import target_cache
+from app.services.db_events import (
+    ChangeListener, ALERTS_CHANNEL, SESSIONS_CHANNEL, TARGETS_CHANNEL,
+    notify_alerts_changed, notify_session_changed, notify_targets_changed
+)
+from app.services.dedup import TenantDedupCache
+from app.services.batcher import MicroBatcher
+from app.services.shared_scan import SharedScanCache
+from app.services.matcher import Match
+from app.services.regex_guard import RegexGuard
+from app.services.suppression import NearDuplicateFilter, simhash
+from app.services.rate_limit import AlertRateLimiter
+from app.services.bot_queue import BotSendQueue
+from app.services.batch_writer import BatchWriter
+from app.services.counters import AlertCounters
+from app.services.health import HealthScheduler
+from app.services.reconnect import ReconnectGovernor
+from app.services.session_feed import SessionFeed, fetch_sessions
+from app.services.outbox import OutboxDispatcher, OutboxResult, OutboxWriter
+from app.services.webhooks import WebhookSender
+from app.services.smtp_pool import SMTPPool
 
 # Bot Client
 bot_client = None 
@@ -39,122 +61,249 @@ logger = logging.getLogger("worker")
 
 # Store active clients
 active_clients: Dict[str, TelegramClient] = {}
-processed_messages = set()
+processed_messages = TenantDedupCache(settings.DEDUP_MAX_PER_TENANT, settings.DEDUP_TTL)
+shared_scans = SharedScanCache(alert_cache, ttl=settings.SHARED_SCAN_TTL)
+near_duplicates = NearDuplicateFilter(
+    settings.NEAR_DUP_MAX_PER_TENANT, settings.NEAR_DUP_TTL, settings.NEAR_DUP_MAX_DISTANCE
+)
+rate_limiter = AlertRateLimiter(settings.ALERT_RATE_BURST, settings.ALERT_DEFAULT_MAX_PER_HOUR)
 
-async def fetch_active_sessions():
-    """Fetch all active sessions from DB."""
-    async with AsyncSession(engine) as session:
-        statement = select(TelegramSession).where(TelegramSession.is_active == True)
-        result = await session.execute(statement)
-        return result.scalars().all()
+class AlertLogWriter(BatchWriter):
+    def prepare(self, values):
+        values.setdefault("id", uuid4())
+        values.setdefault("created_at", datetime.utcnow())
+        return values
 
-async def fetch_user_alerts(user_id):
-    """Fetch alerts for a specific user."""
-    async with AsyncSession(engine) as session:
-        statement = select(Alert).where(Alert.user_id == user_id).where(Alert.is_paused == False)
-        result = await session.execute(statement)
-        return result.scalars().all()
+# Alert logs are written in multi-row batches, not one transaction per match
+alert_log_writer = AlertLogWriter(
+    AlertLog.__table__,
+    interval=settings.ALERT_LOG_FLUSH_INTERVAL_MS / 1000,
+    max_batch=settings.ALERT_LOG_BATCH_SIZE,
+    max_buffer=settings.ALERT_LOG_MAX_BUFFER,
+    name="alert log",
+)
 
-async def log_alert(alert_id, user_id, message_content, dispatched_email, dispatched_bot, detected_keyword="match"):
-    async with AsyncSession(engine) as session:
-        log_entry = AlertLog(
-            alert_id=alert_id,
-            user_id=user_id,
-            message_content=message_content,
-            detected_keyword=detected_keyword,
-            dispatched_to_email=dispatched_email,
-            dispatched_to_bot=dispatched_bot
-        )
-        session.add(log_entry)
-        await session.commit()
+async def log_alert(alert_id, user_id, message_content, dispatched_email, dispatched_bot, detected_keyword="match",
+                    dispatched_webhook=False):
+    """Queue the log row; its id is known right away, the insert follows in a batch."""
+    row = await alert_log_writer.put(
+        alert_id=alert_id,
+        user_id=user_id,
+        message_content=message_content,
+        detected_keyword=detected_keyword,
+        dispatched_to_email=dispatched_email,
+        dispatched_to_bot=dispatched_bot,
+        dispatched_to_webhook=dispatched_webhook
+    )
+    return row["id"]
+
+def is_self_echo(message_text: str) -> bool:
+    """Our own alert messages showing up in a monitored chat."""
+    return message_text.startswith("🚨 TeleGuard Alert") or "TeleGuard Alert Triggered" in message_text
 
 async def notification_handler(event, user_id: str):
     """
     Callback triggered on every new message for a specific user.
     """
     try:
-        alerts = await fetch_user_alerts(user_id)
-        if not alerts:
+        # 0. Pre-filter: in-memory checks only, nothing awaited
+        if event.out:
             return
 
-        message_text = event.message.message or ""
-        sender = await event.get_sender()
-        sender_username = getattr(sender, 'username', 'Unknown')
+        # Compiled rules live in memory; only the very first message may load them
+        rules = alert_cache.get(user_id)
+        if rules is None:
+            rules = await alert_cache.load(user_id)
+
         chat_id = event.chat_id
+        if not rules or not rules.covers(chat_id):
+            return
+
+        # Ignore messages from our own Bot (sender_id needs no entity lookup)
+        if BOT_ID and event.sender_id == BOT_ID:
+            return
+
+        message_text = event.message.message or ""
+        if is_self_echo(message_text):
+            return
+
+        # Deduplication Check (per tenant, bounded LRU/TTL)
         msg_id = event.message.id
-        
-        # Deduplication Check
-        if (chat_id, msg_id) in processed_messages:
+        if processed_messages.seen(user_id, chat_id, msg_id):
             return
-        processed_messages.add((chat_id, msg_id))
-        
-        # Cleanup cache if too big
-        if len(processed_messages) > 5000:
-            processed_messages.clear()
-        
-        logger.info(f"Processing Msg for User {user_id} | Chat: {chat_id} | Sender: {sender_username} | Text: {message_text[:30]}...")
-        
-        for alert in alerts:
-            # 0. Global Filters (Self-Chat, Bot Messages, Outgoing)
-            if event.out:
-                continue
-
-            # Ignore messages from our own Bot
-            sender_id = sender.id if sender else None
-            if BOT_ID and sender_id and sender_id == BOT_ID:
-                continue
-            
-            if message_text.startswith("🚨 TeleGuard Alert") or "TeleGuard Alert Triggered" in message_text:
-                continue
-
-            # 1. Source Check
-            if alert.source_id and alert.source_id != chat_id:
-                continue
-
-            # 2. Content Matching
-            match_found = False
-            matched_trigger = None
-            keywords = alert.keywords or []
-            excluded = alert.excluded_keywords or []
-            is_regex = alert.is_regex
-            
-            # Match Logic
-            text_lower = message_text.lower()
-            
-            # A. Check Excluded
-            exclude_hit = False
-            for exc in excluded:
-                if exc and exc.lower() in text_lower:
-                    exclude_hit = True
-                    break
-            if exclude_hit:
-                continue
-
-            # B. Check Triggers
-            if is_regex:
-                for pat in keywords:
-                    try:
-                        if re.search(pat, message_text, re.IGNORECASE):
-                            match_found = True
-                            matched_trigger = pat
-                            break
-                    except Exception as e:
-                        logger.error(f"Invalid Regex {pat}: {e}")
-            else:
-                for kw in keywords:
-                    if kw and kw.lower() in text_lower:
-                        match_found = True
-                        matched_trigger = kw
-                        break
 
-            if match_found:
-                logger.info(f"MATCH FOUND for User {user_id}! Trigger: {matched_trigger}")
-                # Pass matched_trigger to dispatch
-                await dispatch_notification(alert, message_text, sender_username, matched_trigger)
+        # 1. Source Check + 2. Content Matching (precompiled, in-memory)
+        # Public channels reuse the lowercase text and keyword scan of
+        # whichever tenant saw the message first.
+        # Sender conditions are resolved from the id index; only username
+        # conditions need the sender entity.
+        sender_username = await sender_username_for(event, rules, chat_id)
+        scan = shared_scans.scan(chat_id, msg_id, message_text)
+        guarded = []
+        matches = rules.match(message_text, chat_id, scan, event.sender_id, sender_username, guarded)
+        if guarded:
+            matches += await match_guarded(guarded, message_text)
+        if matches:
+            await dispatch_matches(event, user_id, chat_id, message_text, matches)
 
     except Exception as e:
         logger.error(f"Error in handler for {user_id}: {e}")
 
+async def sender_username_for(event, rules, chat_id: int):
+    """The sender's username, if any rule for this chat has a username condition."""
+    if not rules.needs_username(chat_id):
+        return None
+    # Usually delivered with the update; get_sender() may hit the network
+    sender = event.sender or await event.get_sender()
+    return getattr(sender, 'username', None)
+
+async def match_guarded(guarded, message_text: str):
+    """Regex rules that may fire, evaluated off the event loop under a time budget."""
+    candidates = [rule for rule in guarded if rule.alert.id not in auto_paused_alerts]
+    if not candidates:
+        return []
+    triggers, slow = await regex_guard.search_rules(
+        [[pat for pat, _ in rule.patterns] for rule in candidates], message_text
+    )
+    for i in slow:
+        await auto_pause_alert(candidates[i].alert, f"Regex exceeded {regex_guard.timeout * 1000:.0f} ms")
+    return [Match(rule.alert, trigger) for rule, trigger in zip(candidates, triggers) if trigger is not None]
+
+async def auto_pause_alert(alert, reason: str):
+    """Pause a rule whose regex blew the time budget and tell its owner."""
+    if alert.id in auto_paused_alerts:
+        return
+    auto_paused_alerts.add(alert.id)
+    logger.error(f"Auto-pausing alert {alert.id} of user {alert.user_id}: {reason}")
+    try:
+        from app.models import User
+        async with AsyncSession(engine) as session:
+            a = await session.get(Alert, alert.id)
+            if a:
+                a.is_paused = True
+                a.updated_at = datetime.utcnow()
+                session.add(a)
+                await notify_alerts_changed(session, alert.user_id)
+                await session.commit()
+            user = await session.get(User, alert.user_id)
+
+        if user and user.bot_chat_id:
+            await send_bot_notification(
+                user.bot_chat_id,
+                f"⚠️ <b>Alert paused</b>\n\n"
+                f"Your regex alert <code>{str(alert.id)[:8]}</code> took longer than "
+                f"{settings.REGEX_TIMEOUT_MS} ms on a message and was paused.\n"
+                f"Please simplify the pattern (avoid nested quantifiers) and create it again.",
+                priority=True
+            )
+    except Exception as e:
+        logger.error(f"Failed to auto-pause alert {alert.id}: {e}")
+
+async def dispatch_matches(event, user_id: str, chat_id: int, message_text: str, matches, album=None):
+    # Album parts are held back and dispatched once, merged (see dispatch_album)
+    grouped_id = event.message.grouped_id
+    if grouped_id and album is None and album_merger is not None:
+        album_merger.submit((user_id, chat_id, grouped_id), (event, message_text, matches))
+        return
+
+    # Forwarded copies / repeated announcements: one dispatch per alert
+    fingerprint = simhash(message_text, settings.NEAR_DUP_MIN_WORDS)
+    if grouped_id and album is None:
+        album = (chat_id, grouped_id)
+    matches = [m for m in matches if not near_duplicates.seen(user_id, m.alert.id, fingerprint, album)]
+    # Per-alert cooldown / max rate; suppressed hits are counted by the limiter
+    matches = [m for m in matches if rate_limiter.allow(m.alert)]
+    if not matches:
+        return
+
+    # 3. Resolve the sender only for messages that will be dispatched
+    # (usually delivered with the update, no request needed)
+    sender = event.sender or await event.get_sender()
+    sender_username = getattr(sender, 'username', 'Unknown')
+    logger.info(f"Processing Msg for User {user_id} | Chat: {chat_id} | Sender: {sender_username} | Text: {message_text[:30]}...")
+
+    # 4. Hand over to the outbox; delivery happens in the dispatcher tasks
+    source_key = f"g{album[1]}" if album else str(event.message.id)
+    for alert, matched_trigger in matches:
+        logger.info(f"MATCH FOUND for User {user_id}! Trigger: {matched_trigger}")
+        outbox_writer.add(
+            idempotency_key=f"{alert.id}:{chat_id}:{source_key}",
+            alert_id=alert.id,
+            user_id=alert.user_id,
+            message_text=message_text,
+            from_user=sender_username,
+            trigger=matched_trigger,
+            suppressed=rate_limiter.take_unreported(alert.id),
+        )
+
+async def deliver_outbox_row(row, final: bool) -> OutboxResult:
+    """Dispatcher handler: one delivery attempt for a claimed outbox row."""
+    # Usually matched by this worker moments ago; the database only for
+    # other tenants' rows (another process matched them) or paused alerts
+    alert = alert_cache.alert(row.user_id, row.alert_id)
+    if alert is None:
+        async with AsyncSession(engine) as session:
+            alert = await session.get(Alert, row.alert_id)
+    if alert is None:
+        # Deleted since it matched; nothing left to notify about
+        return OutboxResult(True, row.email_done, row.bot_done, row.webhook_done)
+    email_done, bot_done, webhook_done, complete = await dispatch_notification(
+        alert, row.message_text, row.from_user, row.trigger or "match", row.suppressed,
+        email_done=row.email_done, bot_done=row.bot_done, webhook_done=row.webhook_done, final=final
+    )
+    return OutboxResult(complete, email_done, bot_done, webhook_done, None if complete else "delivery failed")
+
+outbox_dispatcher = OutboxDispatcher(
+    deliver_outbox_row,
+    workers=settings.OUTBOX_WORKERS,
+    lease=settings.OUTBOX_LEASE,
+    delivery_timeout=settings.OUTBOX_DELIVERY_TIMEOUT,
+    max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL,
+)
+outbox_writer = OutboxWriter(on_flush=outbox_dispatcher.wake)
+
+# Trigger / suppressed counts, written as deltas in one UPDATE per flush
+alert_counters = AlertCounters(Alert.__table__, ("trigger_count", "suppressed_count"))
+
+async def flush_alert_counts():
+    for alert_id, count in rate_limiter.drain_unsaved().items():
+        alert_counters.add(alert_id, "suppressed_count", count)
+    await alert_counters.flush()
+
+async def watch_alert_counts(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        await flush_alert_counts()
+
+async def dispatch_album(key, parts):
+    """Dispatch an album's matched parts as one event: joined captions, each alert once."""
+    user_id, chat_id, grouped_id = key
+    texts = []
+    merged = {}
+    for _, message_text, matches in parts:
+        if message_text and message_text not in texts:
+            texts.append(message_text)
+        for match in matches:
+            merged.setdefault(match.alert.id, match)
+    # The captioned part carries the sender and text; any part will do otherwise
+    event = next((e for e, t, _ in parts if t), parts[0][0])
+    try:
+        await dispatch_matches(event, user_id, chat_id, "\n".join(texts), list(merged.values()),
+                               album=(chat_id, grouped_id))
+    except Exception as e:
+        logger.error(f"Error dispatching album for {user_id}: {e}")
+
+# Album parts arrive as separate messages within a moment of each other
+album_merger = None
+if settings.ALBUM_MERGE_WINDOW_MS > 0:
+    album_merger = MicroBatcher(dispatch_album, window=settings.ALBUM_MERGE_WINDOW_MS / 1000, max_size=10)
+
+# Regexes run in a process pool under a time budget
+regex_guard = RegexGuard(settings.REGEX_POOL_WORKERS, settings.REGEX_TIMEOUT_MS / 1000)
+auto_paused_alerts = set()
+
+
 
 def generate_email_html(keyword_str: str, from_user: str, message_text: str) -> str:
     return f"""
@@ -183,22 +332,14 @@ def generate_bot_message(keyword_str: str, from_user: str, message_text: str, al
         f"📝 <b>Message:</b>\n{message_text[:4000]}" 
     )
 
-def _send_smtp_blocking(msg, server_host, server_port, user, password):
-    context = ssl.create_default_context()
-    try:
-        # Check for SSL port (465)
-        if server_port == 465:
-            with smtplib.SMTP_SSL(server_host, server_port, context=context) as server:
-                server.login(user, password)
-                server.send_message(msg)
-        else:
-            with smtplib.SMTP(server_host, server_port) as server:
-                server.starttls(context=context)
-                server.login(user, password)
-                server.send_message(msg)
-    except Exception as e:
-        logger.error(f"SMTP Error: {e}")
-        raise e
+# Authenticated SMTP connections are kept open and reused across emails
+smtp_pool = SMTPPool(
+    settings.SMTP_SERVER, settings.SMTP_PORT, settings.SMTP_USER, settings.SMTP_PASSWORD,
+    size=settings.SMTP_POOL_SIZE,
+    timeout=settings.SMTP_TIMEOUT,
+    idle_check=settings.SMTP_IDLE_CHECK,
+    max_messages=settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+)
 
 async def send_email_notification(to_email: str, subject: str, text_body: str, html_content: str = None) -> bool:
     if not settings.SMTP_SERVER or not settings.SMTP_USER:
@@ -214,15 +355,7 @@ async def send_email_notification(to_email: str, subject: str, text_body: str, h
         if html_content:
             msg.add_alternative(html_content, subtype="html")
         
-        # Run blocking SMTP in thread
-        await asyncio.to_thread(
-            _send_smtp_blocking, 
-            msg, 
-            settings.SMTP_SERVER, 
-            settings.SMTP_PORT, 
-            settings.SMTP_USER, 
-            settings.SMTP_PASSWORD
-        )
+        await smtp_pool.send(msg)
              
         logger.info(f"Email sent to {to_email}")
         return True
@@ -230,38 +363,73 @@ async def send_email_notification(to_email: str, subject: str, text_body: str, h
         logger.error(f"Failed to send email to {to_email}: {e}")
         return False
 
-async def send_bot_notification(chat_id: int, message_text: str) -> bool:
+async def _bot_send(chat_id: int, message_text: str):
+    bot = await get_bot_client()
+    await bot.send_message(chat_id, message_text, parse_mode='html')
+
+# Every notification goes through one paced queue (global + per-chat limits)
+bot_queue = BotSendQueue(
+    _bot_send,
+    flood_error=(FloodWaitError,),
+    global_rate=settings.BOT_GLOBAL_RATE,
+    chat_rate=settings.BOT_CHAT_RATE,
+    chat_burst=settings.BOT_CHAT_BURST,
+    group_rate=settings.BOT_GROUP_RATE_PER_MIN / 60,
+    concurrency=settings.BOT_SEND_CONCURRENCY,
+)
+
+async def send_bot_notification(chat_id: int, message_text: str, priority: Optional[bool] = None) -> bool:
+    if not settings.BOT_TOKEN:
+        return False
     try:
-        bot = await get_bot_client()
-        if not bot:
-            return False
-        await bot.send_message(chat_id, message_text, parse_mode='html')
-        return True
+        return await bot_queue.send(int(chat_id), message_text, priority)
     except Exception as e:
         logger.error(f"Failed to send bot message to {chat_id}: {e}")
         return False
 
-async def dispatch_notification(alert, message_text, from_user, matched_trigger="match"):
-    # ... (Implementation similar to original but passing matched_trigger) ...
+# One keep-alive HTTP client for every alert's webhook
+webhook_sender = WebhookSender(
+    max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+    per_host=settings.WEBHOOK_PER_HOST,
+    timeout=settings.WEBHOOK_TIMEOUT,
+    retries=settings.WEBHOOK_RETRIES,
+    batch_window=settings.WEBHOOK_BATCH_WINDOW_MS / 1000,
+    batch_size=settings.WEBHOOK_BATCH_SIZE,
+    allow_private=settings.WEBHOOK_ALLOW_PRIVATE,
+)
+
+def webhook_event(alert, matched_trigger, from_user, message_text, suppressed=0) -> Dict[str, Any]:
+    return {
+        "alert_id": str(alert.id),
+        "source_id": alert.source_id,
+        "source_name": alert.source_name,
+        "keywords": list(alert.keywords or []),
+        "trigger": matched_trigger,
+        "from": from_user,
+        "message": message_text,
+        "suppressed": suppressed,
+        "sent_at": datetime.utcnow().isoformat() + "Z",
+    }
+
+async def dispatch_notification(alert, message_text, from_user, matched_trigger="match", suppressed=0,
+                                email_done=False, bot_done=False, webhook_done=False, final=True):
+    """
+    One delivery attempt. Channels delivered by an earlier attempt are
+    skipped. Returns (email_done, bot_done, webhook_done, complete); the log row and
+    trigger_count are written once, when complete or on the final attempt.
+    """
     logger.info("========================================")
     logger.info(f"ALERT TRIGGERED: {alert.id}")
     logger.info(f"Trigger: {matched_trigger}")
     logger.info(f"From: {from_user}")
     logger.info("========================================")
     
-    dispatched_email = False
-    dispatched_bot = False
+    dispatched_email = email_done
+    dispatched_bot = bot_done
+    dispatched_webhook = webhook_done
     
-    # Fetch user data
-    async with AsyncSession(engine) as session:
-        stmt = select(TelegramSession).where(TelegramSession.user_id == alert.user_id).where(TelegramSession.is_active == True)
-        res = await session.execute(stmt)
-        tg_session = res.scalars().first()
-        
-        from app.models import User
-        user_stmt = select(User).where(User.id == alert.user_id)
-        user_res = await session.execute(user_stmt)
-        user = user_res.scalar_one_or_none()
+    # Email / bot chat / linked account, cached per user
+    targets = await target_cache.get(alert.user_id)
 
     keyword_str = ", ".join(alert.keywords)
     
@@ -270,40 +438,287 @@ async def dispatch_notification(alert, message_text, from_user, matched_trigger=
     text_body = f"Alert triggered by: '{matched_trigger}'\n\nSender: {from_user}\nMessage: {message_text}"
     html_body = generate_email_html(keyword_str, from_user, message_text) # Could enhance to highlight match
     bot_body = generate_bot_message(keyword_str, from_user, message_text, str(alert.id)[:8])
+    note = None
+    if suppressed:
+        # Rate-limited hits since the previous notification of this alert
+        note = f"{suppressed} more hit{'s' if suppressed != 1 else ''} suppressed by rate limit since the last notification."
+        text_body += f"\n\n({note})"
+        html_body = html_body.replace("</body>", f"<p style=\"color:#888;font-size:12px\">{note}</p></body>", 1)
+        bot_body += f"\n\n<i>{note}</i>"
+
+    # Coalesced / digest channels are sent later and flag the log row then
+    coalesce = alert.coalesce_seconds or 0
+    email_to = targets.email if alert.notify_email else None
+    email_later = bool(email_to) and (coalesce > 0 or bool(alert.email_digest))
 
-    if alert.notify_email and user and user.email:
-        logger.info(f"Dispatching email to {user.email}")
+    email_now = bool(email_to) and not email_later
+    if email_now and not dispatched_email:
+        logger.info(f"Dispatching email to {email_to}")
         dispatched_email = await send_email_notification(
-            user.email, 
+            email_to, 
             f"🚨 TeleGuard Alert: {matched_trigger}", 
             text_body, 
             html_content=html_body
         )
 
-    target_chat_id = None
-    if alert.notify_bot:
-        if user and user.bot_chat_id:
-             target_chat_id = user.bot_chat_id
-        elif tg_session and tg_session.telegram_id:
-             target_chat_id = tg_session.telegram_id
+    target_chat_id = targets.chat_id if alert.notify_bot else None
 
-    if target_chat_id:
+    bot_now = bool(target_chat_id) and coalesce <= 0
+    if bot_now and not dispatched_bot:
         logger.info(f"Dispatching bot msg to {target_chat_id}")
         dispatched_bot = await send_bot_notification(target_chat_id, bot_body)
-    
+
+    # Webhooks are never coalesced; the sender batches per URL on its own
+    if alert.webhook_url and not dispatched_webhook:
+        logger.info(f"Dispatching webhook to {alert.webhook_url}")
+        dispatched_webhook = await webhook_sender.send(
+            alert.webhook_url, webhook_event(alert, matched_trigger, from_user, message_text, suppressed)
+        )
+
+    complete = ((dispatched_email or not email_now) and (dispatched_bot or not bot_now)
+                and (dispatched_webhook or not alert.webhook_url))
+    if not complete and not final:
+        # Retried later by the outbox; nothing logged yet
+        return dispatched_email, dispatched_bot, dispatched_webhook, False
+
+    log_id = None
+    alert_counters.add(alert.id, "trigger_count")
     try:
-        # access session again to save
-        async with AsyncSession(engine) as session:
-             a = await session.get(Alert, alert.id)
-             if a:
-                 a.trigger_count += 1
-                 session.add(a)
-                 await session.commit()
+        log_id = await log_alert(alert.id, alert.user_id, message_text[:500], dispatched_email, dispatched_bot,
+                                 detected_keyword=matched_trigger, dispatched_webhook=dispatched_webhook)
+    except Exception as e:
+        logger.error(f"Failed to log alert: {e}")
+
+    # Scheduled email digests are built from unsent log rows (send_email_digests)
+    item = DigestItem(alert, matched_trigger, from_user, message_text, note, log_id, datetime.utcnow())
+    if email_later and not alert.email_digest:
+        notification_coalescer.submit(("email", email_to), item, window=coalesce)
+    if target_chat_id and coalesce > 0:
+        notification_coalescer.submit(("bot", target_chat_id), item, window=coalesce)
+    return dispatched_email, dispatched_bot, dispatched_webhook, complete
+
 
-        await log_alert(alert.id, alert.user_id, message_text[:500], dispatched_email, dispatched_bot, detected_keyword=matched_trigger)
+class DigestItem(NamedTuple):
+    alert: Any
+    trigger: str
+    from_user: str
+    message_text: str
+    note: Optional[str]
+    log_id: Any
+    created_at: datetime
+
+def generate_digest_email_html(items: List[DigestItem]) -> str:
+    entries = "".join(
+        f"""
+            <h3>🔑 {item.trigger} <small style="color:#888">{item.created_at:%Y-%m-%d %H:%M} UTC · {item.from_user}</small></h3>
+            <blockquote style="background: #f9f9f9; border-left: 10px solid #ccc; margin: 1em 10px; padding: 0.5em 10px;">
+                {item.message_text}
+            </blockquote>
+            {f'<p style="color:#888;font-size:12px">{item.note}</p>' if item.note else ''}
+        """
+        for item in items
+    )
+    return f"""
+    <html>
+        <body>
+            <h2>🚨 TeleGuard: {len(items)} alerts triggered</h2>
+            <hr>
+            {entries}
+            <hr>
+            <p><small>Sent by TeleGuard Monitoring System</small></p>
+        </body>
+    </html>
+    """
+
+def generate_digest_text(items: List[DigestItem]) -> str:
+    return "\n\n".join(
+        f"[{item.created_at:%Y-%m-%d %H:%M} UTC] '{item.trigger}' from {item.from_user}:\n{item.message_text}"
+        + (f"\n({item.note})" if item.note else "")
+        for item in items
+    )
+
+def generate_digest_bot_message(items: List[DigestItem]) -> str:
+    header = f"🚨 <b>TeleGuard: {len(items)} alerts</b>\n"
+    lines = []
+    budget = 4000 - len(header)
+    for i, item in enumerate(items):
+        line = (f"\n🔑 <code>{item.trigger}</code> · 👤 {item.from_user}\n"
+                f"{item.message_text[:300]}\n")
+        if len(line) > budget:
+            lines.append(f"\n… and {len(items) - i} more")
+            break
+        budget -= len(line)
+        lines.append(line)
+    return header + "".join(lines)
+
+async def mark_logs_dispatched(log_ids, column: str, dispatched: bool = True):
+    """Flag log rows whose notification went out with a digest."""
+    log_ids = [log_id for log_id in log_ids if log_id is not None]
+    if not log_ids:
+        return
+    try:
+        # The rows may still be in the log writer's buffer
+        await alert_log_writer.flush()
+        async with AsyncSession(engine) as session:
+            await session.execute(
+                update(AlertLog).where(AlertLog.id.in_(log_ids)).values({column: dispatched})
+            )
+            await session.commit()
     except Exception as e:
-        logger.error(f"Failed to log alert or update count: {e}")
+        logger.error(f"Failed to flag {len(log_ids)} alert logs: {e}")
+
+async def flush_coalesced(key, items: List[DigestItem]):
+    """One email / bot message for everything a user matched within the window."""
+    channel, target = key
+    if len(items) == 1:
+        # Nothing to merge: the regular single-alert layout
+        item = items[0]
+        keyword_str = ", ".join(item.alert.keywords)
+        if channel == "email":
+            html_body = generate_email_html(keyword_str, item.from_user, item.message_text)
+            if item.note:
+                html_body = html_body.replace("</body>", f"<p style=\"color:#888;font-size:12px\">{item.note}</p></body>", 1)
+            sent = await send_email_notification(
+                target, f"🚨 TeleGuard Alert: {item.trigger}",
+                generate_digest_text(items), html_content=html_body
+            )
+        else:
+            bot_body = generate_bot_message(keyword_str, item.from_user, item.message_text, str(item.alert.id)[:8])
+            if item.note:
+                bot_body += f"\n\n<i>{item.note}</i>"
+            sent = await send_bot_notification(target, bot_body)
+    elif channel == "email":
+        sent = await send_email_notification(
+            target, f"🚨 TeleGuard: {len(items)} alerts triggered",
+            generate_digest_text(items), html_content=generate_digest_email_html(items)
+        )
+    else:
+        sent = await send_bot_notification(target, generate_digest_bot_message(items))
+
+    logger.info(f"Coalesced {len(items)} {channel} notifications for {target} (sent: {sent})")
+    if sent:
+        await mark_logs_dispatched(
+            [item.log_id for item in items],
+            "dispatched_to_email" if channel == "email" else "dispatched_to_bot"
+        )
+    return sent
+
+async def send_email_digests(mode: str, period: timedelta):
+    """Scheduled digest: every unsent log row of alerts in `mode`, one email per user."""
+    from app.models import User
+    since = datetime.utcnow() - 2 * period  # don't mail ancient rows after an outage
+    async with AsyncSession(engine) as session:
+        stmt = (
+            select(AlertLog, Alert, User.email)
+            .join(Alert, AlertLog.alert_id == Alert.id)
+            .join(User, AlertLog.user_id == User.id)
+            .where(Alert.email_digest == mode)
+            .where(Alert.notify_email == True)
+            .where(AlertLog.dispatched_to_email == False)
+            .where(AlertLog.created_at >= since)
+            .order_by(AlertLog.created_at)
+        )
+        rows = (await session.execute(stmt)).all()
+
+    by_email: Dict[str, List[DigestItem]] = {}
+    for log, alert, email in rows:
+        if email:
+            by_email.setdefault(email, []).append(DigestItem(
+                alert, log.detected_keyword or "match", "", log.message_content or "", None,
+                log.id, log.created_at
+            ))
+
+    for email, items in by_email.items():
+        sent = await send_email_notification(
+            email, f"🗞 TeleGuard {mode} digest: {len(items)} alerts",
+            generate_digest_text(items), html_content=generate_digest_email_html(items)
+        )
+        if sent:
+            await mark_logs_dispatched([item.log_id for item in items], "dispatched_to_email")
+    if by_email:
+        logger.info(f"Sent {len(by_email)} {mode} email digests ({len(rows)} alerts)")
+
+async def digest_scheduler():
+    """Hourly digests at the top of every hour, daily ones at DIGEST_DAILY_HOUR (UTC)."""
+    while True:
+        now = datetime.utcnow()
+        next_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        await asyncio.sleep((next_hour - now).total_seconds())
+        try:
+            await send_email_digests("hourly", timedelta(hours=1))
+            if next_hour.hour == settings.DIGEST_DAILY_HOUR:
+                await send_email_digests("daily", timedelta(days=1))
+        except Exception as e:
+            logger.error(f"Email digest run failed: {e}")
+
+async def resend_coalesced(grace: float):
+    """
+    Coalesced notifications wait in memory, after their outbox row is done.
+    Log rows still unflagged `grace` seconds after their window (the process
+    holding them stopped, or the send failed) are sent from the log, as the
+    email digests are. They are claimed by setting the flag first, so two
+    workers never both send them; a failed send clears it again.
+    """
+    now = datetime.utcnow()
+    since = now - timedelta(seconds=2 * settings.DIGEST_MAX_COALESCE_SECONDS)
+    async with AsyncSession(engine) as session:
+        stmt = (
+            select(AlertLog, Alert)
+            .join(Alert, AlertLog.alert_id == Alert.id)
+            .where(Alert.coalesce_seconds > 0)
+            .where(or_(
+                and_(Alert.notify_email == True, Alert.email_digest == None, AlertLog.dispatched_to_email == False),
+                and_(Alert.notify_bot == True, AlertLog.dispatched_to_bot == False),
+            ))
+            .where(AlertLog.created_at >= since)
+            .where(AlertLog.created_at < now - timedelta(seconds=grace))
+            .order_by(AlertLog.created_at)
+        )
+        rows = (await session.execute(stmt)).all()
 
+    batches: Dict[tuple, List[DigestItem]] = {}
+    for log, alert in rows:
+        if log.created_at + timedelta(seconds=alert.coalesce_seconds + grace) > now:
+            continue  # may still be waiting in a running worker
+        targets = await target_cache.get(alert.user_id)
+        item = DigestItem(alert, log.detected_keyword or "match", "", log.message_content or "", None,
+                          log.id, log.created_at)
+        if alert.notify_email and not alert.email_digest and targets.email and not log.dispatched_to_email:
+            batches.setdefault(("email", targets.email), []).append(item)
+        if alert.notify_bot and targets.chat_id and not log.dispatched_to_bot:
+            batches.setdefault(("bot", targets.chat_id), []).append(item)
+
+    for key, items in batches.items():
+        column = "dispatched_to_email" if key[0] == "email" else "dispatched_to_bot"
+        async with AsyncSession(engine) as session:
+            result = await session.execute(
+                update(AlertLog)
+                .where(AlertLog.id.in_([item.log_id for item in items]))
+                .where(getattr(AlertLog, column) == False)
+                .values({column: True})
+                .returning(AlertLog.id)
+            )
+            claimed = set(result.scalars().all())
+            await session.commit()
+        items = [item for item in items if item.log_id in claimed]
+        if not items:
+            continue
+        for start in range(0, len(items), settings.DIGEST_MAX_ITEMS):
+            chunk = items[start:start + settings.DIGEST_MAX_ITEMS]
+            if not await flush_coalesced(key, chunk):
+                await mark_logs_dispatched([item.log_id for item in chunk], column, dispatched=False)
+        logger.info(f"Recovered {len(items)} unsent coalesced {key[0]} notifications for {key[1]} from the alert log")
+
+async def coalesce_recovery(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await resend_coalesced(grace=interval)
+        except Exception as e:
+            logger.error(f"Coalesced notification recovery failed: {e}")
+
+# Per-recipient coalescing; a batch goes out when its shortest window ends
+notification_coalescer = MicroBatcher(flush_coalesced, window=60, max_size=settings.DIGEST_MAX_ITEMS)
 
 # Global Bot ID
 BOT_ID = None
@@ -354,6 +769,19 @@ async def sync_user_dialogs(client, user_id):
     except Exception as e:
         logger.error(f"Failed to sync dialogs for {user_id}: {e}")
 
+async def deactivate_session(user_id):
+    async with AsyncSession(engine) as session:
+        stmt = select(TelegramSession).where(TelegramSession.user_id == user_id).where(TelegramSession.is_active == True)
+        res = await session.execute(stmt)
+        db_session = res.scalars().first()
+        if db_session:
+            db_session.is_active = False
+            db_session.updated_at = datetime.utcnow()
+            session.add(db_session)
+            await notify_targets_changed(session, db_session.user_id)
+            await notify_session_changed(session, db_session.user_id)
+            await session.commit()
+
 async def start_user_client(session_data):
     """Start a Telethon client for a session."""
     user_id = str(session_data.user_id)
@@ -372,25 +800,31 @@ async def start_user_client(session_data):
             settings.TELEGRAM_API_HASH
         )
         
-        await client.connect()
+        if not await reconnects.attempt(user_id, client.connect):
+            # Backing off (or the circuit is open): monitor_sessions retries when allowed
+            del active_clients[user_id]
+            return
         if not await client.is_user_authorized():
             logger.warning(f"Session invalid for user {user_id}")
-            async with AsyncSession(engine) as session:
-                stmt = select(TelegramSession).where(TelegramSession.user_id == session_data.user_id).where(TelegramSession.is_active == True)
-                res = await session.execute(stmt)
-                db_session = res.scalars().first()
-                if db_session:
-                    db_session.is_active = False
-                    session.add(db_session)
-                    await session.commit()
+            await deactivate_session(session_data.user_id)
+            del active_clients[user_id]
             return
 
+        # Warm the rule cache so the first message does not hit the DB
+        await alert_cache.load(user_id)
+
         @client.on(events.NewMessage)
         async def handler(event):
             # Pass identity down
             await notification_handler(event, user_id)
 
+        @client.on(events.Raw)
+        async def activity(update):
+            # Any update proves the connection; spares a heartbeat RPC
+            client_health.touch(user_id)
+
         active_clients[user_id] = client
+        client_health.add(user_id)
         logger.info(f"Client started for {user_id}")
         
         # Initial Sync
@@ -401,20 +835,14 @@ async def start_user_client(session_data):
         if "used under two different IP addresses" in error_str or "AuthKeyDuplicatedError" in error_str:
              logger.error(f"Session REVOKED for {user_id}: {e}")
              # Invalidate in DB
-             async with AsyncSession(engine) as session:
-                stmt = select(TelegramSession).where(TelegramSession.user_id == session_data.user_id).where(TelegramSession.is_active == True)
-                res = await session.execute(stmt)
-                db_session = res.scalars().first()
-                if db_session:
-                    db_session.is_active = False
-                    session.add(db_session)
-                    await session.commit()
-             # Remove from active clients if present
-             if user_id in active_clients:
-                 del active_clients[user_id]
+             await deactivate_session(session_data.user_id)
+             # Remove from active clients and drop the tenant's cached state
+             await stop_user_client(user_id)
              return
 
         logger.error(f"Failed to start client for {user_id}: {e}")
+        if active_clients.get(user_id) == "initializing":
+            del active_clients[user_id]  # Retried by monitor_sessions
 async def setup_bot_commands(bot):
     """
     Registers command handlers for the Bot.
@@ -452,6 +880,7 @@ async def setup_bot_commands(bot):
                  if not user.bot_chat_id or user.bot_chat_id != sender_id:
                      user.bot_chat_id = sender_id
                      session.add(user)
+                     await notify_targets_changed(session, user.id)
                      await session.commit()
                  
                  await event.respond(f"👋 Welcome back, {user.full_name or 'User'}!\n\nYour account is linked. You can manage alerts here.\n\n<b>Commands:</b>\n/list - View active alerts\n/add &lt;word&gt; [@user] - Add listener\n<i>(e.g. /add bitcoin @elonmusk)</i>\n/del &lt;id&gt; - Delete listener", parse_mode='html')
@@ -528,6 +957,7 @@ async def setup_bot_commands(bot):
                 notify_email=notify_email
             )
             session.add(new_alert)
+            await notify_alerts_changed(session, tg_session.user_id)
             await session.commit()
             await session.refresh(new_alert)
             
@@ -602,6 +1032,7 @@ async def setup_bot_commands(bot):
                 await session.execute(delete(AlertLog).where(AlertLog.alert_id == target.id))
                 
                 await session.delete(target)
+                await notify_alerts_changed(session, tg_session.user_id)
                 await session.commit()
                 await event.respond(f"🗑 Alert <code>{kws_display}</code> deleted.", parse_mode='html')
             else:
@@ -618,64 +1049,167 @@ async def main():
     if bot_client:
         await setup_bot_commands(bot_client)
 
+    # 1.6 Keep cached alert rules fresh (push + periodic fallback)
+    listener = ChangeListener()
+    listener.on(ALERTS_CHANNEL, alert_cache.invalidate)
+    listener.on(TARGETS_CHANNEL, target_cache.invalidate)
+    listener.on(SESSIONS_CHANNEL, session_feed.notify)
+    listener.start()
+    asyncio.create_task(session_feed.watch(settings.SESSION_FEED_POLL_INTERVAL))
+    asyncio.create_task(alert_cache.watch(settings.ALERT_CACHE_CHECK_INTERVAL))
+    asyncio.create_task(watch_alert_counts(settings.ALERT_COUNTS_FLUSH_INTERVAL))
+    asyncio.create_task(digest_scheduler())
+    asyncio.create_task(coalesce_recovery(settings.DIGEST_RECOVERY_INTERVAL))
+
+    # 1.7 Deliver queued notifications (any number of workers can share the outbox)
+    outbox_dispatcher.start()
+
+    try:
+        await monitor_sessions()
+    finally:
+        await shutdown()
+
+async def shutdown():
+    """Flush in-memory pipelines before the process exits."""
+    if album_merger is not None:
+        await album_merger.drain()
+    await outbox_writer.close()
+    await outbox_dispatcher.close(settings.OUTBOX_SHUTDOWN_GRACE)
+    await client_health.close()
+    await notification_coalescer.drain()
+    await alert_log_writer.close()
+    try:
+        await asyncio.wait_for(bot_queue.close(), timeout=10)
+    except asyncio.TimeoutError:
+        logger.warning(f"Bot queue not drained on shutdown: {bot_queue.stats()}")
+    await webhook_sender.close()
+    await smtp_pool.close()
+    await flush_alert_counts()
+    regex_guard.shutdown()
+
+def client_connected(user_id: str) -> bool:
+    client = active_clients.get(user_id)
+    # Starting up, or already removed: nothing to check
+    return client is None or client == "initializing" or client.is_connected()
+
+async def probe_client(user_id: str):
+    """Active heartbeat: catches zombie connections the server dropped silently."""
+    client = active_clients.get(user_id)
+    if client is not None and client != "initializing":
+        await client.get_me()
+
+async def reconnect_client(client):
+    try:
+        # Close silently first
+        await client.disconnect()
+    except: 
+        pass
+    await client.connect()
+
+async def recover_client(user_id_str: str, error: Exception):
+    client = active_clients.get(user_id_str)
+    if client is None or client == "initializing":
+        return
+    if not reconnects.ready(user_id_str):
+        return  # Backing off; the next health check comes back
+    logger.warning(f"Client {user_id_str} connection issue: {error}. Reconnecting...")
+    # A failed attempt keeps the client: its backoff grows and the health
+    # scheduler hands it back here on a later check
+    if not await reconnects.attempt(user_id_str, lambda: reconnect_client(client)):
+        return
+    try:
+        if not await client.is_user_authorized():
+             logger.warning(f"Session invalidated for {user_id_str}. Removing.")
+             await deactivate_session(user_id_str)
+             await stop_user_client(user_id_str)
+        else:
+             logger.info(f"Client {user_id_str} recovered successfully.")
+    except Exception as recon_err:
+        logger.error(f"Recovery failed for {user_id_str}: {recon_err}")
+
+reconnects = ReconnectGovernor(
+    concurrency=settings.RECONNECT_CONCURRENCY,
+    base_delay=settings.RECONNECT_BASE_DELAY,
+    max_delay=settings.RECONNECT_MAX_DELAY,
+    threshold=settings.RECONNECT_BREAKER_THRESHOLD,
+    cooldown=settings.RECONNECT_BREAKER_COOLDOWN,
+    max_cooldown=settings.RECONNECT_BREAKER_MAX_COOLDOWN,
+)
+
+client_health = HealthScheduler(
+    client_connected,
+    probe_client,
+    recover_client,
+    check_interval=settings.HEALTH_CHECK_INTERVAL,
+    min_probe_interval=settings.HEALTH_PROBE_MIN_INTERVAL,
+    max_probe_interval=settings.HEALTH_PROBE_MAX_INTERVAL,
+    timeout=settings.HEALTH_PROBE_TIMEOUT,
+    concurrency=settings.HEALTH_PROBE_CONCURRENCY,
+)
+
+async def stop_user_client(user_id: str):
+    client = active_clients.pop(user_id, None)
+    client_health.discard(user_id)
+    reconnects.forget(user_id)
+    # Per-tenant state is rebuilt if the user comes back
+    alert_cache.discard(user_id)
+    processed_messages.discard(user_id)
+    near_duplicates.discard(user_id)
+    rate_limiter.discard(user_id)
+    if client is not None and client != "initializing":
+        try:
+            await client.disconnect()
+        except Exception as e:
+            logger.warning(f"Failed to disconnect client for {user_id}: {e}")
+        logger.info(f"Client stopped for {user_id}")
+
+async def sync_session(user_id: str, active: bool):
+    """Session feed callback: a user's session was created, replaced or deactivated."""
+    if user_id in active_clients and active_clients[user_id] != "initializing":
+        # Logged out, or logged in again with a new session string
+        await stop_user_client(user_id)
+    if active and user_id not in active_clients:
+        for session in await fetch_sessions([user_id]):
+            asyncio.create_task(start_user_client(session))
+
+session_feed = SessionFeed(sync_session, overlap=settings.SESSION_FEED_OVERLAP)
+
+async def monitor_sessions():
+    last_stats = time.monotonic()
     while True:
-        sessions = await fetch_active_sessions()
-        
-        for session in sessions:
-            user_id_str = str(session.user_id)
-            if user_id_str not in active_clients:
-                asyncio.create_task(start_user_client(session))
-            else:
-                # 2. Auto-Reconnect & Health Check
-                client = active_clients[user_id_str]
-                
-                # Skip if still initializing
-                if client == "initializing":
-                     continue
-                
-                try:
-                    # A. Check internal flag
-                    if not client.is_connected():
-                        raise ConnectionError("Client is_connected() returned False")
-
-                    # B. Active Heartbeat (Real test of the pipe)
-                    # We check this to detect "Zombie" connections where the server kicked us but client thinks it's alive.
-                    # We accept the overhead of 1 request every 5s for stability.
-                    try:
-                        await asyncio.wait_for(client.get_me(), timeout=5.0)
-                    except Exception as heartbeat_err:
-                         raise ConnectionError(f"Heartbeat failed: {heartbeat_err}")
-                         
-                except Exception as e:
-                    logger.warning(f"Client {user_id_str} connection issue: {e}. Reinitializing...")
-                    try:
-                        # 1. Try to close silently
-                        await client.disconnect()
-                    except: 
-                        pass
-                    
-                    # 2. Re-connect
-                    try:
-                        await client.connect()
-                        if not await client.is_user_authorized():
-                             logger.warning(f"Session invalidated for {user_id_str}. Removing.")
-                             async with AsyncSession(engine) as session:
-                                stmt = select(TelegramSession).where(TelegramSession.user_id == user_id_str).where(TelegramSession.is_active == True)
-                                res = await session.execute(stmt)
-                                db_session = res.scalars().first()
-                                if db_session:
-                                    db_session.is_active = False
-                                    session.add(db_session)
-                                    await session.commit()
-                             del active_clients[user_id_str]
-                        else:
-                             logger.info(f"Client {user_id_str} recovered successfully.")
-                    except Exception as recon_err:
-                        logger.error(f"Recovery failed for {user_id_str}: {recon_err}")
-                        # 3. Last Resort: Nuke from memory so it gets recreated from scratch next loop
-                        del active_clients[user_id_str]
-
-        # Optimize polling for faster responsiveness
+        if time.monotonic() - last_stats > 300:
+            logger.info(f"Dedup cache: {processed_messages.stats()}")
+            logger.info(f"Shared scans: {shared_scans.stats()}")
+            logger.info(f"Near-duplicates: {near_duplicates.stats()}")
+            rate_limiter.prune()
+            logger.info(f"Rate limits: {rate_limiter.stats()}")
+            logger.info(f"Bot queue: {bot_queue.stats()}")
+            logger.info(f"Outbox: {outbox_writer.written} queued, {outbox_dispatcher.stats()}")
+            logger.info(f"Alert logs: {alert_log_writer.stats()}")
+            logger.info(f"Alert counters: {alert_counters.stats()}")
+            logger.info(f"Notification targets: {target_cache.stats()}")
+            logger.info(f"Webhooks: {webhook_sender.stats()}")
+            logger.info(f"SMTP pool: {smtp_pool.stats()}")
+            logger.info(f"Client health: {client_health.stats()}")
+            logger.info(f"Reconnects: {reconnects.stats()}")
+            logger.info(f"Session feed: {session_feed.stats()}")
+            last_stats = time.monotonic()
+
+        # New sessions are started by the feed; this picks up clients that
+        # could not start (or were dropped) once their backoff allows.
+        # Session strings are loaded only for those.
+        missing = [
+            user_id for user_id in session_feed.active
+            if user_id not in active_clients and reconnects.ready(user_id)
+        ]
+        if missing:
+            try:
+                for session in await fetch_sessions(missing):
+                    asyncio.create_task(start_user_client(session))
+            except Exception as e:
+                logger.error(f"Failed to load sessions: {e}")
+
+        # Health checks run in client_health, concurrently and spread over time
         await asyncio.sleep(5)
 
 if __name__ == "__main__":